@@ -5,32 +5,42 @@ Flask API that takes structured ecommerce CSV exports and produces a
 machine-usable JSON report with return intelligence, revenue dependency
 risk, and ranked actions.
 
-Pipeline runs asynchronously in a background thread. Clients poll
-GET /v1/runs/<run_id> for status and progress updates.
+Pipeline runs asynchronously on a bounded worker pool (429 + Retry-After
+when saturated). Clients poll GET /v1/runs/<run_id> for status, progress
+and queue position.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import threading
+from urllib.parse import urlencode
 
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
 
-from src.config import FLASK_DEBUG, PORT
-from src.utils.ids import new_run_id
-from src.utils.csv_loader import load_orders_csv, load_returns_csv
-from src.utils.validators import ValidationError
-from src.services.profiler import profile_orders
-from src.services.returns_analyzer import analyze_returns
-from src.services.revenue_dependency import analyze_dependency
+from src.config import (
+    FLASK_DEBUG, PORT, DEFAULT_BUSINESS_GOAL, SSE_KEEPALIVE_SECONDS,
+    DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, MAX_BATCH_RUNS, RUN_PROFILING_ENABLED, MAX_GOALS_PER_RUN,
+    MAX_RUN_PRIORITY,
+)
 from src.services.llm_client import LLMClient
-from src.services.report_builder import build_report
-from src.storage.memory_store import (
-    store_run, get_run, list_runs_summary,
+from src.storage.run_store import (
+    store_run, get_run, get_run_versioned, get_run_state, get_run_status, report_encodings,
+    get_report_artifact, get_sku_table, list_runs_summary, query_runs, wait_for_events,
+    store_stats, get_profile, TERMINAL_STATUSES,
 )
+from src.utils.projection import project, paginate
+from src.utils.validators import ValidationError, validate_goals
+from src.utils.artifacts import choose_encoding, dumps_compact
+from src.utils.sku_table import query_sku_table
+from src.utils.run_profiler import PROFILE_FILES
+from src.utils import metrics, tracing
+from src.engines.registry import ENGINES, available_engines, check_engine
 from src.services.run_service import RunService
+from src.services.scheduler import SchedulerSaturated
 
 # ── Logging ──────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -44,6 +54,49 @@ app = Flask(__name__)
 CORS(app)
 llm = LLMClient()
 run_service = RunService(llm)
+# A bad DATAFRAME_ENGINE fails the boot instead of every POST /v1/runs
+check_engine()
+
+
+# ── Tracing ──────────────────────────────────────────────────────────────────
+# Every request is a SERVER span (continuing an incoming W3C traceparent);
+# runs submitted from it are traced as its children.
+
+@app.before_request
+def _start_request_span():
+    if not tracing.enabled():
+        return
+    route = request.url_rule.rule if request.url_rule else request.path
+    span = tracing.start_span(
+        f"{request.method} {route}",
+        kind=tracing.SPAN_KIND_SERVER,
+        parent=tracing.parse_traceparent(request.headers.get("traceparent")),
+        **{"http.method": request.method, "http.route": route,
+           "run_id": (request.view_args or {}).get("run_id")},
+    )
+    g.trace_span, g.trace_token = span, tracing.activate(span)
+
+
+@app.after_request
+def _tag_request_span(response):
+    span = g.get("trace_span")
+    if span is not None:
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.status = tracing.STATUS_ERROR
+        response.headers["traceparent"] = tracing.format_traceparent(span.context)
+    return response
+
+
+@app.teardown_request
+def _end_request_span(exc):
+    span = g.pop("trace_span", None)
+    if span is None:
+        return
+    tracing.deactivate(g.pop("trace_token", None))
+    if exc is not None:
+        span.record_exception(exc)
+    span.end()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -66,7 +119,21 @@ def index():
 @app.get("/health")
 def health():
     """Health check."""
-    return jsonify({"ok": True, "llm_available": llm.available})
+    return jsonify({
+        "ok": True,
+        "llm_available": llm.available,
+        "scheduler": run_service.scheduler.stats(),
+        "run_store": store_stats(),
+    })
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    GET /metrics — Prometheus text exposition: per-stage duration, CPU and
+    peak-memory histograms, row and LLM token counters, run outcomes.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.post("/v1/runs")
@@ -80,54 +147,443 @@ def create_run():
         return jsonify({"error": "Dataset ingestion requires orders_file (CSV)"}), 400
 
     returns_file = request.files.get("returns_file")
-    business_goal = request.form.get("business_goal", "Maximize contribution margin")
-    constraints = request.form.get("constraints", "")
-
-    run_id, error = run_service.start_analysis_pipeline(
-        orders_file=orders_file,
-        returns_file=returns_file,
-        business_goal=business_goal,
-        constraints=constraints
-    )
+    try:
+        goals = _parse_goals(request.form)
+        validate_goals(goals, MAX_GOALS_PER_RUN)
+        # Bounded so no caller can jump the whole queue
+        priority = max(-MAX_RUN_PRIORITY, min(MAX_RUN_PRIORITY, int(request.form.get("priority", 0))))
+    except (ValueError, ValidationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    profile = request.form.get("profile", request.args.get("profile", "")).lower() in ("1", "true", "yes")
+    if profile and not RUN_PROFILING_ENABLED:
+        return jsonify({"error": "profiling_disabled"}), 400
+
+    engine = request.form.get("engine", request.args.get("engine", "")).lower() or None
+    if engine is not None:
+        if engine not in ENGINES:
+            return jsonify({"error": "unknown_engine", "engines": list(ENGINES)}), 400
+        if engine not in available_engines():
+            return jsonify({"error": "engine_unavailable", "engines": available_engines()}), 400
+
+    try:
+        run_id, error = run_service.start_analysis_pipeline(
+            orders_file=orders_file,
+            returns_file=returns_file,
+            goals=goals,
+            priority=priority,
+            profile=profile,
+            engine=engine,
+        )
+    except SchedulerSaturated as e:
+        return (
+            jsonify({"error": "server_busy", "reason": e.reason, "retry_after": e.retry_after}),
+            429,
+            {"Retry-After": str(e.retry_after)},
+        )
 
     if error:
         return jsonify({"error": error}), 422
 
+    tracing.set_attribute("run_id", run_id)
     return jsonify({"run_id": run_id, "status": "processing"}), 202
 
 
+def _parse_goals(form) -> list[dict]:
+    """
+    Business goals for a run. Accepts either
+      - `goals`: JSON list of strings or {"business_goal", "constraints"} objects, or
+      - one or more `business_goal` fields, paired positionally with `constraints`
+        (a single `constraints` value applies to every goal).
+    Raises ValueError for a malformed list or a blank / non-string goal in it.
+    """
+    raw = form.get("goals")
+    if raw:
+        try:
+            items = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError("goals must be a JSON list")
+        if not isinstance(items, list) or not items:
+            raise ValueError("goals must be a non-empty JSON list")
+        default_constraints = form.get("constraints", "")
+        goals = []
+        for g in items:
+            if isinstance(g, str):
+                g = {"business_goal": g}
+            if not isinstance(g, dict) or not isinstance(g.get("business_goal"), str) \
+                    or not g["business_goal"].strip():
+                raise ValueError("each goal must be a non-empty string or an object with a business_goal")
+            goals.append({"business_goal": g["business_goal"],
+                          "constraints": g.get("constraints", default_constraints)})
+        return goals
+
+    business_goals = form.getlist("business_goal") or [DEFAULT_BUSINESS_GOAL]
+    constraints = form.getlist("constraints") or [""]
+    if len(constraints) == 1:
+        constraints = constraints * len(business_goals)
+    return [
+        {"business_goal": g, "constraints": constraints[i] if i < len(constraints) else ""}
+        for i, g in enumerate(business_goals)
+    ]
+
+
 @app.get("/v1/runs")
 def list_runs():
-    """GET /v1/runs — returns a summary list of all completed runs."""
-    return jsonify({"runs": list_runs_summary()})
+    """
+    GET /v1/runs — one page of run summaries (headline metrics, no reports).
+
+      status=done|error|all   default done
+      sort=generated_at|total_revenue|created   default generated_at
+      order=desc|asc          default desc
+      offset=0&limit=100
+    """
+    status = request.args.get("status", "done")
+    sort = request.args.get("sort", "generated_at")
+    descending = request.args.get("order", "desc").lower() != "asc"
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = min(int(request.args.get("limit", DEFAULT_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    try:
+        runs, total = query_runs(
+            status=None if status == "all" else status,
+            sort=sort, descending=descending, offset=offset, limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    next_offset = offset + limit if offset + limit < total else None
+    return jsonify({
+        "runs": runs,
+        "page": {"offset": offset, "limit": limit, "total": total, "next_offset": next_offset},
+    })
+
+
+def _run_etag(run_id: str, version: int, variant: str = "") -> str:
+    """Strong ETag: run version + a digest of the representation-shaping query."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(f"{variant}?{query}".encode("utf-8")).hexdigest()[:10]
+    return f"{run_id[:8]}-v{version}-{digest}"
+
+
+def _not_modified(etag: str) -> Response:
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route("/v1/runs/batch", methods=["GET", "POST"])
+def batch_run_reports():
+    """
+    GET|POST /v1/runs/batch — selected report sections of many runs, streamed
+    as NDJSON (one JSON object per line, in the requested order).
+
+      ids=a,b,c            run ids (default: every completed run)
+      sections=profiling,modules.revenue_dependency_risk
+                           dotted paths inside the report (default: whole report)
+    POST accepts the same keys as a JSON body with list values.
+    """
+    body = (request.get_json(silent=True) or {}) if request.method == "POST" else {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    for key in ("ids", "sections"):
+        # Checked before streaming: a bad entry can't fail after the 200 headers
+        value = body.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            return jsonify({"error": f"{key} must be a list of strings"}), 400
+    ids = body.get("ids") or [i for i in request.args.get("ids", "").split(",") if i]
+    sections = body.get("sections") or [s for s in request.args.get("sections", "").split(",") if s]
+    if not ids:
+        ids = [r["id"] for r in list_runs_summary()]
+    if len(ids) > MAX_BATCH_RUNS:
+        return jsonify({"error": f"at most {MAX_BATCH_RUNS} runs per batch"}), 400
+
+    def generate():
+        for run_id in ids:
+            status = get_run_status(run_id)
+            if status is None:
+                yield dumps_compact({"id": run_id, "error": "not_found"}) + b"\n"
+                continue
+            if status != "done":
+                yield dumps_compact({"id": run_id, "status": status}) + b"\n"
+                continue
+            identity = None if sections else get_report_artifact(run_id)
+            if identity is not None:
+                # Whole report requested: reuse the pre-serialized bytes
+                yield (dumps_compact({"id": run_id, "status": status})[:-1]
+                       + b',"report":' + identity + b"}\n")
+                continue
+            data = get_run(run_id)
+            if not data:
+                yield dumps_compact({"id": run_id, "error": "not_found"}) + b"\n"
+                continue
+            if data.get("_report_unavailable"):
+                yield dumps_compact({"id": run_id, "status": status, "error": "report_unavailable"}) + b"\n"
+                continue
+            report = data.get("report", {})
+            if sections:
+                report = project(report, sections)
+            yield dumps_compact({"id": run_id, "status": status, "report": report}) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _report_unavailable(data: dict):
+    # A finished run whose spilled report can no longer be read back
+    return jsonify({"error": "report_unavailable", "status": data.get("status")}), 410
+
+
+def _public_view(data: dict) -> dict:
+    """Drop internal (underscore-prefixed) keys such as serialized artifacts."""
+    return {k: v for k, v in data.items() if not k.startswith("_")}
 
 
 @app.get("/v1/runs/<run_id>")
 def get_run_report(run_id: str):
-    """GET /v1/runs/<run_id> — returns the full report, status, and progress."""
-    data = get_run(run_id)
+    """
+    GET /v1/runs/<run_id> — returns the full report, status, and progress.
+
+    Query options:
+      fields=status,progress,report.profiling   dotted-path projection
+      page=<dotted path>&offset=0&limit=100     slice one large list/dict
+    Responses carry a strong ETag; If-None-Match yields 304 without
+    loading or re-serializing the report.
+    """
+    state, version = get_run_state(run_id)
+    if state is None:
+        return jsonify({"error": "not_found"}), 404
+
+    etag = _run_etag(run_id, version)
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+
+    fields = request.args.get("fields")
+    page_path = request.args.get("page")
+    field_list = fields.split(",") if fields else []
+    if not page_path and field_list and not any(
+            f == "report" or f.startswith("report.") for f in field_list):
+        # Status / progress polling: the report is never read
+        data = state
+    else:
+        identity = None if fields or page_path else get_report_artifact(run_id)
+        if identity is not None:
+            # Splice the pre-serialized report into a small envelope instead of
+            # re-serializing the whole document.
+            envelope = dumps_compact(_public_view(state))
+            body = envelope[:-1] + (b"," if len(envelope) > 2 else b"") \
+                + b'"report":' + identity + b"}"
+            resp = Response(body, mimetype="application/json")
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        data, _ = get_run_versioned(run_id)
+        if not data:
+            return jsonify({"error": "not_found"}), 404
+    if data.get("_report_unavailable"):
+        return _report_unavailable(data)
+    data = _public_view(data)
+
+    if fields:
+        data = project(data, field_list)
+
+    if page_path:
+        try:
+            offset = int(request.args.get("offset", 0))
+            limit = min(int(request.args.get("limit", DEFAULT_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+        except ValueError:
+            return jsonify({"error": "offset and limit must be integers"}), 400
+        data, page = paginate(data, page_path, offset, limit)
+        if page is None:
+            return jsonify({"error": "page_path_not_found", "page": page_path}), 400
+        data = {**data, "page": page}
+
+    resp = jsonify(data)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.get("/v1/runs/<run_id>/events")
+def stream_run_events(run_id: str):
+    """
+    GET /v1/runs/<run_id>/events — Server-Sent Events stream of progress,
+    stage completions, partial actions and the final status.
+    Resumable via the Last-Event-ID header (or ?after=<id>).
+    """
+    if get_run_status(run_id) is None:
+        return jsonify({"error": "not_found"}), 404
+    try:
+        cursor = int(request.headers.get("Last-Event-ID") or request.args.get("after", 0))
+    except ValueError:
+        cursor = 0
+
+    def generate():
+        nonlocal cursor
+        yield "retry: 2000\n\n"
+        while True:
+            events = wait_for_events(run_id, cursor, timeout=SSE_KEEPALIVE_SECONDS)
+            if events is None:
+                yield 'event: status\ndata: {"status": "not_found"}\n\n'
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for ev in events:
+                cursor = ev["id"]
+                yield f"id: {ev['id']}\nevent: {ev['event']}\ndata: {json.dumps(ev['data'], default=str)}\n\n"
+                if ev["event"] == "status" and ev["data"].get("status") in TERMINAL_STATUSES:
+                    return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/v1/runs/<run_id>/skus")
+def list_run_skus(run_id: str):
+    """
+    GET /v1/runs/<run_id>/skus — the full per-SKU revenue breakdown, paged.
+
+      q=<substring>           case-insensitive SKU filter
+      sort=revenue|sku        default revenue
+      order=desc|asc          default desc for revenue, asc for sku
+      offset=0&limit=100
+    """
+    data, version = get_run_state(run_id)
     if not data:
         return jsonify({"error": "not_found"}), 404
-    return jsonify(data)
+    if data.get("status") != "done":
+        return jsonify({"error": "run_not_complete", "status": data.get("status")}), 409
+
+    etag = _run_etag(run_id, version, variant="skus")
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+
+    table = get_sku_table(run_id) or {"sku": [], "revenue": [], "by_sku": []}
+    sort = request.args.get("sort", "revenue")
+    default_order = "desc" if sort == "revenue" else "asc"
+    descending = request.args.get("order", default_order).lower() == "desc"
+    try:
+        offset = int(request.args.get("offset", 0))
+        limit = min(int(request.args.get("limit", DEFAULT_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+        rows, total = query_sku_table(
+            table, q=request.args.get("q", ""), sort=sort,
+            descending=descending, offset=offset, limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    next_offset = offset + limit if offset + limit < total else None
+    resp = jsonify({
+        "run_id": run_id,
+        "skus": rows,
+        "page": {"offset": offset, "limit": limit, "total": total, "next_offset": next_offset},
+    })
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 @app.get("/v1/runs/<run_id>/download")
 def download_run_report(run_id: str):
-    """GET /v1/runs/<run_id>/download — download report.json."""
-    data = get_run(run_id)
+    """
+    GET /v1/runs/<run_id>/download — download report.json.
+    Serves the artifact precomputed at run completion in the best
+    Accept-Encoding (br / zstd / gzip / identity), with Range support.
+    """
+    data, version = get_run_state(run_id)
     if not data:
         return jsonify({"error": "not_found"}), 404
     if data.get("status") != "done":
         return jsonify({"error": "run_not_complete", "status": data.get("status")}), 409
-
-    report_json = json.dumps(data["report"], indent=2, default=str)
-    return Response(
-        report_json,
+    encodings = report_encodings(run_id)
+    if not encodings:
+        return _report_unavailable(data)
+
+    encoding = "identity"
+    if request.headers.get("Accept-Encoding"):
+        encoding = choose_encoding(request.accept_encodings, dict.fromkeys(encodings))
+
+    etag = _run_etag(run_id, version, variant=f"download:{encoding}")
+    if request.if_none_match.contains(etag):
+        resp = _not_modified(etag)
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    # Only the negotiated encoding is read from the store
+    body = get_report_artifact(run_id, encoding)
+    if body is None:
+        return _report_unavailable(data)
+    resp = Response(
+        body,
         mimetype="application/json",
         headers={
-            "Content-Disposition": f"attachment; filename=report_{run_id}.json"
+            "Content-Disposition": f"attachment; filename=report_{run_id}.json",
         },
     )
+    if encoding != "identity":
+        resp.content_encoding = encoding
+    resp.vary.add("Accept-Encoding")
+    resp.set_etag(etag)
+    # Content-Length, Range → 206 / Content-Range, If-Range handled here
+    return resp.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+
+def _run_profile(run_id: str):
+    """(files, None) for a profiled run, else (None, error response)."""
+    status = get_run_status(run_id)
+    if status is None:
+        return None, (jsonify({"error": "not_found"}), 404)
+    files = get_profile(run_id)
+    if files is None:
+        if status not in TERMINAL_STATUSES:
+            return None, (jsonify({"error": "run_not_complete", "status": status}), 409)
+        return None, (jsonify({"error": "not_profiled"}), 404)
+    return files, None
+
+
+@app.get("/v1/runs/<run_id>/profile")
+def get_run_profile(run_id: str):
+    """
+    GET /v1/runs/<run_id>/profile — index of a profiled run's files
+    (POST /v1/runs with profile=true), the traced memory peak and the top
+    allocation sites.
+    """
+    files, error = _run_profile(run_id)
+    if error:
+        return error
+    allocations = json.loads(files.get("allocations.json") or b"{}")
+    return jsonify({
+        "run_id": run_id,
+        "files": [
+            {"name": name, "bytes": len(body), "content_type": PROFILE_FILES.get(name),
+             "url": f"/v1/runs/{run_id}/profile/{name}"}
+            for name, body in sorted(files.items())
+        ],
+        "traced_peak_bytes": allocations.get("traced_peak_bytes"),
+        "top_allocations": allocations.get("top", [])[:10],
+    })
+
+
+@app.get("/v1/runs/<run_id>/profile/<name>")
+def download_run_profile_file(run_id: str, name: str):
+    """
+    GET /v1/runs/<run_id>/profile/<name> — one profile file:
+    profile.pstats, stacks.collapsed, allocations.json or profile.txt.
+    """
+    files, error = _run_profile(run_id)
+    if error:
+        return error
+    if name not in files:
+        return jsonify({"error": "unknown_profile_file", "files": sorted(files)}), 404
+    return Response(
+        files[name],
+        content_type=PROFILE_FILES.get(name, "application/octet-stream"),
+        headers={"Content-Disposition": f"attachment; filename={run_id}_{name}"},
+    )
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,256 @@
+"""
+Per-stage pipeline benchmarks with stored baselines.
+
+  python -m benchmarks.bench run --sizes 10000,100000,1000000 \\
+      --out benchmarks/baselines/local.json
+  python -m benchmarks.bench compare benchmarks/baselines/reference.json \\
+      benchmarks/baselines/local.json --threshold 0.15
+
+`run` generates (and caches) datasets with generate_test_data.py, then times
+every deterministic stage in pipeline order on each size: `--repeat` timed
+passes (median and min recorded) plus one pass under tracemalloc for the
+peak allocation. Results are written as JSON together with machine and
+library versions.
+
+`compare` lines up two result files and flags any stage whose median time
+(or peak memory) grew by more than the threshold. The exit status is 1 when
+something regressed, so CI can gate on it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from generate_test_data import generate_data
+from src.services.profiler import profile_orders
+from src.services.report_builder import build_report
+from src.services.returns_analyzer import analyze_returns
+from src.services.revenue_dependency import analyze_dependency
+from src.utils.artifacts import build_report_artifacts, dumps_compact
+from src.utils.csv_loader import (
+    _coerce_dates, _coerce_numeric, _normalise_columns, _read_csv,
+    load_orders_csv, load_returns_csv,
+)
+from src.utils.sku_table import build_sku_table
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+ORDER_NUMERIC_COLS = ["quantity", "item_price", "discount_amount", "refund_amount", "line_total"]
+# Stages faster than this are too noisy to call regressions on
+MIN_SECONDS = 0.005
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    setup: Callable[[dict], tuple]  # builds fresh arguments from the context (untimed)
+    fn: Callable[..., Any]
+    output: str | None = None       # context key the result is stored under
+
+
+def _shallow(key: str) -> Callable[[dict], tuple]:
+    # Stages that rename/assign columns get their own frame; data is shared
+    return lambda ctx: (ctx[key].copy(deep=False),)
+
+
+def _report(ctx: dict) -> tuple:
+    kwargs = dict(
+        run_id="bench", profiling=ctx["profiling"], returns_signals=ctx["returns_signals"],
+        dependency=ctx["dependency"], decision={}, orders_rows=len(ctx["orders"]),
+        returns_rows=len(ctx["returns"]), notes=[], sku_table=ctx["sku_table"],
+    )
+    return (kwargs,)
+
+
+STAGES = [
+    Stage("read_csv", lambda c: (c["orders_path"],), _read_csv, "raw"),
+    Stage("normalise_columns", _shallow("raw"), _normalise_columns, "normalised"),
+    Stage("coerce_numeric", lambda c: (c["normalised"].copy(deep=False), ORDER_NUMERIC_COLS),
+          _coerce_numeric, "numeric"),
+    Stage("coerce_dates", lambda c: (c["numeric"].copy(deep=False), ["order_date"]),
+          _coerce_dates),
+    Stage("load_orders_csv", lambda c: (c["orders_path"],), lambda p: load_orders_csv(p)[0],
+          "orders"),
+    Stage("load_returns_csv", lambda c: (c["returns_path"],), lambda p: load_returns_csv(p)[0],
+          "returns"),
+    Stage("profile_orders", lambda c: (c["orders"], c["returns"]), profile_orders, "profiling"),
+    Stage("analyze_returns", lambda c: (c["orders"], c["returns"], c["profiling"]),
+          analyze_returns, "returns_signals"),
+    Stage("analyze_dependency", lambda c: (c["orders"], c["profiling"]),
+          analyze_dependency, "dependency"),
+    Stage("build_sku_table", lambda c: (c["profiling"]["_sku_revenue"],),
+          build_sku_table, "sku_table"),
+    Stage("build_report", _report, lambda kw: build_report(**kw), "report"),
+    Stage("serialize_json", lambda c: (c["report"],), dumps_compact),
+    Stage("build_artifacts", lambda c: (c["report"],), build_report_artifacts),
+]
+STAGE_NAMES = [s.name for s in STAGES]
+
+
+def dataset(size: int, seed: int = 0) -> tuple[str, str]:
+    """Generate (once) and return the orders/returns CSV paths for `size` lines."""
+    prefix = f"bench_{size}_s{seed}_"
+    orders = os.path.join(DATA_DIR, f"{prefix}orders.csv")
+    returns = os.path.join(DATA_DIR, f"{prefix}returns.csv")
+    if not (os.path.exists(orders) and os.path.exists(returns)):
+        generate_data(
+            lines=size, skus=max(50, min(size // 50, 100_000)), zipf=1.1, days=365,
+            lines_per_order=2.0, out_dir=DATA_DIR, prefix=prefix, seed=seed,
+        )
+    return orders, returns
+
+
+def run_stages(
+    orders_path: str,
+    returns_path: str,
+    repeat: int = 3,
+    only: list[str] | None = None,
+) -> dict[str, dict[str, float]]:
+    """Time and memory-profile every stage in order; returns {stage: metrics}."""
+    ctx: dict[str, Any] = {"orders_path": orders_path, "returns_path": returns_path}
+    results: dict[str, dict[str, float]] = {}
+    for stage in STAGES:
+        if only and stage.name not in only:
+            # Still needed for later stages' inputs, just not measured
+            result = stage.fn(*stage.setup(ctx))
+            if stage.output:
+                ctx[stage.output] = result
+            continue
+        times = []
+        result = None
+        for _ in range(max(1, repeat)):
+            args = stage.setup(ctx)
+            started = time.perf_counter()
+            result = stage.fn(*args)
+            times.append(time.perf_counter() - started)
+
+        args = stage.setup(ctx)
+        tracemalloc.start()
+        stage.fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if stage.output:
+            ctx[stage.output] = result
+        results[stage.name] = {
+            "median_s": round(statistics.median(times), 6),
+            "min_s": round(min(times), 6),
+            "peak_mb": round(peak / 1e6, 3),
+        }
+    return results
+
+
+def machine_info() -> dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    threshold: float = 0.15,
+    mem_threshold: float = 0.25,
+) -> list[dict[str, Any]]:
+    """
+    Rows for every (size, stage) present in both result files. A row is a
+    regression when time (or peak memory) grew beyond its threshold.
+    """
+    rows = []
+    for size, stages in current["results"].items():
+        base_stages = baseline["results"].get(size, {})
+        for name, cur in stages.items():
+            base = base_stages.get(name)
+            if not base:
+                continue
+            time_ratio = cur["median_s"] / base["median_s"] if base["median_s"] else 1.0
+            mem_ratio = cur["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+            slow = (time_ratio > 1 + threshold
+                    and cur["median_s"] - base["median_s"] > MIN_SECONDS)
+            fat = mem_ratio > 1 + mem_threshold and cur["peak_mb"] - base["peak_mb"] > 1.0
+            rows.append({
+                "size": size, "stage": name,
+                "base_s": base["median_s"], "cur_s": cur["median_s"], "time_ratio": time_ratio,
+                "base_mb": base["peak_mb"], "cur_mb": cur["peak_mb"], "mem_ratio": mem_ratio,
+                "regression": slow or fat,
+            })
+    return rows
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = [s for s in args.stages.split(",") if s] if args.stages else None
+    out = {"meta": {**machine_info(), "repeat": args.repeat, "seed": args.seed}, "results": {}}
+    for size in sizes:
+        orders_path, returns_path = dataset(size, args.seed)
+        print(f"── {size:,} lines ──")
+        results = run_stages(orders_path, returns_path, repeat=args.repeat, only=only)
+        out["results"][str(size)] = results
+        for name, m in results.items():
+            print(f"  {name:<20} {m['median_s'] * 1000:>10.1f} ms   peak {m['peak_mb']:>9.1f} MB")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as fh:
+        json.dump(out, fh, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+def _cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    rows = compare(baseline, current, args.threshold, args.mem_threshold)
+    print(f"{'size':>10} {'stage':<20} {'base ms':>10} {'cur ms':>10} {'Δt':>7} {'Δmem':>7}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['size']:>10} {r['stage']:<20} {r['base_s'] * 1000:>10.1f} "
+              f"{r['cur_s'] * 1000:>10.1f} {r['time_ratio'] - 1:>+7.0%} {r['mem_ratio'] - 1:>+7.0%}{flag}")
+    regressions = [r for r in rows if r["regression"]]
+    print(f"{len(regressions)} regression(s) across {len(rows)} measurements")
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="benchmark every stage and write a results file")
+    run.add_argument("--sizes", default="10000,100000", help="comma-separated order-line counts")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--stages", default="", help=f"subset of: {','.join(STAGE_NAMES)}")
+    run.add_argument("--out", default=os.path.join("benchmarks", "baselines", "local.json"))
+    run.set_defaults(func=_cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="flag regressions between two results files")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=0.15, help="allowed time growth")
+    cmp_.add_argument("--mem-threshold", type=float, default=0.25, help="allowed peak-memory growth")
+    cmp_.set_defaults(func=_cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,526 @@
+"""
+End-to-end HTTP load test for the runs API.
+
+  python -m benchmarks.loadtest --clients 16 --duration 120 \\
+      --sizes 1000:6,20000:3,200000:1 --server gunicorn --workers 4 \\
+      --out benchmarks/results/load.json
+
+Starts the fake LLM server (fake_llm_server.py) on a background thread and
+the API as a real server process pointed at it — `python app.py` or
+gunicorn — unless `--url` targets one that is already running. Each client
+thread then loops: upload a dataset picked by weight from `--sizes`
+(honouring 429 Retry-After), follow the run to completion by polling
+`?fields=status,progress` or streaming `/events`, and fetch the report and
+the gzip download.
+
+The summary covers throughput, p50/p95/p99 per endpoint, time-to-complete
+per dataset size and the server's RSS (the whole process tree, sampled every
+`--rss-interval` seconds). `--out` writes everything, including the raw RSS
+series, as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.bench import dataset, machine_info
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERMINAL = ("done", "error")
+PERCENTILES = (50, 95, 99)
+
+
+# ── Measurements ─────────────────────────────────────────────────────────────
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """count / mean / p50 / p95 / p99 / max in milliseconds."""
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000
+    out = {"count": len(values), "mean_ms": round(float(arr.mean()), 2)}
+    for p, v in zip(PERCENTILES, np.percentile(arr, PERCENTILES)):
+        out[f"p{p}_ms"] = round(float(v), 2)
+    out["max_ms"] = round(float(arr.max()), 2)
+    return out
+
+
+class Recorder:
+    """Thread-safe sink for request latencies, run outcomes and errors."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.status_codes: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.completion: dict[int, list[float]] = defaultdict(list)
+        self.outcomes: dict[str, int] = defaultdict(int)
+        self.errors: list[str] = []
+
+    def request(self, endpoint: str, seconds: float, status: int) -> None:
+        with self._lock:
+            self.latency[endpoint].append(seconds)
+            self.status_codes[endpoint][status] += 1
+
+    def run_finished(self, size: int, seconds: float, status: str) -> None:
+        with self._lock:
+            self.outcomes[status] += 1
+            if status == "done":
+                self.completion[size].append(seconds)
+
+    def error(self, message: str) -> None:
+        with self._lock:
+            self.outcomes["client_error"] += 1
+            if len(self.errors) < 50:
+                self.errors.append(message)
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        with self._lock:
+            requests_total = sum(len(v) for v in self.latency.values())
+            return {
+                "elapsed_s": round(elapsed, 2),
+                "throughput": {
+                    "runs_completed": self.outcomes.get("done", 0),
+                    "runs_per_min": round(self.outcomes.get("done", 0) / elapsed * 60, 2),
+                    "requests": requests_total,
+                    "requests_per_s": round(requests_total / elapsed, 2),
+                },
+                "outcomes": dict(self.outcomes),
+                "endpoints": {
+                    ep: {**percentiles(v), "status": dict(self.status_codes[ep])}
+                    for ep, v in sorted(self.latency.items())
+                },
+                "time_to_complete": {
+                    str(size): percentiles(v) for size, v in sorted(self.completion.items())
+                },
+                "errors": list(self.errors),
+            }
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident set size in bytes of `pid` plus all of its descendants."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            procs = [proc, *proc.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return 0
+        total = 0
+        for p in procs:
+            try:
+                total += p.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    # Linux fallback: walk /proc
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for tid in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{tid}/children") as fh:
+                    stack.extend(int(c) for c in fh.read().split())
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float) -> None:
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.samples: list[tuple[float, float]] = []  # (seconds since start, MB)
+        self._stop_event = threading.Event()
+        self._started_at = time.monotonic()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            rss = process_tree_rss(self.pid)
+            self.samples.append((round(time.monotonic() - self._started_at, 2), round(rss / 1e6, 1)))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def summary(self) -> dict[str, Any]:
+        mb = [m for _, m in self.samples]
+        if not mb:
+            return {"samples": []}
+        return {"start_mb": mb[0], "peak_mb": max(mb), "end_mb": mb[-1], "samples": self.samples}
+
+
+# ── HTTP client ──────────────────────────────────────────────────────────────
+
+def multipart(fields: dict[str, str], files: dict[str, tuple[str, bytes]]) -> tuple[bytes, str]:
+    """Encode form fields and (filename, content) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: text/csv\r\n\r\n'.encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Client:
+    """One simulated user: a keep-alive connection and a submit → follow → fetch loop."""
+
+    def __init__(self, base_url: str, recorder: Recorder, payloads: dict[int, bytes],
+                 weights: dict[int, float], progress: str, poll_interval: float,
+                 seed: int, timeout: float) -> None:
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.recorder = recorder
+        self.payloads = payloads
+        self.sizes, self.weights = list(weights), list(weights.values())
+        self.progress = progress
+        self.poll_interval = poll_interval
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _request(self, endpoint: str, method: str, path: str, body: bytes | None = None,
+                 headers: dict[str, str] | None = None) -> tuple[int, dict[str, str], bytes]:
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            resp = self.conn.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError):
+            # Drop the connection; http.client reopens it on the next request
+            self.conn.close()
+            raise
+        self.recorder.request(endpoint, time.perf_counter() - started, resp.status)
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
+
+    def submit(self, size: int) -> str | None:
+        body, content_type = multipart(
+            {"business_goal": "Grow contribution margin", "constraints": "Keep discounts under 15%"},
+            {"orders_file": (f"orders_{size}.csv", self.payloads[size])},
+        )
+        while True:
+            status, headers, data = self._request(
+                "POST /v1/runs", "POST", "/v1/runs", body, {"Content-Type": content_type},
+            )
+            if status == 429:
+                time.sleep(float(headers.get("retry-after", 1)))
+                continue
+            if status != 202:
+                self.recorder.error(f"submit {size}: HTTP {status} {data[:200]!r}")
+                return None
+            return json.loads(data)["run_id"]
+
+    def poll(self, run_id: str, deadline: float) -> str:
+        while time.monotonic() < deadline:
+            status, _, data = self._request(
+                "GET /v1/runs/<id>?fields", "GET", f"/v1/runs/{run_id}?fields=status,progress",
+            )
+            if status == 200:
+                run_status = json.loads(data).get("status")
+                if run_status in TERMINAL:
+                    return run_status
+            time.sleep(self.poll_interval)
+        return "timeout"
+
+    def stream(self, run_id: str, deadline: float) -> str:
+        # Separate connection: the stream holds it until the terminal event
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", f"/v1/runs/{run_id}/events", headers={"Accept": "text/event-stream"})
+            resp = conn.getresponse()
+            self.recorder.request("GET /v1/runs/<id>/events (first byte)",
+                                  time.perf_counter() - started, resp.status)
+            if resp.status != 200:
+                resp.read()
+                return "error"
+            event = None
+            while time.monotonic() < deadline:
+                line = resp.readline()
+                if not line:
+                    break
+                line = line.decode().rstrip("\r\n")
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:") and event == "status":
+                    run_status = json.loads(line[5:]).get("status")
+                    if run_status in TERMINAL:
+                        return run_status
+            return "timeout"
+        finally:
+            conn.close()
+
+    def fetch(self, run_id: str) -> None:
+        self._request("GET /v1/runs/<id>", "GET", f"/v1/runs/{run_id}")
+        self._request("GET /v1/runs/<id>/download", "GET", f"/v1/runs/{run_id}/download",
+                      headers={"Accept-Encoding": "gzip"})
+
+    def run_once(self) -> None:
+        size = self.rng.choices(self.sizes, self.weights)[0]
+        started = time.monotonic()
+        try:
+            run_id = self.submit(size)
+            if not run_id:
+                return
+            mode = self.progress if self.progress != "mixed" else self.rng.choice(("poll", "stream"))
+            deadline = started + self.timeout
+            outcome = self.poll(run_id, deadline) if mode == "poll" else self.stream(run_id, deadline)
+            elapsed = time.monotonic() - started
+            if outcome == "done":
+                self.fetch(run_id)
+            self.recorder.run_finished(size, elapsed, outcome)
+        except (http.client.HTTPException, OSError, ValueError) as e:
+            self.recorder.error(f"{type(e).__name__}: {e}")
+
+
+# ── Server process ───────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, port: int, workers: int, threads: int,
+                 env: dict[str, str]) -> subprocess.Popen:
+    if kind == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "app:app", "-b", f"127.0.0.1:{port}",
+               "-w", str(workers), "--threads", str(threads), "--timeout", "300"]
+    else:
+        cmd = [sys.executable, "app.py"]
+    return subprocess.Popen(
+        cmd, cwd=ROOT, env={**os.environ, **env, "PORT": str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60.0, proc: subprocess.Popen | None = None) -> None:
+    url = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {base_url} not ready after {timeout:.0f}s")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # already gone; don't mask the caller's exception
+    proc.wait()
+
+
+# ── Driver ───────────────────────────────────────────────────────────────────
+
+def parse_sizes(spec: str) -> dict[int, float]:
+    """"1000:6,20000:3,200000" → {1000: 6.0, 20000: 3.0, 200000: 1.0}"""
+    weights = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        size, _, weight = item.partition(":")
+        weights[int(size)] = float(weight or 1)
+    if not weights:
+        raise ValueError("at least one dataset size is required")
+    return weights
+
+
+def run_load(
+    base_url: str,
+    weights: dict[int, float],
+    clients: int = 8,
+    duration: float = 60.0,
+    runs_per_client: int = 0,
+    progress: str = "mixed",
+    poll_interval: float = 0.5,
+    server_pid: int | None = None,
+    rss_interval: float = 1.0,
+    seed: int = 0,
+    timeout: float = 600.0,
+) -> dict[str, Any]:
+    """
+    Drive `clients` concurrent users against `base_url` until `duration`
+    seconds pass (or each has completed `runs_per_client` runs, when set).
+    """
+    payloads = {}
+    for size in weights:
+        orders_path, _ = dataset(size, seed)
+        with open(orders_path, "rb") as fh:
+            payloads[size] = fh.read()
+
+    recorder = Recorder()
+    sampler = RssSampler(server_pid, rss_interval) if server_pid else None
+    if sampler:
+        sampler.start()
+
+    stop_at = time.monotonic() + duration
+
+    def worker(i: int) -> None:
+        client = Client(base_url, recorder, payloads, weights, progress, poll_interval,
+                        seed + i, timeout)
+        done = 0
+        while time.monotonic() < stop_at and not (runs_per_client and done >= runs_per_client):
+            client.run_once()
+            done += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    out = recorder.summary(elapsed)
+    if sampler:
+        sampler.stop()
+        out["server_rss"] = sampler.summary()
+    return out
+
+
+def _print_summary(out: dict[str, Any]) -> None:
+    tp = out["throughput"]
+    print(f"── {tp['runs_completed']} runs in {out['elapsed_s']:.1f}s  "
+          f"({tp['runs_per_min']:.1f} runs/min, {tp['requests_per_s']:.1f} req/s) ──")
+    print(f"outcomes: {out['outcomes']}")
+    print(f"{'endpoint':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for ep, m in out["endpoints"].items():
+        print(f"{ep:<40} {m['count']:>7} {m['p50_ms']:>9.1f} {m['p95_ms']:>9.1f} {m['p99_ms']:>9.1f}")
+    print(f"{'time to complete (lines)':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for size, m in out["time_to_complete"].items():
+        if m["count"]:
+            print(f"{int(size):<40,} {m['count']:>7} {m['p50_ms']:>9.1f} "
+                  f"{m['p95_ms']:>9.1f} {m['p99_ms']:>9.1f}")
+    rss = out.get("server_rss")
+    if rss and rss.get("samples"):
+        print(f"server RSS: start {rss['start_mb']:.0f} MB, peak {rss['peak_mb']:.0f} MB, "
+              f"end {rss['end_mb']:.0f} MB")
+    for err in out["errors"][:5]:
+        print(f"  error: {err}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load test for the runs API.")
+    parser.add_argument("--url", help="target an already-running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid to sample RSS from when using --url")
+    parser.add_argument("--server", choices=("flask", "gunicorn"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--store", choices=("memory", "sqlite"), default=None,
+                        help="RUN_STORE_BACKEND for the server (default: sqlite when workers > 1)")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to keep submitting")
+    parser.add_argument("--runs-per-client", type=int, default=0, help="stop each client after N runs")
+    parser.add_argument("--sizes", default="1000:6,20000:3,100000:1",
+                        help="order-line counts with optional weights (size:weight,...)")
+    parser.add_argument("--progress", choices=("poll", "stream", "mixed"), default="mixed")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-run deadline in seconds")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=300.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the full results (including RSS series) as JSON")
+    args = parser.parse_args(argv)
+
+    weights = parse_sizes(args.sizes)
+    proc = fake_llm = db_path = None
+    base_url, server_pid = args.url, args.server_pid
+    if not base_url:
+        from fake_llm_server import start_in_thread
+
+        fake_llm = start_in_thread(
+            latency_dist="lognormal", latency_ms=args.llm_latency_ms,
+            latency_jitter_ms=args.llm_jitter_ms, error_rate=args.llm_error_rate, seed=args.seed,
+        )
+        store = args.store or ("sqlite" if args.server == "gunicorn" and args.workers > 1 else "memory")
+        port = _free_port()
+        env = {
+            "OPENAI_API_KEY": "sk-loadtest",
+            "OPENAI_BASE_URL": fake_llm.base_url,
+            "FLASK_DEBUG": "false",
+            "RUN_STORE_BACKEND": store,
+        }
+        if store == "sqlite":
+            db_path = os.path.join(ROOT, "data", f"loadtest-{port}.db")
+            env["RUN_STORE_PATH"] = db_path
+        proc = start_server(args.server, port, args.workers, args.threads, env)
+        base_url, server_pid = f"http://127.0.0.1:{port}", proc.pid
+
+    try:
+        wait_ready(base_url, proc=proc)
+        out = run_load(
+            base_url, weights, clients=args.clients, duration=args.duration,
+            runs_per_client=args.runs_per_client, progress=args.progress,
+            poll_interval=args.poll_interval, server_pid=server_pid,
+            rss_interval=args.rss_interval, seed=args.seed, timeout=args.timeout,
+        )
+    finally:
+        if proc:
+            stop_server(proc)
+        if fake_llm:
+            fake_llm.shutdown()
+        for suffix in ("", "-wal", "-shm"):
+            if db_path and os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    out["meta"] = {
+        **machine_info(), "url": base_url, "server": None if args.url else args.server,
+        "workers": args.workers, "threads": args.threads, "clients": args.clients,
+        "sizes": {str(k): v for k, v in weights.items()}, "progress": args.progress,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _print_summary(out)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as fh:
+            json.dump(out, fh, indent=2)
+        print(f"Wrote {args.out}")
+    return 0 if out["outcomes"].get("done") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
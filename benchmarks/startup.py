@@ -0,0 +1,130 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import the app and
+answer GET /health, and which heavy modules it loaded on the way.
+
+  python -m benchmarks.startup --repeat 5 --max-import-ms 500 --max-ready-ms 1500
+
+Every repeat spawns new interpreters, so nothing is warm except the OS page
+cache and __pycache__:
+
+  import_ms — `import app`, timed inside the child
+  health_ms — the first GET /health through the test client, same child
+  ready_ms  — from spawning `python app.py` until its socket answers /health
+              (interpreter start + import + bind), polled every few ms
+
+The child also reports which of HEAVY_MODULES `import app` pulled in; they
+should load on the first run, not at boot. The exit status is 1 when any
+median exceeds its budget or a heavy module was imported, so CI can gate on it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+from benchmarks.loadtest import ROOT, _free_port, start_server, stop_server
+
+HEAVY_MODULES = ("pandas", "numpy", "openai", "pyarrow")
+
+_CHILD = f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+status = app.app.test_client().get("/health").status_code
+answered = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "health_ms": (answered - imported) * 1000,
+    "status": status,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_import() -> dict[str, Any]:
+    """One fresh interpreter: import time, first /health and heavy modules."""
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_ready(timeout: float = 30.0) -> float:
+    """Milliseconds from spawning `python app.py` until /health returns 200."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = start_server("flask", port, 1, 1, {"FLASK_DEBUG": "false"})
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with status {proc.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/health")
+                if conn.getresponse().status == 200:
+                    return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"server not ready after {timeout:.0f}s")
+    finally:
+        stop_server(proc)
+
+
+def run(repeat: int = 5, ready: bool = True) -> dict[str, Any]:
+    samples = [measure_import() for _ in range(repeat)]
+    out: dict[str, Any] = {
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "health_ms": round(statistics.median(s["health_ms"] for s in samples), 2),
+        "heavy_modules": sorted({m for s in samples for m in s["heavy"]}),
+    }
+    if ready:
+        out["ready_ms"] = round(statistics.median(measure_ready() for _ in range(repeat)), 1)
+    return out
+
+
+def check(result: dict[str, Any], max_import_ms: float, max_ready_ms: float) -> list[str]:
+    """Budget violations (empty when the cold start is within budget)."""
+    problems = []
+    if result["heavy_modules"]:
+        problems.append(f"import app loaded {', '.join(result['heavy_modules'])}")
+    if result["import_ms"] > max_import_ms:
+        problems.append(f"import took {result['import_ms']:.0f} ms (budget {max_import_ms:.0f})")
+    if result.get("ready_ms", 0) > max_ready_ms:
+        problems.append(f"/health ready after {result['ready_ms']:.0f} ms (budget {max_ready_ms:.0f})")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the API process.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=500.0)
+    parser.add_argument("--max-ready-ms", type=float, default=1500.0)
+    parser.add_argument("--no-server", action="store_true", help="skip the `python app.py` timing")
+    parser.add_argument("--out", default="", help="also write the result as JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.repeat, ready=not args.no_server)
+    print(f"import app   {result['import_ms']:>8.1f} ms")
+    print(f"first /health{result['health_ms']:>8.2f} ms")
+    if "ready_ms" in result:
+        print(f"spawn→ready  {result['ready_ms']:>8.1f} ms")
+    print(f"heavy modules: {', '.join(result['heavy_modules']) or 'none'}")
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+    problems = check(result, args.max_import_ms, args.max_ready_ms)
+    for p in problems:
+        print(f"OVER BUDGET: {p}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Offline batch runner: the analysis pipeline on local files, without the API.
+
+  python cli.py sample_data/orders.csv
+  python cli.py "data/shops/*/orders.csv" --workers 4 --compress gzip
+  python cli.py data/shops --recursive --goal "Cut return losses" --no-llm
+  python cli.py big/orders.csv --engine polars
+  python cli.py huge/orders.parquet --engine duckdb
+
+Each input is a file, a directory or a glob. A directory contributes every
+*orders*.csv / .csv.gz / .parquet inside it (descending with --recursive;
+Parquet needs --engine duckdb). An orders file is paired with the returns
+file beside it — the same name with "orders" replaced by "returns" — when
+one exists; UCI-style files that carry returns as negative lines need none.
+
+Every dataset goes through the chain the API runs (load_orders_csv →
+profile_orders → analyze_returns → analyze_dependency → LLM theme clustering
+and rank_actions when configured → build_report) straight from its path:
+no multipart upload, no in-memory copy of the file, no polling. --engine
+picks the dataframe engine (default DATAFRAME_ENGINE). Datasets run
+in a process pool of --workers (default: CPU count). Each report is written
+next to its orders file as <name>.report.json, or .json.gz / .json.br /
+.json.zst with --compress. The exit status is 1 if any dataset failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Iterator
+
+from src.utils.ids import new_run_id
+
+COMPRESSIONS = {"none": ".json", "gzip": ".json.gz", "br": ".json.br", "zstd": ".json.zst"}
+ORDERS_PATTERNS = ("*orders*.csv", "*orders*.csv.gz", "*orders*.parquet")
+
+
+def discover(inputs: list[str], recursive: bool = False) -> list[str]:
+    """Orders files named by `inputs` (files, directories or globs), sorted and unique."""
+    found: set[str] = set()
+    for item in inputs:
+        matches = glob.glob(item, recursive=True) if glob.has_magic(item) else [item]
+        if not matches:
+            raise FileNotFoundError(f"no such file or directory: {item}")
+        for path in matches:
+            if os.path.isdir(path):
+                for pattern in ORDERS_PATTERNS:
+                    sub = os.path.join(path, "**", pattern) if recursive else os.path.join(path, pattern)
+                    found.update(glob.glob(sub, recursive=recursive))
+            elif os.path.isfile(path):
+                found.add(path)
+            else:
+                raise FileNotFoundError(f"no such file or directory: {path}")
+    found = {os.path.normpath(p) for p in found}
+    # A glob like dir/*.csv also matches the returns files; they ride along
+    partners = {returns_for(p) for p in found}
+    return sorted(found - partners)
+
+
+def returns_for(orders_path: str) -> str | None:
+    """The returns file paired with `orders_path`, if there is one."""
+    folder, name = os.path.split(orders_path)
+    if "orders" not in name:
+        return None
+    head, _, tail = name.rpartition("orders")
+    candidate = os.path.join(folder, f"{head}returns{tail}")
+    return candidate if os.path.isfile(candidate) else None
+
+
+def report_path(orders_path: str, compress: str = "none") -> str:
+    base = orders_path
+    for ext in (".csv.gz", ".csv", ".parquet"):
+        if base.endswith(ext):
+            base = base[: -len(ext)]
+            break
+    return f"{base}.report{COMPRESSIONS[compress]}"
+
+
+def _encode(raw: bytes, compress: str) -> bytes:
+    # Same settings as the API's pre-compressed artifacts (utils.artifacts)
+    if compress == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    if compress == "br":
+        import brotli
+        return brotli.compress(raw, quality=5)
+    if compress == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return raw
+
+
+def analyze_dataset(
+    orders_path: str,
+    returns_path: str | None = None,
+    business_goal: str = "",
+    constraints: str = "",
+    use_llm: bool = True,
+    compress: str = "none",
+    engine: str | None = None,
+) -> dict[str, Any]:
+    """Run the full pipeline on one dataset and write its report. Returns a summary."""
+    from src.config import DEFAULT_BUSINESS_GOAL
+    from src.engines.registry import get_engine
+    from src.services.execution import run_deterministic_core
+    from src.services.llm_client import LLMClient
+    from src.services.report_builder import build_report
+    from src.utils.artifacts import dumps_compact
+    from src.utils.sku_table import build_sku_table
+
+    started = time.perf_counter()
+    eng = get_engine(engine)
+    notes: list[str] = []
+    orders_df, order_notes = eng.load_orders(orders_path)
+    notes.extend(order_notes)
+    returns_df, returns_rows = None, 0
+    if returns_path:
+        returns_df, return_notes = eng.load_returns(returns_path)
+        notes.extend(return_notes)
+        returns_rows = len(returns_df)
+
+    core = run_deterministic_core(orders_df, returns_df, engine=eng)
+    profiling, returns_signals = core["profiling"], core["returns_signals"]
+
+    llm = LLMClient() if use_llm else LLMClient(api_key="", base_url="")
+    if core["reason_sample"]:
+        returns_signals["themes"] = llm.cluster_return_reasons(core["reason_sample"])
+    modules = {
+        "returns_intelligence": returns_signals,
+        "revenue_dependency_risk": core["dependency"],
+    }
+    decision = llm.rank_actions(
+        business_goal=business_goal or DEFAULT_BUSINESS_GOAL,
+        constraints=constraints,
+        profiling=profiling,
+        modules=modules,
+    )
+
+    report = build_report(
+        run_id=new_run_id(),
+        profiling=profiling,
+        returns_signals=returns_signals,
+        dependency=core["dependency"],
+        decision=decision,
+        orders_rows=len(orders_df),
+        returns_rows=returns_rows,
+        notes=notes,
+        sku_table=build_sku_table(profiling.get("_sku_revenue", {})),
+    )
+    body = _encode(dumps_compact(report), compress)
+    out = report_path(orders_path, compress)
+    tmp = f"{out}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(body)
+    os.replace(tmp, out)
+    return {
+        "orders": orders_path, "returns": returns_path, "report": out,
+        "orders_rows": len(orders_df), "returns_rows": returns_rows,
+        "bytes": len(body), "wall_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def _analyze_safely(orders_path: str, returns_path: str | None, **options: Any) -> dict[str, Any]:
+    try:
+        return analyze_dataset(orders_path, returns_path, **options)
+    except Exception as e:
+        return {"orders": orders_path, "returns": returns_path,
+                "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(orders_paths: list[str], workers: int = 0, **options: Any) -> Iterator[dict[str, Any]]:
+    """
+    Analyze every dataset, yielding summaries as they finish. One worker runs
+    inline; more use a process pool (the stages are CPU-bound).
+    """
+    jobs = [(path, returns_for(path)) for path in orders_paths]
+    workers = min(workers or os.cpu_count() or 1, len(jobs) or 1)
+    if workers == 1:
+        for orders_path, returns_path in jobs:
+            yield _analyze_safely(orders_path, returns_path, **options)
+        return
+    # spawn, as in execution.ProcessBackend: no inherited threads or locks
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_analyze_safely, o, r, **options) for o, r in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("inputs", nargs="+", help="orders files, directories or globs")
+    ap.add_argument("--recursive", action="store_true", help="search directories recursively")
+    ap.add_argument("--workers", type=int, default=0, help="parallel datasets (default: CPU count)")
+    ap.add_argument("--compress", choices=sorted(COMPRESSIONS), default="none")
+    ap.add_argument("--goal", default="", help="business goal for action ranking")
+    ap.add_argument("--constraints", default="")
+    ap.add_argument("--no-llm", action="store_true", help="deterministic modules only")
+    ap.add_argument("--engine", default=None, help="dataframe engine (default: DATAFRAME_ENGINE)")
+    args = ap.parse_args(argv)
+
+    if args.compress in ("br", "zstd"):
+        try:
+            __import__("brotli" if args.compress == "br" else "zstandard")
+        except ImportError:
+            ap.error(f"--compress {args.compress} needs the "
+                     f"{'brotli' if args.compress == 'br' else 'zstandard'} package")
+    if args.engine:
+        from src.engines.registry import ENGINES, available_engines
+
+        if args.engine not in available_engines():
+            ap.error(f"--engine {args.engine} is not available "
+                     f"(installed: {', '.join(available_engines())}; known: {', '.join(ENGINES)})")
+    try:
+        orders_paths = discover(args.inputs, args.recursive)
+    except FileNotFoundError as e:
+        ap.error(str(e))
+    if not orders_paths:
+        ap.error("no orders files found")
+
+    started = time.perf_counter()
+    failed = 0
+    for result in run_batch(orders_paths, args.workers, business_goal=args.goal,
+                            constraints=args.constraints, use_llm=not args.no_llm,
+                            compress=args.compress, engine=args.engine):
+        if "error" in result:
+            failed += 1
+            print(f"FAILED {result['orders']}: {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['orders']} → {result['report']} "
+                  f"({result['orders_rows']:,} orders, {result['returns_rows']:,} returns, "
+                  f"{result['wall_s']:.2f}s)")
+    print(f"{len(orders_paths) - failed}/{len(orders_paths)} datasets in "
+          f"{time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Fake OpenAI-compatible chat-completions server for offline benchmarking.
+
+Answers POST /v1/chat/completions with schema-valid JSON for both prompts
+used by LLMClient (`themes` for reason clustering, `ranked_actions` for
+decisioning), with configurable latency, error rates and 429 injection.
+Supports `stream: true` (SSE chunks) so the streaming path can be exercised.
+
+Usage:
+    python fake_llm_server.py --port 8088 --latency-dist lognormal --latency-ms 800
+    OPENAI_BASE_URL=http://127.0.0.1:8088/v1 python app.py
+
+Counters are available at GET /stats.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class FakeLLMConfig:
+    """Behaviour knobs for the fake server."""
+
+    def __init__(
+        self,
+        latency_dist: str = "fixed",
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after_s: float = 1.0,
+        stream_chunk_chars: int = 24,
+        stream_chunk_ms: float = 5.0,
+        seed: int | None = None,
+    ):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.stream_chunk_ms = stream_chunk_ms
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Seconds to wait before answering."""
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        with self.rng_lock:
+            if self.latency_dist == "uniform":
+                ms = self.rng.uniform(max(0.0, mean - jitter), mean + jitter)
+            elif self.latency_dist == "normal":
+                ms = self.rng.gauss(mean, jitter)
+            elif self.latency_dist == "lognormal":
+                # Parameterised so that mean/std-dev of the samples match
+                if mean > 0:
+                    cv = jitter / mean if jitter else 0.5
+                    sigma = math.sqrt(math.log(1 + cv ** 2))
+                    ms = self.rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+                else:
+                    ms = 0.0
+            elif self.latency_dist == "exponential":
+                ms = self.rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            else:
+                ms = mean
+        return max(0.0, ms) / 1000.0
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < probability
+
+
+class FakeLLMStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "streamed": 0, "errors_500": 0,
+                       "rate_limited_429": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def incr(self, key: str, by: int = 1) -> None:
+        with self._lock:
+            self.counts[key] += by
+            if key == "in_flight":
+                self.counts["max_in_flight"] = max(self.counts["max_in_flight"],
+                                                   self.counts["in_flight"])
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+# ── Canned, schema-valid responses ───────────────────────────────────────────
+
+def _extract_input_json(user_msg: str) -> dict:
+    match = re.search(r"INPUT JSON:\n(.*?)\n\nOUTPUT JSON SCHEMA", user_msg, re.S)
+    if not match:
+        return {}
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return {}
+
+
+def build_themes(user_msg: str) -> dict[str, Any]:
+    sample = _extract_input_json(user_msg).get("top_reasons_sample", [])
+    by_reason: dict[str, set] = {}
+    for row in sample:
+        by_reason.setdefault(str(row.get("reason", "Unspecified")), set()).add(str(row.get("sku", "")))
+    reasons = list(by_reason.items())[:8] or [("Unspecified", set())]
+    themes = []
+    for i, (reason, skus) in enumerate(reasons):
+        themes.append({
+            "theme": reason[:40],
+            "examples": [reason, reason.lower()],
+            "skus_affected": sorted(s for s in skus if s),
+            "severity": 5 - (i % 5),
+        })
+    return {"themes": themes}
+
+
+def build_ranked_actions(user_msg: str) -> dict[str, Any]:
+    payload = _extract_input_json(user_msg)
+    m = re.search(r"produce (\d+) ranked actions", user_msg)
+    n_actions = int(m.group(1)) if m else 5
+    profiling = payload.get("profiling", {})
+    skus = [s.get("sku", "") for s in profiling.get("high_return_skus", [])] or ["catalog"]
+    goal = payload.get("business_goal", "")
+    action_types = ("data_fix", "business_experiment", "further_analysis")
+    impacts = ("high", "medium", "low")
+    actions = []
+    for i in range(n_actions):
+        sku = skus[i % len(skus)]
+        actions.append({
+            "rank": i + 1,
+            "action_type": action_types[i % 3],
+            "title": f"Reduce return leakage on {sku}",
+            "why_it_matters": f"Supports goal: {goal}" if goal else "Protects contribution margin.",
+            "how_to_execute": ["Audit listing content", "Run a two-week A/B test"],
+            "success_metric": f"Return rate for {sku} down 20%",
+            "expected_impact": impacts[i % 3],
+            "confidence": round(0.9 - 0.1 * (i % 5), 2),
+            "evidence_used": [f"high_return_skus[{sku}]",
+                              f"total_revenue={profiling.get('total_revenue', 0)}"],
+        })
+    return {
+        "ranked_actions": actions,
+        "limitations": ["Synthetic response from fake_llm_server"],
+        "next_questions": ["Is this a benchmark run?"],
+    }
+
+
+def build_content(messages: list[dict]) -> str:
+    user_msg = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    if "top_reasons_sample" in user_msg:
+        return json.dumps(build_themes(user_msg))
+    return json.dumps(build_ranked_actions(user_msg))
+
+
+# ── HTTP layer ───────────────────────────────────────────────────────────────
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server_version = "FakeLLM/0.1"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def cfg(self) -> FakeLLMConfig:
+        return self.server.cfg
+
+    @property
+    def stats(self) -> FakeLLMStats:
+        return self.server.stats
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/v1/health"):
+            self._send_json(200, {"ok": True})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.stats.snapshot())
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+
+        self.stats.incr("requests")
+        self.stats.incr("in_flight")
+        try:
+            time.sleep(self.cfg.sample_latency())
+            if self.cfg.roll(self.cfg.rate_limit_rate):
+                self.stats.incr("rate_limited_429")
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                    headers={"Retry-After": f"{self.cfg.retry_after_s:g}"},
+                )
+                return
+            if self.cfg.roll(self.cfg.error_rate):
+                self.stats.incr("errors_500")
+                self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                return
+
+            content = build_content(body.get("messages", []))
+            model = body.get("model", "fake")
+            prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+            usage = {
+                "prompt_tokens": math.ceil(prompt_chars / 4),
+                "completion_tokens": math.ceil(len(content) / 4),
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if body.get("stream"):
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self._stream(content, model, usage if include_usage else None)
+                self.stats.incr("streamed")
+            else:
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+            self.stats.incr("ok")
+        finally:
+            self.stats.incr("in_flight", -1)
+
+    def _send_json(self, status: int, obj: dict, headers: dict | None = None) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, content: str, model: str, usage: dict | None) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        def event(delta: dict, finish: str | None = None, extra: dict | None = None) -> None:
+            obj = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if extra:
+                obj.update(extra)
+            self.wfile.write(f"data: {json.dumps(obj)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        step = self.cfg.stream_chunk_chars
+        for i in range(0, len(content), step):
+            event({"content": content[i:i + step]})
+            if self.cfg.stream_chunk_ms:
+                time.sleep(self.cfg.stream_chunk_ms / 1000.0)
+        event({}, finish="stop")
+        if usage:
+            tail = {"id": chunk_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(tail)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], cfg: FakeLLMConfig):
+        super().__init__(address, FakeLLMHandler)
+        self.cfg = cfg
+        self.stats = FakeLLMStats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0, **cfg_kwargs) -> FakeLLMServer:
+    """Start a server on a background thread (port=0 picks a free port)."""
+    server = FakeLLMServer((host, port), FakeLLMConfig(**cfg_kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="mean latency")
+    ap.add_argument("--latency-jitter-ms", type=float, default=0.0,
+                    help="spread: uniform half-width, normal/lognormal std-dev")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="probability of HTTP 500")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of HTTP 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    ap.add_argument("--stream-chunk-chars", type=int, default=24)
+    ap.add_argument("--stream-chunk-ms", type=float, default=5.0)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    server = FakeLLMServer(
+        (args.host, args.port),
+        FakeLLMConfig(
+            latency_dist=args.latency_dist,
+            latency_ms=args.latency_ms,
+            latency_jitter_ms=args.latency_jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after_s=args.retry_after,
+            stream_chunk_chars=args.stream_chunk_chars,
+            stream_chunk_ms=args.stream_chunk_ms,
+            seed=args.seed,
+        ),
+    )
+    print(f"Fake LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,27 @@ import ResultsPanel from './components/ResultsPanel'
 import Footer from './components/Footer'
 
 const API = ''
+// History items whose reports are prefetched in one batch request on mount
+const PREFETCH_REPORTS = 10
+
+// Full reports of several runs from /v1/runs/batch (NDJSON, one run per line)
+async function fetchReports(ids) {
+  if (!ids.length) return {}  // an empty list would mean every run
+  const resp = await fetch(`${API}/v1/runs/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids }),
+  })
+  if (!resp.ok) return {}
+  const text = await resp.text()
+  const reports = {}
+  for (const line of text.split('\n')) {
+    if (!line) continue
+    const item = JSON.parse(line)
+    if (item.report) reports[item.id] = item.report
+  }
+  return reports
+}
 
 export default function App() {
   const [report, setReport] = useState(null)
@@ -15,6 +36,7 @@ export default function App() {
   const [history, setHistory] = useState([])
   const [toast, setToast] = useState(null)
   const pollingRef = useRef(null)
+  const eventsRef = useRef(null)
 
   // Interactive Background Logic
   const mouseX = useMotionValue(0)
@@ -31,7 +53,7 @@ export default function App() {
     return () => window.removeEventListener('mousemove', handleMove)
   }, [mouseX, mouseY])
 
-  // ── Load history from backend on mount ──
+  // ── Load history from backend on mount (one request: summaries only) ──
   useEffect(() => {
     const loadHistory = async () => {
       try {
@@ -39,28 +61,49 @@ export default function App() {
         if (!resp.ok) return
         const data = await resp.json()
         const runs = data.runs || []
-        // For each completed run, fetch the full report
-        const fullRuns = await Promise.all(
-          runs.map(async (r) => {
-            try {
-              const rr = await fetch(`${API}/v1/runs/${r.id}`)
-              const rd = await rr.json()
-              return { id: r.id, time: new Date(r.generated_at), report: rd.report || rd }
-            } catch { return null }
-          })
-        )
-        setHistory(fullRuns.filter(Boolean))
+        setHistory(runs.map((r) => ({ id: r.id, time: new Date(r.generated_at), summary: r, report: null })))
+        // The most recent reports arrive in one batch; older ones load when opened
+        const reports = await fetchReports(runs.slice(0, PREFETCH_REPORTS).map((r) => r.id))
+        setHistory(prev => prev.map(x => (reports[x.id] && !x.report ? { ...x, report: reports[x.id] } : x)))
       } catch { /* ignore on mount */ }
     }
     loadHistory()
   }, [])
 
+  // ── Open a history item, fetching its report on first use ──
+  const openHistory = useCallback(async (h) => {
+    if (h.report) return setReport(h.report)
+    try {
+      const resp = await fetch(`${API}/v1/runs/${h.id}?fields=report`)
+      const data = await resp.json()
+      if (!data.report) return
+      setReport(data.report)
+      setHistory(prev => prev.map(x => (x.id === h.id ? { ...x, report: data.report } : x)))
+    } catch { /* keep current view */ }
+  }, [])
+
   const showToast = useCallback((msg, type = 'success') => {
     setToast({ msg, type })
     setTimeout(() => setToast(null), 8000)
   }, [])
 
-  // ── Poll backend for real progress ──
+  // ── Completion handlers shared by SSE and polling ──
+  const finishRun = useCallback((runId, data) => {
+    const fullReport = data.report || data
+    setReport(fullReport)
+    setHistory(prev => [{ id: runId, time: new Date(), report: fullReport }, ...prev])
+    setLoading(false)
+    showToast('Neural intelligence synthesis complete')
+    setTimeout(() => setProgress({ pct: 0, label: '' }), 1500)
+  }, [showToast])
+
+  const failRun = useCallback((message) => {
+    setLoading(false)
+    showToast(message || 'Pipeline failed', 'error')
+    setTimeout(() => setProgress({ pct: 0, label: '' }), 1500)
+  }, [showToast])
+
+  // ── Poll backend for real progress (fallback when SSE is unavailable) ──
   const pollProgress = useCallback((runId) => {
     if (pollingRef.current) clearInterval(pollingRef.current)
 
@@ -78,27 +121,58 @@ export default function App() {
         if (data.status === 'done') {
           clearInterval(pollingRef.current)
           pollingRef.current = null
-          const fullReport = data.report || data
-          setReport(fullReport)
-          setHistory(prev => [{ id: runId, time: new Date(), report: fullReport }, ...prev])
-          setLoading(false)
-          showToast('Neural intelligence synthesis complete')
-          setTimeout(() => setProgress({ pct: 0, label: '' }), 1500)
+          finishRun(runId, data)
         }
 
         // Check if error
         if (data.status === 'error') {
           clearInterval(pollingRef.current)
           pollingRef.current = null
-          setLoading(false)
-          showToast(data.error || 'Pipeline failed', 'error')
-          setTimeout(() => setProgress({ pct: 0, label: '' }), 1500)
+          failRun(data.error)
         }
       } catch {
         // Network error — keep polling
       }
     }, 1000) // Poll every second
-  }, [showToast])
+  }, [finishRun, failRun])
+
+  // ── Stream progress over SSE; the report is fetched once at the end ──
+  const streamProgress = useCallback((runId) => {
+    if (typeof EventSource === 'undefined') return pollProgress(runId)
+    if (eventsRef.current) eventsRef.current.close()
+
+    const es = new EventSource(`${API}/v1/runs/${runId}/events`)
+    eventsRef.current = es
+    let finished = false
+
+    es.addEventListener('progress', (e) => {
+      const p = JSON.parse(e.data)
+      setProgress({ pct: p.pct, label: p.label })
+    })
+
+    es.addEventListener('status', async (e) => {
+      const s = JSON.parse(e.data)
+      if (s.status !== 'done' && s.status !== 'error') return
+      finished = true
+      es.close()
+      eventsRef.current = null
+      if (s.status === 'error') return failRun(s.error)
+      try {
+        const resp = await fetch(`${API}/v1/runs/${runId}`)
+        finishRun(runId, await resp.json())
+      } catch {
+        failRun('Failed to fetch report')
+      }
+    })
+
+    es.onerror = () => {
+      // Stream dropped before completion — fall back to polling
+      if (finished) return
+      es.close()
+      eventsRef.current = null
+      pollProgress(runId)
+    }
+  }, [pollProgress, finishRun, failRun])
 
   const runAnalysis = useCallback(async (formData) => {
     setLoading(true)
@@ -114,14 +188,14 @@ export default function App() {
         throw new Error(data.error || 'Analysis request failed')
       }
 
-      // Start polling for real progress
-      pollProgress(data.run_id)
+      // Follow real progress (SSE, falling back to polling)
+      streamProgress(data.run_id)
     } catch (err) {
       setLoading(false)
       showToast(err.message, 'error')
       setTimeout(() => setProgress({ pct: 0, label: '' }), 1000)
     }
-  }, [showToast, pollProgress])
+  }, [showToast, streamProgress])
 
   // ── Keyboard shortcuts (#15) ──
   useEffect(() => {
@@ -134,10 +208,11 @@ export default function App() {
     return () => window.removeEventListener('keydown', handleKey)
   }, [report])
 
-  // Cleanup polling on unmount
+  // Cleanup polling / event stream on unmount
   useEffect(() => {
     return () => {
       if (pollingRef.current) clearInterval(pollingRef.current)
+      if (eventsRef.current) eventsRef.current.close()
     }
   }, [])
 
@@ -240,7 +315,7 @@ export default function App() {
                         initial={{ opacity: 0, x: -10 }}
                         animate={{ opacity: 1, x: 0 }}
                         transition={{ delay: idx * 0.05 }}
-                        onClick={() => setReport(h.report)}
+                        onClick={() => openHistory(h)}
                         className="history-item"
                         style={{
                           width: '100%',
@@ -266,7 +341,7 @@ export default function App() {
                         </div>
                         <div style={{ fontSize: '0.7rem', display: 'flex', gap: '8px' }}>
                           <span style={{ color: 'var(--fg-muted)' }}>REV:</span>
-                          <span style={{ fontWeight: 600 }}>${(h.report?.profiling?.total_revenue / 1000).toFixed(1)}k</span>
+                          <span style={{ fontWeight: 600 }}>${((h.summary?.total_revenue ?? h.report?.profiling?.total_revenue) / 1000).toFixed(1)}k</span>
                         </div>
                       </motion.button>
                     ))}
@@ -41,7 +41,8 @@ export default function ResultsPanel({ report, loading }) {
         const prof = report.profiling || {}
         const returns = prof.high_return_skus || []
         const retInfo = returns.find(r => r.sku === skuName) || {}
-        const rev = prof.sku_revenue_breakdown?.[skuName] || 0
+        // The inline breakdown only holds the top SKUs; fall back to the return entry
+        const rev = prof.sku_revenue_breakdown?.[skuName] ?? retInfo.revenue ?? 0
 
         return {
             sku: skuName,
@@ -1,94 +1,312 @@
-import csv
-import random
-import uuid
-from datetime import datetime, timedelta
-
-def generate_data(num_orders=300, num_returns=80):
-    skus = [
-        ("SKU-PRO-MAX", 599.99, 0.05), # High value, low return
-        ("SKU-ECO-BUDGET", 19.99, 0.25), # Low value, high return
-        ("SKU-MOD-TREND", 49.99, 0.12), # Medium value, medium return
-        ("SKU-DELUXE-KIT", 129.50, 0.08),
-        ("SKU-BASIC-TOOL", 35.00, 0.15)
-    ]
-    
-    reasons = [
-        "Item arrived damaged",
-        "Wrong size received",
-        "Product quality not as expected",
-        "Changed my mind",
-        "Found a better price",
-        "Defective unit",
-        "Sizing chart was misleading",
-        "Arrived too late",
-        "Missing parts",
-        "Doesn't match description"
-    ]
-
-    orders = []
-    returns = []
-    
-    start_date = datetime(2025, 1, 1)
-    
-    # Generate Orders
-    for i in range(num_orders):
-        order_id = 2000 + i
-        order_date = (start_date + timedelta(days=random.randint(0, 60))).strftime("%Y-%m-%d")
-        sku_info = random.choice(skus)
-        sku = sku_info[0]
-        price = sku_info[1]
-        quantity = random.randint(1, 3)
-        discount = random.choice([0, 0, 0, 5, 10, 15, 20]) if price > 50 else 0
-        refund_amount = 0.0
-        
-        orders.append({
-            "order_id": order_id,
-            "order_date": order_date,
-            "sku": sku,
-            "quantity": quantity,
-            "item_price": price,
-            "discount_amount": discount,
-            "refund_amount": refund_amount
-        })
-
-    # Generate Returns from existing orders
-    random.shuffle(orders)
-    for order in orders:
-        if len(returns) >= num_returns:
-            break
-            
-        sku = order["sku"]
-        sku_info = next(s for s in skus if s[0] == sku)
-        
-        # Increase probability for specific SKUs to create "risk" signals
-        prob = sku_info[2] * 3
-        if random.random() < prob:
-            return_date = (datetime.strptime(order["order_date"], "%Y-%m-%d") + timedelta(days=random.randint(1, 14))).strftime("%Y-%m-%d")
-            reason = random.choice(reasons)
-            amount = order["item_price"] * order["quantity"] - order["discount_amount"]
-            
-            returns.append({
-                "order_id": order["order_id"],
-                "sku": sku,
-                "return_date": return_date,
-                "return_reason_text": reason,
-                "return_amount": amount
-            })
-            order["refund_amount"] = amount
-
-    # Write to CSV files
-    with open('test_orders.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=orders[0].keys())
-        writer.writeheader()
-        writer.writerows(orders)
-
-    with open('test_returns.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=returns[0].keys())
-        writer.writeheader()
-        writer.writerows(returns)
-
-    print(f"Generated {len(orders)} orders in test_orders.csv")
-    print(f"Generated {len(returns)} returns in test_returns.csv")
+"""
+Synthetic orders / returns generator for tests and benchmarks.
+
+Vectorized with numpy and written in chunks, so it scales from a few hundred
+rows to tens of millions without holding the dataset in memory:
+
+  python generate_test_data.py                                   # 300 orders, like before
+  python generate_test_data.py --lines 20000000 --skus 50000 \\
+      --zipf 1.1 --format csv.gz --out-dir data/bench --seed 7
+
+Knobs:
+  --skus / --zipf      catalog size and Zipf exponent of SKU popularity
+                       (higher = more revenue concentrated in the top SKUs)
+  --start / --days     order date span
+  --return-rate        mean share of order lines that come back
+  --style              standard  canonical headers + separate returns file
+                       shopify   synonym headers (exercises fuzzy mapping)
+                       uci       UCI Online Retail layout, returns as
+                                 negative-quantity "C" invoices in one file
+  --format             csv, csv.gz or parquet (parquet needs pyarrow)
+
+Output is fully determined by --seed and --chunk-rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Return-reason vocabulary: theme -> phrasings. Each SKU has a dominant theme,
+# so clustering has real signal to find.
+REASON_THEMES = {
+    "sizing": [
+        "Wrong size received", "Sizing chart was misleading", "Runs small",
+        "Too big, had to send back", "Size was tiny compared to description",
+    ],
+    "damage": [
+        "Item arrived damaged", "Box was crushed in transit", "Cracked on arrival",
+        "Screen scratched out of the box",
+    ],
+    "quality": [
+        "Product quality not as expected", "Material feels cheap", "Stopped working after a week",
+        "Defective unit", "Stitching came apart",
+    ],
+    "mismatch": [
+        "Doesn't match description", "Color different from photos", "Wrong item shipped",
+        "Not the model I ordered",
+    ],
+    "logistics": ["Arrived too late", "Missing parts", "Package lost then delivered late"],
+    "preference": ["Changed my mind", "Found a better price", "No longer needed", "Gift not wanted"],
+}
+
+# Header variants per style (internal name -> written name)
+ORDER_HEADERS = {
+    "standard": {
+        "order_id": "order_id", "order_date": "order_date", "sku": "sku", "quantity": "quantity",
+        "item_price": "item_price", "discount_amount": "discount_amount",
+        "refund_amount": "refund_amount",
+    },
+    "shopify": {
+        "order_id": "Order Number", "order_date": "Created At", "sku": "Variant SKU",
+        "quantity": "Qty", "item_price": "Unit Price", "discount_amount": "Discount",
+        "refund_amount": "Refunded",
+    },
+}
+RETURN_HEADERS = {
+    "standard": {
+        "order_id": "order_id", "sku": "sku", "return_date": "return_date",
+        "return_reason_text": "return_reason_text", "return_amount": "return_amount",
+    },
+    "shopify": {
+        "order_id": "Order Number", "sku": "Variant SKU", "return_date": "return_date",
+        "return_reason_text": "Reason", "return_amount": "Refund",
+    },
+}
+STYLES = ("standard", "shopify", "uci")
+FORMATS = ("csv", "csv.gz", "parquet")
+
+
+class Catalog:
+    """Per-SKU attributes, drawn once up front."""
+
+    def __init__(self, rng: np.random.Generator, n_skus: int, zipf: float, return_rate: float):
+        self.names = np.array([f"SKU-{i:06d}" for i in range(n_skus)], dtype=object)
+        self.prices = np.round(rng.lognormal(mean=3.4, sigma=0.9, size=n_skus), 2).clip(0.99, 2500)
+        # Popularity ~ 1 / rank^zipf over a shuffled catalog
+        weights = 1.0 / np.arange(1, n_skus + 1) ** zipf
+        rng.shuffle(weights)
+        self.cdf = np.cumsum(weights / weights.sum())
+        # Per-SKU return propensity with the requested mean
+        concentration = 20.0
+        a = max(return_rate, 1e-6) * concentration
+        self.return_rates = rng.beta(a, concentration - a, size=n_skus)
+        self.themes = rng.integers(0, len(REASON_THEMES), size=n_skus)
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        idx = np.searchsorted(self.cdf, rng.random(n), side="right")
+        return np.minimum(idx, len(self.cdf) - 1)
+
+
+def _reason_vocab() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    phrases, offsets, sizes = [], [], []
+    for variants in REASON_THEMES.values():
+        offsets.append(len(phrases))
+        sizes.append(len(variants))
+        phrases.extend(variants)
+    return np.array(phrases, dtype=object), np.array(offsets), np.array(sizes)
+
+
+def _chunk(
+    rng: np.random.Generator,
+    catalog: Catalog,
+    n: int,
+    first_order: int,
+    start: np.datetime64,
+    days: int,
+    lines_per_order: float,
+) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Generate `n` order lines (and their returns). Returns (orders, returns, next_order)."""
+    new_order = rng.random(n) < 1.0 / lines_per_order
+    new_order[0] = True
+    order_seq = np.cumsum(new_order) - 1
+    n_orders = int(order_seq[-1]) + 1
+    order_days = rng.integers(0, days, size=n_orders)
+
+    sku = catalog.sample(rng, n)
+    price = catalog.prices[sku]
+    quantity = 1 + rng.poisson(0.6, size=n)
+    gross = quantity * price
+    discounted = rng.random(n) < 0.2
+    discount = np.where(discounted, np.round(gross * rng.choice([0.05, 0.1, 0.15, 0.2], size=n), 2), 0.0)
+    order_date = start + order_days[order_seq].astype("timedelta64[D]")
+
+    returned = rng.random(n) < catalog.return_rates[sku]
+    amount = np.round(gross - discount, 2)
+    refund = np.where(returned, amount, 0.0)
+
+    orders = pd.DataFrame({
+        "order_id": first_order + order_seq,
+        "order_date": np.datetime_as_string(order_date, unit="D"),
+        "sku": catalog.names[sku],
+        "quantity": quantity,
+        "item_price": price,
+        "discount_amount": discount,
+        "refund_amount": refund,
+    })
+
+    r = np.flatnonzero(returned)
+    phrases, offsets, sizes = _reason_vocab()
+    theme = np.where(rng.random(len(r)) < 0.65, catalog.themes[sku[r]],
+                     rng.integers(0, len(sizes), size=len(r)))
+    phrase = offsets[theme] + (rng.random(len(r)) * sizes[theme]).astype(int)
+    returns = pd.DataFrame({
+        "order_id": orders["order_id"].to_numpy()[r],
+        "sku": catalog.names[sku[r]],
+        "return_date": np.datetime_as_string(
+            order_date[r] + rng.integers(1, 31, size=len(r)).astype("timedelta64[D]"), unit="D"
+        ),
+        "return_reason_text": phrases[phrase],
+        "return_amount": amount[r],
+    })
+    return orders, returns, first_order + n_orders
+
+
+def _to_uci(orders: pd.DataFrame, returns: pd.DataFrame) -> pd.DataFrame:
+    """UCI Online Retail layout: returns become negative-quantity 'C' invoices."""
+    qty = orders["quantity"].to_numpy()
+    sales = pd.DataFrame({
+        "InvoiceNo": orders["order_id"].astype(str),
+        "StockCode": orders["sku"],
+        "Description": orders["sku"],
+        "Quantity": qty,
+        "InvoiceDate": orders["order_date"],
+        "UnitPrice": orders["item_price"],
+        "CustomerID": 10000 + orders["order_id"] % 5000,
+        "Country": "United Kingdom",
+    })
+    returned = orders["refund_amount"].to_numpy() > 0
+    credits = sales[returned].copy()
+    credits["InvoiceNo"] = "C" + credits["InvoiceNo"]
+    credits["Quantity"] = -qty[returned]
+    credits["InvoiceDate"] = returns["return_date"].to_numpy()
+    return pd.concat([sales, credits], ignore_index=True)
+
+
+class _Writer:
+    """Appends DataFrame chunks to one CSV / gzip CSV / Parquet file."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path, self.fmt, self.rows = path, fmt, 0
+        self._fh = None
+        self._pq = None
+        if fmt == "csv":
+            self._fh = open(path, "w", newline="", encoding="utf-8")
+        elif fmt == "csv.gz":
+            self._fh = gzip.open(path, "wt", compresslevel=6, newline="", encoding="utf-8")
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._pq.write_table(table)
+        else:
+            # Dates arrive pre-formatted; to_csv's per-cell date formatting is slow
+            df.to_csv(self._fh, index=False, header=self.rows == 0)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        if self._pq is not None:
+            self._pq.close()
+
+
+def generate_data(
+    lines: int = 300,
+    skus: int = 5,
+    zipf: float = 1.0,
+    start: str = "2025-01-01",
+    days: int = 60,
+    return_rate: float = 0.1,
+    lines_per_order: float = 1.0,
+    style: str = "standard",
+    fmt: str = "csv",
+    out_dir: str = ".",
+    prefix: str = "test_",
+    seed: int | None = 0,
+    chunk_rows: int = 1_000_000,
+) -> dict[str, int | str]:
+    """
+    Write `<prefix>orders.<fmt>` (and `<prefix>returns.<fmt>` unless style is
+    uci) into `out_dir`. Returns paths and row counts.
+    """
+    if style not in STYLES:
+        raise ValueError(f"style must be one of {', '.join(STYLES)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        import pyarrow  # noqa: F401  (fail before writing anything)
+
+    os.makedirs(out_dir, exist_ok=True)
+    seq = np.random.SeedSequence(seed)
+    catalog = Catalog(np.random.default_rng(seq.spawn(1)[0]), skus, zipf, return_rate)
+
+    orders_w = _Writer(os.path.join(out_dir, f"{prefix}orders.{fmt}"), fmt)
+    returns_w = None if style == "uci" else _Writer(os.path.join(out_dir, f"{prefix}returns.{fmt}"), fmt)
+    next_order = 100000
+    start_day = np.datetime64(start, "D")
+    remaining = lines
+    try:
+        for child in seq.spawn(max(1, -(-lines // chunk_rows))):
+            n = min(chunk_rows, remaining)
+            if n <= 0:
+                break
+            orders, returns, next_order = _chunk(
+                np.random.default_rng(child), catalog, n, next_order,
+                start_day, days, lines_per_order,
+            )
+            if style == "uci":
+                orders_w.write(_to_uci(orders, returns))
+            else:
+                orders_w.write(orders.rename(columns=ORDER_HEADERS[style]))
+                returns_w.write(returns.rename(columns=RETURN_HEADERS[style]))
+            remaining -= n
+    finally:
+        orders_w.close()
+        if returns_w is not None:
+            returns_w.close()
+
+    result: dict[str, int | str] = {"orders_path": orders_w.path, "orders_rows": orders_w.rows}
+    if returns_w is not None:
+        result.update(returns_path=returns_w.path, returns_rows=returns_w.rows)
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic orders/returns data.")
+    parser.add_argument("--lines", type=int, default=300, help="order lines to write")
+    parser.add_argument("--skus", type=int, default=5, help="catalog size")
+    parser.add_argument("--zipf", type=float, default=1.0, help="popularity skew exponent")
+    parser.add_argument("--start", default="2025-01-01", help="first order date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=60, help="order date span in days")
+    parser.add_argument("--return-rate", type=float, default=0.1)
+    parser.add_argument("--lines-per-order", type=float, default=1.0,
+                        help="mean order lines per order id")
+    parser.add_argument("--style", choices=STYLES, default="standard")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="csv")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--prefix", default="test_")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = generate_data(**vars(args))
+    elapsed = time.perf_counter() - started
+    print(f"Generated {result['orders_rows']:,} order rows in {result['orders_path']}")
+    if "returns_path" in result:
+        print(f"Generated {result['returns_rows']:,} returns in {result['returns_path']}")
+    print(f"Done in {elapsed:.1f}s")
+
 
 if __name__ == "__main__":
-    generate_data()
+    main()
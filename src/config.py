@@ -10,6 +10,10 @@ load_dotenv()
 # ── LLM ──────────────────────────────────────────────────────────────────────
 OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-5")
+# Point the client at any OpenAI-compatible endpoint (e.g. fake_llm_server.py)
+OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+# Stream rank_actions completions and publish actions as they are parsed
+LLM_STREAMING: bool = os.getenv("LLM_STREAMING", "true").lower() == "true"
 
 # ── Thresholds (deterministic) ───────────────────────────────────────────────
 RETURN_RATE_THRESHOLD: float = float(os.getenv("RETURN_RATE_THRESHOLD", "0.10"))
@@ -24,7 +28,62 @@ TOP3_HIGH_THRESHOLD: float = 0.65
 FLASK_DEBUG: bool = os.getenv("FLASK_DEBUG", "false").lower() == "true"
 PORT: int = int(os.getenv("PORT", "5000"))
 CURRENCY: str = os.getenv("CURRENCY", "CAD")
+# Paginated access to large report arrays (GET /v1/runs/<id>?page=...)
+DEFAULT_PAGE_LIMIT: int = int(os.getenv("DEFAULT_PAGE_LIMIT", "100"))
+MAX_PAGE_LIMIT: int = int(os.getenv("MAX_PAGE_LIMIT", "1000"))
+MAX_BATCH_RUNS: int = int(os.getenv("MAX_BATCH_RUNS", "200"))
+# SKUs inlined in profiling.sku_revenue_breakdown; the rest go to GET /v1/runs/<id>/skus
+SKU_BREAKDOWN_TOP_N: int = int(os.getenv("SKU_BREAKDOWN_TOP_N", "50"))
+# Run store: "memory" (process-local) or "sqlite" (shared file, multi-worker)
+RUN_STORE_BACKEND: str = os.getenv("RUN_STORE_BACKEND", "memory").lower()
+RUN_STORE_PATH: str = os.getenv("RUN_STORE_PATH", "data/runs.db")
+# Memory store limits: serialized bytes of resident finished reports before
+# LRU spill to RUN_SPILL_DIR, and how long finished runs are kept (0 = forever)
+RUN_STORE_MEMORY_MB: int = int(os.getenv("RUN_STORE_MEMORY_MB", "256"))
+RUN_TTL_HOURS: float = float(os.getenv("RUN_TTL_HOURS", "168"))
+RUN_SPILL_DIR: str = os.getenv("RUN_SPILL_DIR", "data/spill")
+# Comment line sent on idle SSE streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# Opt-in per-run profiling (POST /v1/runs profile=true) and its stack-sample period
+RUN_PROFILING_ENABLED: bool = os.getenv("RUN_PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# How often RSS is sampled while a pipeline stage runs (its peak_rss_delta_mb)
+STAGE_RSS_SAMPLE_MS: float = float(os.getenv("STAGE_RSS_SAMPLE_MS", "10"))
+# Trace spans (OTLP/JSON lines) to a size-rotated local file; {pid} = one file per worker
+TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_FILE: str = os.getenv("TRACE_FILE", "data/traces/spans-{pid}.jsonl")
+TRACE_FILE_MAX_MB: float = float(os.getenv("TRACE_FILE_MAX_MB", "50"))
+TRACE_FILE_BACKUPS: int = int(os.getenv("TRACE_FILE_BACKUPS", "5"))
+TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "margintel-api")
+
+# ── Run scheduling / backpressure ────────────────────────────────────────────
+WORKER_POOL_SIZE: int = int(os.getenv("WORKER_POOL_SIZE", "4"))
+JOB_QUEUE_MAX: int = int(os.getenv("JOB_QUEUE_MAX", "32"))
+# Client-supplied `priority` is clamped to [-MAX_RUN_PRIORITY, MAX_RUN_PRIORITY]
+MAX_RUN_PRIORITY: int = int(os.getenv("MAX_RUN_PRIORITY", "3"))
+# Parsed DataFrame bytes allowed across queued + running jobs
+MAX_INFLIGHT_DATASET_MB: int = int(os.getenv("MAX_INFLIGHT_DATASET_MB", "1024"))
+# Where the deterministic stages run: "thread" (in-process) or "process" (pool)
+EXECUTION_BACKEND: str = os.getenv("EXECUTION_BACKEND", "thread").lower()
+PROCESS_POOL_SIZE: int = int(os.getenv("PROCESS_POOL_SIZE", "0"))  # 0 = cpu count
+# Dataframe engine for loading + the deterministic stages: "pandas",
+# "polars" (multithreaded) or "duckdb" (out-of-core SQL); the last two are
+# optional packages. POST /v1/runs engine=... overrides it per run
+DATAFRAME_ENGINE: str = os.getenv("DATAFRAME_ENGINE", "pandas").lower()
+# DuckDB engine: buffer-pool cap, the directory it spills to beyond it, threads
+DUCKDB_MEMORY_LIMIT: str = os.getenv("DUCKDB_MEMORY_LIMIT", "1GB")
+DUCKDB_TEMP_DIR: str = os.getenv("DUCKDB_TEMP_DIR", "data/duckdb")
+DUCKDB_THREADS: int = int(os.getenv("DUCKDB_THREADS", "0"))  # 0 = cpu count
 
 # ── LLM sampling defaults ───────────────────────────────────────────────────
 MAX_REASON_SAMPLES: int = int(os.getenv("MAX_REASON_SAMPLES", "80"))
 MAX_ACTIONS: int = 7
+DEFAULT_BUSINESS_GOAL: str = "Maximize contribution margin"
+# Upper bound on business goals fanned out within a single run
+MAX_GOALS_PER_RUN: int = int(os.getenv("MAX_GOALS_PER_RUN", "5"))
+# Token budget for the rank_actions INPUT JSON (compacted when exceeded)
+PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# tiktoken encoding used to count prompt tokens (optional; chars/4 without it),
+# and how long to wait for it to load — it downloads when not cached
+TOKENIZER_ENCODING: str = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+TOKENIZER_LOAD_TIMEOUT_SECONDS: float = float(os.getenv("TOKENIZER_LOAD_TIMEOUT_SECONDS", "5"))
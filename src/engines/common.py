@@ -0,0 +1,35 @@
+"""
+What the non-pandas engines share to reproduce the pandas loaders.
+
+pandas semantics are kept where they affect results: pandas' NA strings,
+numeric coercion (unparseable → 0), pandas' date-format inference from the
+first value, null SKUs left out of group-bys, and SKU order for ties.
+Dependency analysis only reads profiling["_sku_revenue"], so every engine
+hands its frame straight to revenue_dependency.analyze_dependency.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+
+# Strings pandas.read_csv reads as missing by default
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def pandas_date_format(first_value) -> str | None:
+    """The strftime format pandas.to_datetime would infer from a column's first value."""
+    if not isinstance(first_value, str):
+        return None
+    from pandas.tseries.api import guess_datetime_format
+
+    return guess_datetime_format(first_value)
+
+
+def iso_day(value) -> str:
+    """YYYY-MM-DD for a date or datetime, "" for anything else (no dates)."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return str(value) if isinstance(value, date) else ""
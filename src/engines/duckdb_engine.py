@@ -0,0 +1,296 @@
+"""
+DuckDB engine — out-of-core analysis for datasets larger than RAM.
+
+Uploads are spooled to disk and loaded, typed and normalised by DuckDB into
+a table of an embedded database; profiling, return rates and the reason
+sample are then pushed down as SQL aggregates. DuckDB keeps at most
+DUCKDB_MEMORY_LIMIT of data in memory and spills tables and aggregation
+state to DUCKDB_TEMP_DIR beyond it, so only the per-SKU aggregates ever
+reach Python. The sections are assembled by the same helpers the pandas
+modules use, and pandas' loading rules are followed as described in
+src.engines.common. Parquet files (.parquet / .pq) are read as well as CSV.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+from types import SimpleNamespace
+from typing import Any
+
+import duckdb
+
+from src.config import (
+    DUCKDB_MEMORY_LIMIT, DUCKDB_TEMP_DIR, DUCKDB_THREADS, MAX_REASON_SAMPLES,
+)
+from src.engines.common import PANDAS_NA_VALUES, iso_day, pandas_date_format
+from src.schemas import returns_intelligence
+from src.services.profiler import rank_high_return_skus, summarize_profile
+from src.services.returns_analyzer import rank_refund_risk, rank_return_risk, top_reasons
+from src.services.revenue_dependency import analyze_dependency
+from src.utils.csv_loader import ORDER_NUMERIC_COLS, RETURN_NUMERIC_COLS, canonical_columns
+from src.utils.validators import validate_orders, validate_returns
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _scan(path: str, text_cols: list[str] = (), sample_all: bool = False) -> tuple[str, list]:
+    """A table-function expression reading `path`, and its parameters."""
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        return "read_parquet(?)", [path]
+    params: list = [path, PANDAS_NA_VALUES]
+    sql = "read_csv(?, header=true, nullstr=?"
+    if sample_all:
+        # Type columns from every row, as pandas does (an extra pass)
+        sql += ", sample_size=-1"
+    if text_cols:
+        sql += ", types=?"
+        params.append({c: "VARCHAR" for c in text_cols})
+    return sql + ")", params
+
+
+def _numeric(col: str) -> str:
+    """Cast to double; anything unparseable, missing or NaN becomes 0."""
+    value = f"TRY_CAST({col} AS DOUBLE)"
+    return f"CASE WHEN isnan({value}) THEN 0.0 ELSE COALESCE({value}, 0.0) END"
+
+
+def _drop_table(db: duckdb.DuckDBPyConnection, name: str) -> None:
+    try:
+        with db.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+    except duckdb.Error:
+        pass  # database already closed
+
+
+def _shutdown(db: duckdb.DuckDBPyConnection, temp_dir: str) -> None:
+    db.close()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class DuckDBTable:
+    """
+    A loaded dataset: a table in the engine's database, dropped when this
+    handle is garbage-collected. `revenue` is the SQL expression for a line's
+    revenue (orders only); `source_bytes` is the size of the file it was
+    loaded from.
+    """
+
+    def __init__(self, db, name: str, columns: list[str], rows: int, revenue: str = "",
+                 source_bytes: int = 0):
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+        self.revenue = revenue
+        self.source_bytes = source_bytes
+        weakref.finalize(self, _drop_table, db, name)
+
+    def __len__(self) -> int:
+        return self.rows
+
+
+class DuckDBEngine:
+    name = "duckdb"
+
+    def __init__(self):
+        # One directory per process: DuckDB's spill file names are fixed
+        self._temp_dir = os.path.join(DUCKDB_TEMP_DIR, str(os.getpid()))
+        os.makedirs(self._temp_dir, exist_ok=True)
+        config: dict[str, Any] = {
+            "memory_limit": DUCKDB_MEMORY_LIMIT,
+            "temp_directory": os.path.join(self._temp_dir, "spill"),
+        }
+        if DUCKDB_THREADS:
+            config["threads"] = DUCKDB_THREADS
+        self._db = duckdb.connect(":memory:", config=config)
+        weakref.finalize(self, _shutdown, self._db, self._temp_dir)
+
+    # ── Loading ──────────────────────────────────────────────────────────
+
+    def load_orders(self, source) -> tuple[DuckDBTable, list[str]]:
+        path, spooled = self._local_path(source)
+        try:
+            return self._load(path, ORDER_NUMERIC_COLS, ["order_date"], validate_orders, orders=True)
+        finally:
+            if spooled:
+                os.remove(path)
+
+    def load_returns(self, source) -> tuple[DuckDBTable, list[str]]:
+        path, spooled = self._local_path(source)
+        try:
+            return self._load(path, RETURN_NUMERIC_COLS, ["return_date"], validate_returns)
+        finally:
+            if spooled:
+                os.remove(path)
+
+    def _local_path(self, source) -> tuple[str, bool]:
+        """A path DuckDB can scan; uploads are streamed to a temp file first."""
+        if isinstance(source, str):
+            return source, False
+        filename = (getattr(source, "filename", "") or "").lower()
+        suffix = next((s for s in (".csv.gz", *PARQUET_SUFFIXES) if filename.endswith(s)), ".csv")
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self._temp_dir)
+        with os.fdopen(fd, "wb") as fh:
+            while chunk := source.read(1 << 20):
+                fh.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        return path, True
+
+    def _load(self, path: str, numeric_cols: list[str], date_cols: list[str],
+              validate, orders: bool = False) -> tuple[DuckDBTable, list[str]]:
+        with self._db.cursor() as cur:
+            scan, params = _scan(path)
+            types = {row[0]: row[1] for row in
+                     cur.execute(f"DESCRIBE SELECT * FROM {scan}", params).fetchall()}
+            raw = list(types)
+            canonical = canonical_columns(raw)
+            notes = validate(SimpleNamespace(columns=canonical))
+
+            # CSV dates are read as text and parsed like pandas.to_datetime (below)
+            text_cols = [r for r, c in zip(raw, canonical) if c in date_cols]
+            if not path.lower().endswith(PARQUET_SUFFIXES):
+                types.update(dict.fromkeys(text_cols, "VARCHAR"))
+            scan, params = _scan(path, text_cols)
+
+            exprs: dict[str, str] = {}
+            for raw_name, col in zip(raw, canonical):
+                if col in exprs:
+                    continue  # a repeated name after normalisation: first wins
+                source_col = _quote(raw_name)
+                if col in numeric_cols:
+                    exprs[col] = _numeric(source_col)
+                elif col in date_cols:
+                    exprs[col] = self._date(cur, scan, params, source_col, types[raw_name])
+                else:
+                    exprs[col] = source_col
+            select = ", ".join(f"{expr} AS {_quote(col)}" for col, expr in exprs.items())
+            table = f"t_{uuid.uuid4().hex}"
+
+            def create(scan: str) -> str:
+                sql = f"SELECT {select} FROM {scan}"
+                if orders and "refund_amount" not in exprs:
+                    # UCI-style negative quantity lines are refunds (see csv_loader)
+                    sql = (
+                        "SELECT * REPLACE (CASE WHEN quantity < 0 THEN 0 ELSE quantity END AS quantity), "
+                        "CASE WHEN quantity < 0 THEN abs(quantity * item_price) ELSE 0.0 END AS refund_amount "
+                        f"FROM ({sql})"
+                    )
+                return f"CREATE TABLE {table} AS {sql}"
+
+            try:
+                cur.execute(create(scan), params)
+            except duckdb.ConversionException:
+                # A column changed type after the sniffed sample: type from all rows
+                scan, params = _scan(path, text_cols, sample_all=True)
+                cur.execute(create(scan), params)
+            columns = [row[0] for row in cur.execute(f"DESCRIBE {table}").fetchall()]
+            line_total = "SUM(line_total)" if "line_total" in columns else "0"
+            rows, line_total_sum = cur.execute(f"SELECT COUNT(*), {line_total} FROM {table}").fetchone()
+
+        revenue = ""
+        if orders:
+            if "line_total" in columns and (line_total_sum or 0) > 0:
+                revenue = "line_total"
+            else:
+                discount = " - discount_amount" if "discount_amount" in columns else ""
+                revenue = f"quantity * item_price{discount}"
+        return DuckDBTable(self._db, table, columns, int(rows), revenue,
+                           source_bytes=os.path.getsize(path)), notes
+
+    @staticmethod
+    def _date(cur, scan: str, params: list, col: str, col_type: str) -> str:
+        if col_type != "VARCHAR":
+            return f"TRY_CAST({col} AS TIMESTAMP)"
+        first = cur.execute(f"SELECT {col} FROM {scan} WHERE {col} IS NOT NULL LIMIT 1", params).fetchone()
+        fmt = pandas_date_format(first[0]) if first else None
+        if fmt is None:
+            return f"TRY_CAST({col} AS TIMESTAMP)"
+        return f"try_strptime({col}, '{fmt.replace(chr(39), chr(39) * 2)}')"
+
+    def frame_bytes(self, table: DuckDBTable) -> int:
+        # The table sits in DuckDB's buffer pool up to DUCKDB_MEMORY_LIMIT and in
+        # DUCKDB_TEMP_DIR beyond it; either way it costs about its source file
+        return table.source_bytes
+
+    # ── Aggregation ──────────────────────────────────────────────────────
+
+    def _fetch(self, sql: str, params: list | None = None) -> list[tuple]:
+        with self._db.cursor() as cur:
+            return cur.execute(sql, params).fetchall()
+
+    def _by_sku(self, table: DuckDBTable, expr: str, order: str = "sku") -> dict:
+        """{sku: aggregate} over non-null SKUs, in SKU order (like pandas groupby)."""
+        return dict(self._fetch(
+            f"SELECT sku, {expr} FROM {table.name} WHERE sku IS NOT NULL GROUP BY sku ORDER BY {order}"
+        ))
+
+    def profile(self, orders: DuckDBTable, returns: DuckDBTable | None) -> dict:
+        has_dates = "order_date" in orders.columns
+        total_revenue, total_orders, total_refunds, date_start, date_end = self._fetch(
+            f"SELECT COALESCE(SUM({orders.revenue}), 0), COUNT(DISTINCT order_id), "
+            "COALESCE(SUM(refund_amount), 0), "
+            + ("MIN(order_date), MAX(order_date)" if has_dates else "NULL, NULL")
+            + f" FROM {orders.name}"
+        )[0]
+
+        # Revenue descending, ties in SKU order. fsum is compensated like pandas'
+        # group-by sums, so near-equal revenues rank the same way
+        sku_revenue = self._by_sku(orders, f"fsum({orders.revenue})", order="2 DESC, sku")
+
+        if returns is not None and len(returns) > 0:
+            high_return_skus = rank_high_return_skus(
+                sku_revenue,
+                order_counts=self._by_sku(orders, "COUNT(DISTINCT order_id)"),
+                return_counts=self._by_sku(returns, "COUNT(*)"),
+            )
+        else:
+            high_return_skus = rank_high_return_skus(
+                sku_revenue, refunds=self._by_sku(orders, "fsum(refund_amount)"),
+            )
+
+        return summarize_profile(
+            total_revenue=float(total_revenue),
+            total_orders=int(total_orders),
+            total_refunds=float(total_refunds),
+            sku_revenue=sku_revenue,
+            high_return_skus=high_return_skus,
+            date_start=iso_day(date_start),
+            date_end=iso_day(date_end),
+        )
+
+    def analyze_returns(self, orders: DuckDBTable, returns: DuckDBTable | None,
+                        profiling: dict) -> dict[str, Any]:
+        sku_rev = profiling.get("_sku_revenue", {})
+        total_revenue = profiling.get("total_revenue", 1.0)
+        if returns is not None and len(returns) > 0:
+            top_risk_skus = rank_return_risk(
+                self._by_sku(orders, "COUNT(DISTINCT order_id)"),
+                self._by_sku(returns, "COUNT(*)"),
+                sku_rev,
+                total_revenue,
+            )
+        else:
+            top_risk_skus = rank_refund_risk(
+                self._by_sku(orders, "fsum(refund_amount)"), sku_rev, total_revenue,
+            )
+        return returns_intelligence(themes=[], top_risk_skus=top_risk_skus)
+
+    def reason_sample(self, returns: DuckDBTable | None) -> list[dict]:
+        if returns is None or len(returns) == 0 or "return_reason_text" not in returns.columns:
+            return []
+        rows = self._fetch(
+            f"SELECT sku, return_reason_text, COUNT(*) AS n FROM {returns.name} "
+            "WHERE sku IS NOT NULL AND return_reason_text IS NOT NULL "
+            "GROUP BY sku, return_reason_text ORDER BY n DESC, sku, return_reason_text LIMIT ?",
+            [MAX_REASON_SAMPLES],
+        )
+        return top_reasons(((sku, reason), n) for sku, reason, n in rows)
+
+    def analyze_dependency(self, orders: DuckDBTable, profiling: dict) -> dict[str, Any]:
+        return analyze_dependency(orders, profiling)
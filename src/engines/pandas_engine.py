@@ -0,0 +1,40 @@
+"""
+pandas engine — the existing loaders and analysis modules, unchanged.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pandas as pd
+
+from src.services.profiler import profile_orders
+from src.services.returns_analyzer import analyze_returns, build_reason_sample
+from src.services.revenue_dependency import analyze_dependency
+from src.utils.csv_loader import load_orders_csv, load_returns_csv
+
+
+class PandasEngine:
+    name = "pandas"
+
+    def load_orders(self, source) -> tuple[pd.DataFrame, list[str]]:
+        return load_orders_csv(source)
+
+    def load_returns(self, source) -> tuple[pd.DataFrame, list[str]]:
+        return load_returns_csv(source)
+
+    def frame_bytes(self, df: pd.DataFrame) -> int:
+        return int(df.memory_usage(deep=True).sum())
+
+    def profile(self, orders: pd.DataFrame, returns: pd.DataFrame | None) -> dict:
+        return profile_orders(orders, returns)
+
+    def analyze_returns(self, orders: pd.DataFrame, returns: pd.DataFrame | None,
+                        profiling: dict) -> dict[str, Any]:
+        return analyze_returns(orders, returns, profiling, llm=None)
+
+    def reason_sample(self, returns: pd.DataFrame | None) -> list[dict]:
+        return build_reason_sample(returns)
+
+    def analyze_dependency(self, orders: pd.DataFrame, profiling: dict) -> dict[str, Any]:
+        return analyze_dependency(orders, profiling)
@@ -0,0 +1,203 @@
+"""
+Polars engine — loading and the deterministic aggregations on Polars.
+
+Polars parses CSVs and runs group-bys on all cores and stores columns in
+Arrow buffers, so large uploads profile several times faster and in less
+memory than with pandas. Only the aggregation is done here; the sections are
+assembled by the same helpers the pandas modules use, and pandas' loading
+rules are followed as described in src.engines.common.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any
+
+import polars as pl
+
+from src.config import MAX_REASON_SAMPLES
+from src.engines.common import PANDAS_NA_VALUES, iso_day, pandas_date_format
+from src.schemas import returns_intelligence
+from src.services.profiler import rank_high_return_skus, summarize_profile
+from src.services.returns_analyzer import rank_refund_risk, rank_return_risk, top_reasons
+from src.services.revenue_dependency import analyze_dependency
+from src.utils.csv_loader import ORDER_NUMERIC_COLS, RETURN_NUMERIC_COLS, canonical_columns
+from src.utils.validators import validate_orders, validate_returns
+
+INFER_SCHEMA_ROWS = 10_000
+
+
+def _read_csv(source) -> pl.DataFrame:
+    """Read from a path, a Flask FileStorage or StringIO, with canonical column names."""
+    if isinstance(source, str):
+        data = source
+    else:
+        raw = source.read()
+        # pl.read_csv takes a str as a path: text goes in as bytes
+        data = io.BytesIO(raw.encode("utf-8") if isinstance(raw, str) else raw)
+    try:
+        df = pl.read_csv(data, infer_schema_length=INFER_SCHEMA_ROWS,
+                         null_values=PANDAS_NA_VALUES)
+    except pl.exceptions.ComputeError:
+        # A column changed type after the inference window: infer from all rows
+        if not isinstance(data, str):
+            data.seek(0)
+        df = pl.read_csv(data, infer_schema_length=None, null_values=PANDAS_NA_VALUES)
+    return df.rename(dict(zip(df.columns, canonical_columns(df.columns))))
+
+
+def _coerce_numeric(df: pl.DataFrame, cols: list[str]) -> pl.DataFrame:
+    """Cast to float; anything unparseable or missing becomes 0."""
+    exprs = [
+        pl.col(c).cast(pl.Float64, strict=False).fill_nan(0.0).fill_null(0.0)
+        for c in cols if c in df.columns
+    ]
+    return df.with_columns(exprs) if exprs else df
+
+
+def _coerce_dates(df: pl.DataFrame, cols: list[str]) -> pl.DataFrame:
+    for c in cols:
+        if c not in df.columns or df.schema[c] in (pl.Date, pl.Datetime):
+            continue
+        if df.schema[c] == pl.String:
+            first = df.get_column(c).drop_nulls().head(1).to_list()
+            fmt = pandas_date_format(first[0]) if first else None
+            if fmt is not None:
+                df = df.with_columns(pl.col(c).str.to_datetime(fmt, strict=False))
+                continue
+        df = df.with_columns(_dates_via_pandas(df.get_column(c)))
+    return df
+
+
+def _dates_via_pandas(series: pl.Series) -> pl.Series:
+    # Mixed or unusual formats: let pandas parse them value by value
+    import pandas as pd
+
+    parsed = pd.to_datetime(pd.Series(series.to_list(), dtype=object), errors="coerce")
+    return pl.Series(series.name, [None if pd.isna(v) else v.to_pydatetime() for v in parsed],
+                     dtype=pl.Datetime)
+
+
+def _by_sku(df: pl.DataFrame, expr: pl.Expr) -> dict:
+    """{sku: aggregate} over non-null SKUs, in SKU order (like pandas groupby)."""
+    out = (
+        df.filter(pl.col("sku").is_not_null())
+        .group_by("sku")
+        .agg(expr.alias("value"))
+        .sort("sku")
+    )
+    return dict(zip(out.get_column("sku").to_list(), out.get_column("value").to_list()))
+
+
+class PolarsEngine:
+    name = "polars"
+
+    def load_orders(self, source) -> tuple[pl.DataFrame, list[str]]:
+        df = _read_csv(source)
+        notes = validate_orders(df)
+        df = _coerce_numeric(df, ORDER_NUMERIC_COLS)
+        df = _coerce_dates(df, ["order_date"])
+
+        quantity, price = pl.col("quantity"), pl.col("item_price")
+        # UCI-style negative quantity lines are refunds (see csv_loader)
+        if "refund_amount" not in df.columns:
+            df = df.with_columns(
+                refund_amount=pl.when(quantity < 0).then((quantity * price).abs()).otherwise(0.0),
+                quantity=pl.when(quantity < 0).then(0.0).otherwise(quantity),
+            )
+
+        if "line_total" in df.columns and df.get_column("line_total").sum() > 0:
+            revenue = pl.col("line_total")
+        else:
+            discount = pl.col("discount_amount") if "discount_amount" in df.columns else 0
+            revenue = quantity * price - discount
+        return df.with_columns(_revenue=revenue), notes
+
+    def load_returns(self, source) -> tuple[pl.DataFrame, list[str]]:
+        df = _read_csv(source)
+        notes = validate_returns(df)
+        df = _coerce_numeric(df, RETURN_NUMERIC_COLS)
+        df = _coerce_dates(df, ["return_date"])
+        return df, notes
+
+    def frame_bytes(self, df: pl.DataFrame) -> int:
+        return int(df.estimated_size())
+
+    def profile(self, orders: pl.DataFrame, returns: pl.DataFrame | None) -> dict:
+        has_refunds = "refund_amount" in orders.columns
+        has_dates = "order_date" in orders.columns
+        totals = orders.select(
+            total_revenue=pl.col("_revenue").sum(),
+            total_orders=pl.col("order_id").drop_nulls().n_unique(),
+            total_refunds=pl.col("refund_amount").sum() if has_refunds else pl.lit(0.0),
+            date_start=pl.col("order_date").min() if has_dates else pl.lit(None),
+            date_end=pl.col("order_date").max() if has_dates else pl.lit(None),
+        ).row(0, named=True)
+
+        # Revenue descending; the SKU-ordered group-by breaks ties
+        sku_revenue = dict(sorted(
+            _by_sku(orders, pl.col("_revenue").sum()).items(),
+            key=lambda kv: kv[1], reverse=True,
+        ))
+
+        if returns is not None and len(returns) > 0:
+            high_return_skus = rank_high_return_skus(
+                sku_revenue,
+                order_counts=_by_sku(orders, pl.col("order_id").drop_nulls().n_unique()),
+                return_counts=_by_sku(returns, pl.len()),
+            )
+        elif has_refunds:
+            high_return_skus = rank_high_return_skus(
+                sku_revenue, refunds=_by_sku(orders, pl.col("refund_amount").sum()),
+            )
+        else:
+            high_return_skus = []
+
+        return summarize_profile(
+            total_revenue=float(totals["total_revenue"] or 0.0),
+            total_orders=int(totals["total_orders"]),
+            total_refunds=float(totals["total_refunds"] or 0.0),
+            sku_revenue=sku_revenue,
+            high_return_skus=high_return_skus,
+            date_start=iso_day(totals["date_start"]),
+            date_end=iso_day(totals["date_end"]),
+        )
+
+    def analyze_returns(self, orders: pl.DataFrame, returns: pl.DataFrame | None,
+                        profiling: dict) -> dict[str, Any]:
+        sku_rev = profiling.get("_sku_revenue", {})
+        total_revenue = profiling.get("total_revenue", 1.0)
+        if returns is not None and len(returns) > 0:
+            top_risk_skus = rank_return_risk(
+                _by_sku(orders, pl.col("order_id").drop_nulls().n_unique()),
+                _by_sku(returns, pl.len()),
+                sku_rev,
+                total_revenue,
+            )
+        elif "refund_amount" in orders.columns:
+            top_risk_skus = rank_refund_risk(
+                _by_sku(orders, pl.col("refund_amount").sum()), sku_rev, total_revenue,
+            )
+        else:
+            top_risk_skus = []
+        return returns_intelligence(themes=[], top_risk_skus=top_risk_skus)
+
+    def reason_sample(self, returns: pl.DataFrame | None) -> list[dict]:
+        if returns is None or len(returns) == 0 or "return_reason_text" not in returns.columns:
+            return []
+        keys = ["sku", "return_reason_text"]
+        counts = (
+            returns.filter(pl.col("sku").is_not_null() & pl.col("return_reason_text").is_not_null())
+            .group_by(keys)
+            .len()
+            .sort(keys)
+            .sort("len", descending=True, maintain_order=True)
+            .head(MAX_REASON_SAMPLES)
+        )
+        return top_reasons(zip(
+            zip(counts.get_column("sku").to_list(), counts.get_column("return_reason_text").to_list()),
+            counts.get_column("len").to_list(),
+        ))
+
+    def analyze_dependency(self, orders: pl.DataFrame, profiling: dict) -> dict[str, Any]:
+        return analyze_dependency(orders, profiling)
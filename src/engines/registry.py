@@ -0,0 +1,68 @@
+"""
+Dataframe engines for ingestion and the deterministic core.
+
+  pandas   the reference implementation (src.services.*); single-threaded
+  polars   columnar and multithreaded; needs the optional `polars` package
+  duckdb   out-of-core SQL for datasets larger than RAM; needs `duckdb`
+
+An engine reads the uploaded CSVs into its own frame type and computes the
+profile, returns and dependency sections from it. Each engine only does the
+aggregation; the sections are assembled by the shared helpers in
+src.services (summarize_profile, rank_return_risk, ...), and
+tests/test_engines.py checks that all engines produce identical sections.
+
+The engine is chosen per run (POST /v1/runs engine=...) and defaults to
+DATAFRAME_ENGINE. Engines are stateless, so one instance per name is shared.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import threading
+
+from src.config import DATAFRAME_ENGINE
+
+ENGINES = ("pandas", "polars", "duckdb")
+# Optional package each engine needs beyond the core requirements
+_REQUIRES = {"polars": "polars", "duckdb": "duckdb"}
+
+_instances: dict = {}
+_lock = threading.Lock()
+
+
+def available_engines() -> list[str]:
+    """Engines whose dependencies are installed."""
+    return [
+        name for name in ENGINES
+        if name not in _REQUIRES or importlib.util.find_spec(_REQUIRES[name]) is not None
+    ]
+
+
+def check_engine(name: str | None = None) -> str:
+    """
+    The normalised engine name (default DATAFRAME_ENGINE). Raises ValueError
+    for an unknown name and ImportError when its package is missing.
+    """
+    name = (name or DATAFRAME_ENGINE).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown dataframe engine {name!r}; expected one of {ENGINES}")
+    if name not in available_engines():
+        raise ImportError(f"Dataframe engine {name!r} needs the {_REQUIRES[name]!r} package")
+    return name
+
+
+def get_engine(name: str | None = None):
+    """The engine called `name` (default DATAFRAME_ENGINE); see check_engine."""
+    name = check_engine(name)
+    with _lock:
+        if name not in _instances:
+            if name == "polars":
+                from src.engines.polars_engine import PolarsEngine
+                _instances[name] = PolarsEngine()
+            elif name == "duckdb":
+                from src.engines.duckdb_engine import DuckDBEngine
+                _instances[name] = DuckDBEngine()
+            else:
+                from src.engines.pandas_engine import PandasEngine
+                _instances[name] = PandasEngine()
+        return _instances[name]
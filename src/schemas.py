@@ -77,3 +77,19 @@ def decision_output(
         "limitations": limitations,
         "next_questions": next_questions,
     }
+
+
+def goal_decision_section(
+    business_goal: str,
+    constraints: str,
+    decision: dict[str, Any],
+) -> dict[str, Any]:
+    return {
+        "business_goal": business_goal,
+        "constraints": constraints,
+        **decision_output(
+            ranked_actions=decision.get("ranked_actions", []),
+            limitations=decision.get("limitations", []),
+            next_questions=decision.get("next_questions", []),
+        ),
+    }
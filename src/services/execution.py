@@ -0,0 +1,251 @@
+"""
+Execution backends for the deterministic core (profile → returns → dependency).
+
+  thread  — stages run inline on the scheduler's worker thread (default)
+  process — stages run in a process pool, sidestepping the GIL; DataFrames
+            cross the boundary through shared memory (see utils.shared_frames)
+            rather than as pickled copies
+
+The stages themselves are computed by a dataframe engine (src.engines):
+pandas by default. Only pandas frames go through the process pool; other
+engines parallelise internally and run on the calling thread.
+
+LLM calls are I/O-bound and always stay on threads in RunService; the core
+returns the reason sample so theme clustering can happen there. It also
+returns its per-stage `timings` records (measured wherever the stages ran);
+a worker process also returns its trace spans for the parent to export.
+Stage progress from a worker comes back over the pool's progress queue and
+is handed to the run's callback by a relay thread in the parent.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from src.utils import tracing
+from src.utils.instrumentation import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ProgressFn = Optional[Callable[[int, str], None]]
+
+EXECUTION_BACKENDS = ("thread", "process")
+
+
+def run_deterministic_core(
+    orders_df: pd.DataFrame,
+    returns_df: pd.DataFrame | None,
+    progress: ProgressFn = None,
+    engine=None,
+) -> dict[str, Any]:
+    """
+    Run every CPU-bound stage with `engine` (default pandas; the frames must
+    be that engine's). Returns profiling, returns_signals (themes still
+    empty), reason_sample, dependency and the stage timings.
+    """
+    # Engines pull in pandas/polars; load them on first run
+    from src.engines.registry import get_engine
+
+    engine = engine or get_engine("pandas")
+    timings: list[dict] = []
+    orders_rows = len(orders_df)
+    returns_rows = len(returns_df) if returns_df is not None else 0
+
+    if progress:
+        progress(15, "Executing contribution models")
+    with stage(timings, "profile", rows_in=orders_rows + returns_rows) as rec:
+        profiling = engine.profile(orders_df, returns_df)
+        rec["rows_out"] = len(profiling.get("_sku_revenue", {}))
+
+    if progress:
+        progress(35, "Correlating return signatures")
+    with stage(timings, "returns", rows_in=returns_rows) as rec:
+        returns_signals = engine.analyze_returns(orders_df, returns_df, profiling)
+        reason_sample = engine.reason_sample(returns_df)
+        rec["rows_out"] = len(reason_sample)
+
+    if progress:
+        progress(55, "Mapping revenue dependency risk")
+    with stage(timings, "dependency", rows_in=orders_rows):
+        dependency = engine.analyze_dependency(orders_df, profiling)
+
+    return {
+        "profiling": profiling,
+        "returns_signals": returns_signals,
+        "reason_sample": reason_sample,
+        "dependency": dependency,
+        "timings": timings,
+    }
+
+
+# Set in each pool worker by _init_worker; (token, pct, label) tuples go to the parent
+_progress_queue = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _core_in_worker(orders_handle: dict, returns_handle: dict | None,
+                    trace_ctx: tracing.SpanContext | None = None,
+                    token: str | None = None) -> dict[str, Any]:
+    """Process-pool entry point: attach shared frames, run the core, detach."""
+    from src.utils.shared_frames import attach_frame, release
+
+    progress: ProgressFn = None
+    if token is not None and _progress_queue is not None:
+        def progress(pct: int, label: str) -> None:
+            _progress_queue.put((token, pct, label))
+
+    orders_df, orders_shm = attach_frame(orders_handle)
+    returns_df, returns_shm = (None, None)
+    if returns_handle is not None:
+        returns_df, returns_shm = attach_frame(returns_handle)
+    try:
+        if trace_ctx is None:
+            return run_deterministic_core(orders_df, returns_df, progress)
+        with tracing.collect() as spans, tracing.attach(trace_ctx):
+            result = run_deterministic_core(orders_df, returns_df, progress)
+        result["spans"] = spans
+        return result
+    finally:
+        if progress is not None:
+            # Marks the end of this run's updates, so none land after run_core returns
+            _progress_queue.put((token, None, None))
+        # Drop the views before closing the mappings
+        del orders_df, returns_df
+        release(orders_shm)
+        if returns_shm is not None:
+            release(returns_shm)
+
+
+class ThreadBackend:
+    name = "thread"
+
+    def run_core(self, orders_df, returns_df, progress: ProgressFn = None,
+                 engine=None) -> dict[str, Any]:
+        return run_deterministic_core(orders_df, returns_df, progress, engine)
+
+
+class ProcessBackend:
+    """Runs the core in a lazily started, spawn-based ProcessPoolExecutor."""
+
+    name = "process"
+    # How long run_core waits for a worker's trailing progress after its result
+    PROGRESS_DRAIN_SECONDS = 1.0
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        self._progress_queue = None
+        self._relay: threading.Thread | None = None
+        # token → (progress callback, set once the worker sent its last update)
+        self._listeners: dict[str, tuple[ProgressFn, threading.Event]] = {}
+        self._listeners_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a multi-threaded Flask process is unsafe
+                ctx = multiprocessing.get_context("spawn")
+                self._progress_queue = ctx.Queue()
+                self._relay = threading.Thread(
+                    target=self._relay_progress, args=(self._progress_queue,),
+                    name="process-progress-relay", daemon=True,
+                )
+                self._relay.start()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,),
+                )
+                logger.info("Process pool started (%d workers)", self.workers)
+            return self._pool
+
+    def _relay_progress(self, queue) -> None:
+        """Hand worker progress to the submitting run's callback until shutdown."""
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            token, pct, label = item
+            with self._listeners_lock:
+                listener = self._listeners.get(token)
+            if listener is None:
+                continue
+            callback, finished = listener
+            if pct is None:
+                finished.set()
+                continue
+            try:
+                callback(pct, label)
+            except Exception:
+                logger.exception("Progress callback failed")
+
+    def run_core(self, orders_df, returns_df, progress: ProgressFn = None,
+                 engine=None) -> dict[str, Any]:
+        if engine is not None and engine.name != "pandas":
+            # Shared-memory frames are pandas-only; the engine is multithreaded anyway
+            return run_deterministic_core(orders_df, returns_df, progress, engine)
+        from src.utils.shared_frames import release, share_frame
+
+        if progress:
+            progress(15, "Executing contribution models (process pool)")
+        blocks = []
+        token = finished = None
+        try:
+            orders_handle, shm = share_frame(orders_df)
+            blocks.append(shm)
+            returns_handle = None
+            if returns_df is not None:
+                returns_handle, shm = share_frame(returns_df)
+                blocks.append(shm)
+            pool = self._get_pool()
+            if progress:
+                token, finished = uuid.uuid4().hex, threading.Event()
+                with self._listeners_lock:
+                    self._listeners[token] = (progress, finished)
+            future = pool.submit(
+                _core_in_worker, orders_handle, returns_handle, tracing.current_context(), token,
+            )
+            result = future.result()
+            if finished is not None:
+                finished.wait(self.PROGRESS_DRAIN_SECONDS)
+            tracing.export_spans(result.pop("spans", []))
+            return result
+        finally:
+            if token is not None:
+                with self._listeners_lock:
+                    self._listeners.pop(token, None)
+            for shm in blocks:
+                release(shm, unlink=True)
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+                self._progress_queue.put(None)
+                self._relay.join()
+                self._progress_queue.close()
+                self._progress_queue = self._relay = None
+
+
+def make_backend(name: str, workers: int = 0):
+    if name == "thread":
+        return ThreadBackend()
+    if name == "process":
+        return ProcessBackend(workers)
+    raise ValueError(f"Unknown execution backend {name!r}; expected one of {EXECUTION_BACKENDS}")
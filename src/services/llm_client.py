@@ -6,16 +6,33 @@ Two prompts:
   2. rank_actions            — decision & action ranking
 
 Falls back gracefully when API key is missing (returns empty/placeholder data).
+
+rank_actions can stream: when an `on_action` callback is supplied (and
+LLM_STREAMING is on) each ranked action is handed over as soon as its JSON
+object is complete, long before the full completion arrives.
+
+Provider-reported token usage goes to the enclosing instrumentation stage
+(src.utils.instrumentation.add_llm_usage).
+
+The OpenAI SDK is imported and its client built on the first call, not at
+construction, so creating an LLMClient (and importing the app) stays cheap.
 """
 
 from __future__ import annotations
 
 import json
 import logging
-from typing import Any
+import threading
+from typing import Any, Callable, Optional
 
-from src.config import OPENAI_API_KEY, LLM_MODEL, MAX_ACTIONS
+from src.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_MODEL,
+    LLM_STREAMING, MAX_ACTIONS,
+)
 from src.utils.decorators import retry_on_exception
+from src.utils.instrumentation import add_llm_usage
+from src.utils.json_stream import StreamingArrayParser
+from src.services.prompt_builder import build_rank_actions_input
 
 logger = logging.getLogger(__name__)
 
@@ -23,21 +40,44 @@ logger = logging.getLogger(__name__)
 class LLMClient:
     """Thin wrapper around OpenAI Chat Completions for structured JSON."""
 
-    def __init__(self):
+    def __init__(self, api_key: str | None = None, base_url: str | None = None):
+        """
+        Defaults come from config. A base_url without a key is allowed so the
+        client can talk to a local OpenAI-compatible stand-in server.
+        """
+        self._api_key = OPENAI_API_KEY if api_key is None else api_key
+        self._base_url = OPENAI_BASE_URL if base_url is None else base_url
+
         self._client = None
-        if OPENAI_API_KEY:
-            try:
-                from openai import OpenAI
-                self._client = OpenAI(api_key=OPENAI_API_KEY)
-                logger.info("OpenAI client initialized (model=%s)", LLM_MODEL)
-            except Exception as exc:
-                logger.warning("OpenAI client init failed: %s", exc)
-        else:
+        self._init_failed = False
+        self._init_lock = threading.Lock()
+        if not (self._api_key or self._base_url):
             logger.info("No OPENAI_API_KEY set — LLM features disabled")
 
     @property
     def available(self) -> bool:
-        return self._client is not None
+        """Configured, and the SDK client has not failed to initialize."""
+        return bool(self._api_key or self._base_url) and not self._init_failed
+
+    def _get_client(self):
+        """The OpenAI client, built on first use (None when unavailable)."""
+        if self._client is None and self.available:
+            with self._init_lock:
+                if self._client is None and not self._init_failed:
+                    try:
+                        from openai import OpenAI
+                        self._client = OpenAI(
+                            api_key=self._api_key or "sk-local",
+                            base_url=self._base_url or None,
+                            # Retries are @retry_on_exception's alone; SDK ones would multiply them
+                            max_retries=0,
+                        )
+                        logger.info("OpenAI client initialized (model=%s%s)", LLM_MODEL,
+                                    f", base_url={self._base_url}" if self._base_url else "")
+                    except Exception as exc:
+                        logger.warning("OpenAI client init failed: %s", exc)
+                        self._init_failed = True
+        return self._client
 
     # ── Prompt 1: Return Reason Theme Clustering ─────────────────────────
 
@@ -85,23 +125,25 @@ class LLMClient:
         constraints: str,
         profiling: dict,
         modules: dict,
+        on_action: Optional[Callable[[int, dict], None]] = None,
     ) -> dict[str, Any]:
         """
         Produce ranked actions, limitations, next questions.
+        `_prompt_tokens` carries the size of the (budgeted) INPUT JSON.
+
+        If `on_action(index, action)` is given, the completion is streamed and
+        the callback fires once per ranked action as soon as it is parsed.
+        A retried stream re-emits from index 0, so callers should treat the
+        index as a slot to overwrite rather than append.
         """
         if not self.available:
             logger.info("LLM unavailable — returning placeholder decision output.")
             return _placeholder_decision()
 
-        # Strip internal keys from profiling before sending
-        clean_profiling = {k: v for k, v in profiling.items() if not k.startswith("_")}
-
-        input_payload = {
-            "business_goal": business_goal,
-            "constraints": constraints,
-            "profiling": clean_profiling,
-            "modules": modules,
-        }
+        # Budgeted + compacted INPUT JSON (internal keys stripped)
+        input_json, prompt_tokens = build_rank_actions_input(
+            business_goal, constraints, profiling, modules
+        )
 
         system_msg = (
             "You are an AI workflow engine that produces machine-usable decisions. "
@@ -115,7 +157,7 @@ class LLMClient:
             "- Use expected_impact in {low,medium,high}.\n"
             "- confidence is 0.0-1.0.\n"
             "- Include limitations and next_questions.\n\n"
-            f"INPUT JSON:\n{json.dumps(input_payload, default=str)}\n\n"
+            f"INPUT JSON:\n{input_json}\n\n"
             "OUTPUT JSON SCHEMA:\n"
             '{"ranked_actions": [{"rank": 1, "action_type": "data_fix|business_experiment|further_analysis", '
             '"title": "", "why_it_matters": "", "how_to_execute": ["",""], '
@@ -124,24 +166,29 @@ class LLMClient:
             '"limitations": ["",""], "next_questions": ["",""]}'
         )
 
-        raw = self._call(system_msg, user_msg)
+        if on_action and LLM_STREAMING:
+            raw = self._call_stream(system_msg, user_msg, "ranked_actions", on_action)
+        else:
+            raw = self._call(system_msg, user_msg)
         parsed = self._parse_json(raw)
 
         return {
             "ranked_actions": parsed.get("ranked_actions", []),
             "limitations": parsed.get("limitations", []),
             "next_questions": parsed.get("next_questions", []),
+            "_prompt_tokens": prompt_tokens,
         }
 
     # ── internals ────────────────────────────────────────────────────────
 
     @retry_on_exception(max_retries=3, initial_delay=1.0)
     def _call(self, system_msg: str, user_msg: str) -> str:
-        if not self._client:
+        client = self._get_client()
+        if not client:
             return ""
         try:
             logger.info("LLM call starting (model=%s)...", LLM_MODEL)
-            resp = self._client.chat.completions.create(
+            resp = client.chat.completions.create(
                 model=LLM_MODEL,
                 messages=[
                     {"role": "system", "content": system_msg},
@@ -151,6 +198,9 @@ class LLMClient:
                 max_tokens=4096,
                 response_format={"type": "json_object"},
             )
+            usage = getattr(resp, "usage", None)
+            if usage is not None:
+                add_llm_usage(usage.prompt_tokens, usage.completion_tokens)
             result = resp.choices[0].message.content or ""
             logger.info("LLM call success (%d chars)", len(result))
             return result
@@ -158,6 +208,58 @@ class LLMClient:
             logger.error("LLM API call failed: %s", exc)
             raise exc  # Raise to trigger retry decorator
 
+    @retry_on_exception(max_retries=3, initial_delay=1.0)
+    def _call_stream(
+        self,
+        system_msg: str,
+        user_msg: str,
+        array_key: str,
+        on_item: Callable[[int, dict], None],
+    ) -> str:
+        """Streaming variant of _call; emits items of `array_key` as they complete."""
+        client = self._get_client()
+        if not client:
+            return ""
+        parser = StreamingArrayParser(array_key)
+        parts: list[str] = []
+        try:
+            logger.info("LLM stream starting (model=%s)...", LLM_MODEL)
+            stream = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "user", "content": user_msg},
+                ],
+                temperature=0.2,
+                max_tokens=4096,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                # With include_usage the final chunk has no choices, only usage
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    add_llm_usage(usage.prompt_tokens, usage.completion_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                parts.append(delta)
+                new_items = parser.feed(delta)
+                first_index = len(parser.items) - len(new_items)
+                for offset, item in enumerate(new_items):
+                    if isinstance(item, dict):
+                        on_item(first_index + offset, item)
+            result = "".join(parts)
+            logger.info("LLM stream success (%d chars, %d items streamed)",
+                        len(result), len(parser.items))
+            return result
+        except Exception as exc:
+            logger.error("LLM streaming call failed: %s", exc)
+            raise exc  # Raise to trigger retry decorator
+
     @staticmethod
     def _parse_json(raw: str) -> dict:
         try:
@@ -3,6 +3,10 @@ DataProfiler — deterministic metrics used by all downstream modules.
 
 Inputs:  orders DataFrame (with pre-computed `_revenue` column)
 Outputs: profiling dict matching the output schema.
+
+`profile_orders` aggregates with pandas; `summarize_profile` and
+`rank_high_return_skus` turn aggregates into the section and are shared
+with the other dataframe engines.
 """
 
 from __future__ import annotations
@@ -34,7 +38,6 @@ def profile_orders(
 
     total_revenue = float(orders_df["_revenue"].sum())
     total_orders = int(orders_df["order_id"].nunique())
-    aov = total_revenue / total_orders if total_orders else 0.0
 
     # ── Refund totals ────────────────────────────────────────────────────
     total_refunds = 0.0
@@ -42,22 +45,27 @@ def profile_orders(
         total_refunds = float(orders_df["refund_amount"].sum())
 
     # ── Per-SKU revenue ──────────────────────────────────────────────────
+    # Stable sort: ties keep SKU order, so every engine ranks them the same
     sku_rev = (
         orders_df.groupby("sku")["_revenue"]
         .sum()
-        .sort_values(ascending=False)
+        .sort_values(ascending=False, kind="stable")
     )
-    total_for_share = sku_rev.sum() if sku_rev.sum() > 0 else 1.0
-    cumulative_shares = sku_rev.cumsum() / total_for_share
-
-    top_sku_revenue_share = {
-        "top1": float(cumulative_shares.iloc[0]) if len(cumulative_shares) >= 1 else 0.0,
-        "top3": float(cumulative_shares.iloc[min(2, len(cumulative_shares) - 1)]),
-        "top5": float(cumulative_shares.iloc[min(4, len(cumulative_shares) - 1)]),
-    }
+    sku_revenue = sku_rev.to_dict()
 
     # ── High-return SKUs ─────────────────────────────────────────────────
-    high_return_skus = _compute_high_return_skus(orders_df, returns_df, sku_rev)
+    if returns_df is not None and len(returns_df) > 0:
+        high_return_skus = rank_high_return_skus(
+            sku_revenue,
+            order_counts=orders_df.groupby("sku")["order_id"].nunique().to_dict(),
+            return_counts=returns_df.groupby("sku").size().to_dict(),
+        )
+    elif "refund_amount" in orders_df.columns:
+        high_return_skus = rank_high_return_skus(
+            sku_revenue, refunds=orders_df.groupby("sku")["refund_amount"].sum().to_dict(),
+        )
+    else:
+        high_return_skus = []
 
     # ── Date range ───────────────────────────────────────────────────────
     date_start, date_end = "", ""
@@ -67,6 +75,46 @@ def profile_orders(
             date_start = str(valid_dates.min().date())
             date_end = str(valid_dates.max().date())
 
+    return summarize_profile(
+        total_revenue=total_revenue,
+        total_orders=total_orders,
+        total_refunds=total_refunds,
+        sku_revenue=sku_revenue,
+        high_return_skus=high_return_skus,
+        date_start=date_start,
+        date_end=date_end,
+    )
+
+
+# ── Engine-independent assembly ──────────────────────────────────────────────
+# Dataframe engines (src.engines) compute the aggregates their own way and
+# finish with these, so every engine applies the same rules.
+
+def summarize_profile(
+    total_revenue: float,
+    total_orders: int,
+    total_refunds: float,
+    sku_revenue: dict,
+    high_return_skus: list[dict],
+    date_start: str = "",
+    date_end: str = "",
+) -> dict:
+    """
+    The profiling dict from aggregates. `sku_revenue` is {sku: revenue}
+    ordered by revenue descending (ties by SKU).
+    """
+    aov = total_revenue / total_orders if total_orders else 0.0
+
+    revenue = np.fromiter(sku_revenue.values(), dtype=float, count=len(sku_revenue))
+    total_for_share = revenue.sum() if revenue.sum() > 0 else 1.0
+    cumulative_shares = revenue.cumsum() / total_for_share
+
+    top_sku_revenue_share = {
+        "top1": float(cumulative_shares[0]) if len(cumulative_shares) >= 1 else 0.0,
+        "top3": float(cumulative_shares[min(2, len(cumulative_shares) - 1)]),
+        "top5": float(cumulative_shares[min(4, len(cumulative_shares) - 1)]),
+    }
+
     return {
         **profiling_section(
             total_revenue=total_revenue,
@@ -75,34 +123,36 @@ def profile_orders(
             top_sku_revenue_share=top_sku_revenue_share,
             high_return_skus=high_return_skus,
         ),
-        "_sku_revenue": sku_rev.to_dict(),   # internal, stripped before output
+        "_sku_revenue": sku_revenue,   # internal, stripped before output
         "_date_start": date_start,
         "_date_end": date_end,
         "_total_orders": total_orders,
     }
 
 
-def _compute_high_return_skus(
-    orders_df: pd.DataFrame,
-    returns_df: pd.DataFrame | None,
-    sku_rev: pd.Series,
+def rank_high_return_skus(
+    sku_revenue: dict,
+    order_counts: dict | None = None,
+    return_counts: dict | None = None,
+    refunds: dict | None = None,
 ) -> list[dict]:
     """
     Identify SKUs with elevated return / refund rates relative to revenue.
+
+    With `return_counts` (returns per SKU, in SKU order) and `order_counts`
+    (distinct orders per SKU) the rate is count-based; otherwise it falls
+    back to `refunds` (refund_amount per SKU) over revenue.
     """
     results: list[dict] = []
 
-    if returns_df is not None and len(returns_df) > 0:
+    if return_counts:
         # Count-based return rate
-        order_sku_counts = orders_df.groupby("sku")["order_id"].nunique()
-        return_sku_counts = returns_df.groupby("sku").size()
-
-        for sku in return_sku_counts.index:
-            orders_count = order_sku_counts.get(sku, 0)
+        for sku, returned in return_counts.items():
+            orders_count = order_counts.get(sku, 0)
             if orders_count == 0:
                 continue
-            return_rate = float(return_sku_counts[sku]) / orders_count
-            revenue = float(sku_rev.get(sku, 0))
+            return_rate = float(returned) / orders_count
+            revenue = float(sku_revenue.get(sku, 0))
             estimated_margin_risk = return_rate * revenue
             results.append({
                 "sku": str(sku),
@@ -111,19 +161,18 @@ def _compute_high_return_skus(
                 "estimated_margin_risk": round(estimated_margin_risk, 2),
             })
 
-    elif "refund_amount" in orders_df.columns:
+    elif refunds is not None:
         # Fallback: refund-based
-        sku_refunds = orders_df.groupby("sku")["refund_amount"].sum()
-        for sku in sku_refunds.index:
-            revenue = float(sku_rev.get(sku, 0))
+        for sku, refunded in refunds.items():
+            revenue = float(sku_revenue.get(sku, 0))
             if revenue == 0:
                 continue
-            refund_share = float(sku_refunds[sku]) / revenue
+            refund_share = float(refunded) / revenue
             results.append({
                 "sku": str(sku),
                 "return_rate": round(refund_share, 4),  # actually refund rate
                 "revenue": round(revenue, 2),
-                "estimated_margin_risk": round(float(sku_refunds[sku]), 2),
+                "estimated_margin_risk": round(float(refunded), 2),
             })
 
     # Sort by estimated margin risk descending, keep top 20
@@ -0,0 +1,204 @@
+"""
+PromptBuilder — token-budgeted INPUT JSON for the rank_actions prompt.
+
+The raw profiling/modules dicts grow with the catalog (high_return_skus,
+theme SKU lists, evidence arrays). This layer counts tokens locally and, if
+the payload exceeds PROMPT_TOKEN_BUDGET, compacts it in steps:
+
+  1. rank list entries by estimated margin impact,
+  2. keep the top-N of each list and fold the long tail into an aggregate,
+  3. shrink N until the payload fits (or nothing is left to trim).
+
+Numbers the LLM relies on (totals, shares, risk level) are never dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import threading
+
+from src.config import PROMPT_TOKEN_BUDGET, TOKENIZER_ENCODING, TOKENIZER_LOAD_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# List caps tried in order until the payload fits the budget
+_COMPACTION_LEVELS = (20, 10, 5, 3, 1)
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _load_encoder():
+    """
+    tiktoken's encoding, or None to count with the heuristic. Decided once per
+    process: get_encoding downloads the encoding when it isn't in tiktoken's
+    cache (TIKTOKEN_CACHE_DIR), so it runs on a helper thread and is given up
+    on after TOKENIZER_LOAD_TIMEOUT_SECONDS, e.g. when offline.
+    """
+    global _encoder, _encoder_loaded
+    with _encoder_lock:
+        if _encoder_loaded:
+            return _encoder
+        result: dict = {}
+
+        def load() -> None:
+            try:
+                import tiktoken
+
+                result["encoder"] = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:  # not installed, offline, bad cache entry
+                result["error"] = e
+
+        loader = threading.Thread(target=load, name="tiktoken-load", daemon=True)
+        loader.start()
+        loader.join(TOKENIZER_LOAD_TIMEOUT_SECONDS)
+        _encoder = result.get("encoder")
+        if _encoder is None:
+            reason = result.get("error") or f"not loaded within {TOKENIZER_LOAD_TIMEOUT_SECONDS}s"
+            logger.info("tiktoken unavailable (%s); counting tokens as chars/4", reason)
+        _encoder_loaded = True
+        return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally.
+
+    Uses tiktoken (optional dependency) when its encoding loads; otherwise
+    falls back to the ~4 chars/token heuristic (slightly pessimistic for JSON).
+    """
+    encoder = _encoder if _encoder_loaded else _load_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def build_rank_actions_input(
+    business_goal: str,
+    constraints: str,
+    profiling: dict,
+    modules: dict,
+    budget: int = PROMPT_TOKEN_BUDGET,
+) -> tuple[str, int]:
+    """
+    Serialize the rank_actions INPUT JSON within `budget` tokens.
+    Returns (json_text, token_count).
+    """
+    # Strip internal keys from profiling before sending
+    clean_profiling = {k: v for k, v in profiling.items() if not k.startswith("_")}
+    sku_rev: dict = profiling.get("_sku_revenue", {})
+
+    payload = {
+        "business_goal": business_goal,
+        "constraints": constraints,
+        "profiling": clean_profiling,
+        "modules": modules,
+    }
+    text = json.dumps(payload, default=str)
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text, tokens
+
+    original_tokens = tokens
+    for cap in _COMPACTION_LEVELS:
+        compact = {
+            "business_goal": business_goal,
+            "constraints": constraints,
+            "profiling": _compact_profiling(clean_profiling, cap),
+            "modules": _compact_modules(modules, sku_rev, cap),
+        }
+        text = json.dumps(compact, default=str, separators=(",", ":"))
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            break
+
+    if tokens > budget:
+        logger.warning("rank_actions payload still %d tokens after compaction (budget=%d)",
+                       tokens, budget)
+    else:
+        logger.info("rank_actions payload compacted %d → %d tokens (budget=%d)",
+                    original_tokens, tokens, budget)
+    return text, tokens
+
+
+# ── Compaction helpers ───────────────────────────────────────────────────────
+
+def _compact_profiling(profiling: dict, cap: int) -> dict:
+    out = dict(profiling)
+    skus = profiling.get("high_return_skus")
+    if isinstance(skus, list) and skus:
+        ranked = sorted(skus, key=lambda s: s.get("estimated_margin_risk", 0), reverse=True)
+        out["high_return_skus"] = ranked[:cap]
+        tail = ranked[cap:]
+        if tail:
+            out["high_return_skus_tail"] = {
+                "sku_count": len(tail),
+                "revenue": round(sum(s.get("revenue", 0) for s in tail), 2),
+                "estimated_margin_risk": round(
+                    sum(s.get("estimated_margin_risk", 0) for s in tail), 2
+                ),
+                "max_return_rate": max(s.get("return_rate", 0) for s in tail),
+            }
+    return out
+
+
+def _compact_modules(modules: dict, sku_rev: dict, cap: int) -> dict:
+    out = dict(modules)
+
+    ri = modules.get("returns_intelligence")
+    if isinstance(ri, dict):
+        ri = dict(ri)
+        risk = sorted(ri.get("top_risk_skus", []),
+                      key=lambda s: s.get("impact_estimate", 0), reverse=True)
+        ri["top_risk_skus"] = [_trim_evidence(s, cap) for s in risk[:cap]]
+        if len(risk) > cap:
+            tail = risk[cap:]
+            ri["top_risk_skus_tail"] = {
+                "sku_count": len(tail),
+                "revenue": round(sum(s.get("revenue", 0) for s in tail), 2),
+                "impact_estimate": round(sum(s.get("impact_estimate", 0) for s in tail), 2),
+            }
+
+        themes = sorted(ri.get("themes", []),
+                        key=lambda t: _theme_impact(t, sku_rev), reverse=True)
+        ri["themes"] = [_compact_theme(t, sku_rev, cap) for t in themes[:max(cap, 3)]]
+        if len(themes) > max(cap, 3):
+            ri["themes_omitted"] = len(themes) - max(cap, 3)
+        out["returns_intelligence"] = ri
+
+    dep = modules.get("revenue_dependency_risk")
+    if isinstance(dep, dict):
+        dep = dict(dep)
+        dep["signals"] = list(dep.get("signals", []))[:cap]
+        out["revenue_dependency_risk"] = dep
+
+    return out
+
+
+def _theme_impact(theme: dict, sku_rev: dict) -> float:
+    """Severity-weighted revenue exposed to a theme."""
+    exposed = sum(float(sku_rev.get(s, 0) or 0) for s in theme.get("skus_affected", []))
+    return float(theme.get("severity", 1) or 1) * (exposed or 1.0)
+
+
+def _compact_theme(theme: dict, sku_rev: dict, cap: int) -> dict:
+    out = dict(theme)
+    skus = sorted(theme.get("skus_affected", []),
+                  key=lambda s: float(sku_rev.get(s, 0) or 0), reverse=True)
+    out["skus_affected"] = skus[:cap]
+    if len(skus) > cap:
+        out["skus_affected_more"] = len(skus) - cap
+    if isinstance(theme.get("examples"), list):
+        out["examples"] = theme["examples"][:2]
+    return out
+
+
+def _trim_evidence(entry: dict, cap: int) -> dict:
+    evidence = entry.get("evidence")
+    if isinstance(evidence, list) and len(evidence) > cap:
+        entry = dict(entry)
+        entry["evidence"] = evidence[:cap]
+    return entry
@@ -5,10 +5,11 @@ ReportBuilder — assembles the final JSON report from all module outputs.
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Optional
 
-from src.config import CURRENCY
-from src.schemas import dataset_summary, decision_output
+from src.config import CURRENCY, SKU_BREAKDOWN_TOP_N
+from src.schemas import dataset_summary, decision_output, goal_decision_section
+from src.utils.sku_table import build_sku_table, top_n_breakdown
 
 
 def build_report(
@@ -20,19 +21,27 @@ def build_report(
     orders_rows: int,
     returns_rows: int,
     notes: list[str],
+    goal_decisions: Optional[list[tuple[dict, dict]]] = None,
+    sku_table: Optional[dict] = None,
 ) -> dict[str, Any]:
     """
     Compose the final report matching the output contract.
+
+    For multi-goal runs, `goal_decisions` is a list of (goal, decision) pairs
+    rendered as report["decisions"]; decision_output stays the primary goal's.
+    Only the top SKU_BREAKDOWN_TOP_N SKUs are inlined; pass the prebuilt
+    columnar `sku_table` to avoid rebuilding it from profiling.
     """
 
     # Clean internal keys from profiling, but keep sku_revenue for charts
     clean_profiling = {k: v for k, v in profiling.items() if not k.startswith("_")}
-    # Expose per-SKU revenue for frontend visualisation
-    sku_rev = profiling.get("_sku_revenue", {})
-    if sku_rev:
-        clean_profiling["sku_revenue_breakdown"] = {
-            str(k): round(float(v), 2) for k, v in sku_rev.items()
-        }
+    # Expose the top SKUs (plus a long-tail bucket) for frontend visualisation
+    if sku_table is None and profiling.get("_sku_revenue"):
+        sku_table = build_sku_table(profiling["_sku_revenue"])
+    if sku_table and sku_table["sku"]:
+        top, other = top_n_breakdown(sku_table, SKU_BREAKDOWN_TOP_N)
+        clean_profiling["sku_revenue_breakdown"] = top
+        clean_profiling["sku_revenue_other"] = other
 
     report = {
         "run_id": run_id,
@@ -57,4 +66,14 @@ def build_report(
         ),
     }
 
+    if goal_decisions:
+        report["decisions"] = [
+            goal_decision_section(
+                business_goal=goal.get("business_goal", ""),
+                constraints=goal.get("constraints", ""),
+                decision=dec,
+            )
+            for goal, dec in goal_decisions
+        ]
+
     return report
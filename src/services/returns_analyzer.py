@@ -3,6 +3,9 @@ ReturnsAnalyzer — two modes:
 
   Mode A : returns.csv exists with free-text reasons → deterministic stats + LLM clustering
   Mode B : no returns.csv but refund_amount exists in orders → purely deterministic refund flags
+
+The pandas aggregation feeds `rank_return_risk` / `rank_refund_risk` and
+`top_reasons`, which the other dataframe engines (src.engines) share.
 """
 
 from __future__ import annotations
@@ -59,15 +62,30 @@ def _mode_a_stats(
     sku_rev: dict,
     total_revenue: float,
 ) -> list[dict]:
-    order_sku_counts = orders_df.groupby("sku")["order_id"].nunique()
-    return_sku_counts = returns_df.groupby("sku").size()
+    return rank_return_risk(
+        orders_df.groupby("sku")["order_id"].nunique().to_dict(),
+        returns_df.groupby("sku").size().to_dict(),
+        sku_rev,
+        total_revenue,
+    )
 
+
+def rank_return_risk(
+    order_counts: dict,
+    return_counts: dict,
+    sku_rev: dict,
+    total_revenue: float,
+) -> list[dict]:
+    """
+    Mode A ranking from distinct orders per SKU and returns per SKU (in SKU
+    order): SKUs over both the return-rate and revenue-share thresholds.
+    """
     results: list[dict] = []
-    for sku in return_sku_counts.index:
-        orders_count = order_sku_counts.get(sku, 0)
+    for sku, returned in return_counts.items():
+        orders_count = order_counts.get(sku, 0)
         if orders_count == 0:
             continue
-        return_rate = float(return_sku_counts[sku]) / orders_count
+        return_rate = float(returned) / orders_count
         revenue = float(sku_rev.get(sku, 0))
         revenue_share = revenue / total_revenue if total_revenue else 0
 
@@ -97,7 +115,13 @@ def _mode_b_stats(
     if "refund_amount" not in orders_df.columns:
         return []
 
-    sku_refunds = orders_df.groupby("sku")["refund_amount"].sum()
+    return rank_refund_risk(
+        orders_df.groupby("sku")["refund_amount"].sum().to_dict(), sku_rev, total_revenue,
+    )
+
+
+def rank_refund_risk(sku_refunds: dict, sku_rev: dict, total_revenue: float) -> list[dict]:
+    """Mode B ranking from refund_amount per SKU (in SKU order)."""
     results: list[dict] = []
 
     for sku, refund_total in sku_refunds.items():
@@ -131,22 +155,35 @@ def _cluster_reasons(returns_df: pd.DataFrame, llm) -> list[dict]:
     """
     Build reason sample and call the LLM for clustering.
     """
+    sample = build_reason_sample(returns_df)
+    if not sample:
+        return []
+
+    return llm.cluster_return_reasons(sample)
+
+
+def build_reason_sample(returns_df: pd.DataFrame | None) -> list[dict]:
+    """
+    Top (sku, reason) pairs by count — the deterministic half of clustering.
+    Split out so CPU-bound stages can run in a worker process and hand only
+    this small sample back to the thread that talks to the LLM.
+    """
+    if returns_df is None or len(returns_df) == 0 or "return_reason_text" not in returns_df.columns:
+        return []
 
-    # Aggregate top reasons
+    # Aggregate top reasons (stable: ties stay in (sku, reason) order)
     reason_counts = (
         returns_df.groupby(["sku", "return_reason_text"])
         .size()
-        .reset_index(name="count")
-        .sort_values("count", ascending=False)
+        .sort_values(ascending=False, kind="stable")
         .head(MAX_REASON_SAMPLES)
     )
+    return top_reasons(reason_counts.items())
 
-    sample = [
-        {"sku": row["sku"], "reason": row["return_reason_text"], "count": int(row["count"])}
-        for _, row in reason_counts.iterrows()
-    ]
-
-    if not sample:
-        return []
 
-    return llm.cluster_return_reasons(sample)
+def top_reasons(pairs) -> list[dict]:
+    """The reason sample from ((sku, reason), count) pairs, already ranked."""
+    return [
+        {"sku": sku, "reason": reason, "count": int(count)}
+        for (sku, reason), count in pairs
+    ]
@@ -1,15 +1,28 @@
 import logging
-import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List, Optional
 from flask import request
+from src.config import (
+    DEFAULT_BUSINESS_GOAL, MAX_GOALS_PER_RUN,
+    WORKER_POOL_SIZE, JOB_QUEUE_MAX, MAX_INFLIGHT_DATASET_MB,
+    EXECUTION_BACKEND, PROCESS_POOL_SIZE,
+)
 from src.utils.ids import new_run_id
-from src.utils.csv_loader import load_orders_csv, load_returns_csv
-from src.utils.validators import ValidationError
-from src.storage.memory_store import store_run, update_progress
-from src.services.profiler import profile_orders
-from src.services.returns_analyzer import analyze_returns
-from src.services.revenue_dependency import analyze_dependency
+from src.utils.validators import ValidationError, validate_goals
+from src.storage.run_store import (
+    store_run, update_progress, publish_partial_action, update_queue_position, delete_run,
+    record_stage, store_profile,
+)
+from src.services.scheduler import JobScheduler, SchedulerSaturated
+from src.services.execution import ThreadBackend, make_backend
 from src.services.report_builder import build_report
+from src.utils.artifacts import build_report_artifacts
+from src.utils.instrumentation import stage, summarize_timings
+from src.utils.metrics import observe_run
+from src.utils.run_profiler import RunProfiler, capture
+from src.utils import tracing
+from src.utils.sku_table import build_sku_table
 
 logger = logging.getLogger(__name__)
 
@@ -19,105 +32,274 @@ class RunService:
     Decouples HTTP handling from core business logic.
     """
     
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client,
+        scheduler: Optional[JobScheduler] = None,
+        execution_backend: str = EXECUTION_BACKEND,
+    ):
         self.llm = llm_client
+        # Deterministic stages run on threads or in a process pool;
+        # LLM calls always stay on threads.
+        self.backend = make_backend(execution_backend, PROCESS_POOL_SIZE)
+        self._profiling_backend = ThreadBackend()
+        self.scheduler = scheduler or JobScheduler(
+            workers=WORKER_POOL_SIZE,
+            max_queue=JOB_QUEUE_MAX,
+            max_inflight_bytes=MAX_INFLIGHT_DATASET_MB * 1024 * 1024,
+            on_position=update_queue_position,
+        )
 
     def start_analysis_pipeline(
         self, 
         orders_file, 
         returns_file=None, 
         business_goal: str = "", 
-        constraints: str = ""
+        constraints: str = "",
+        goals: Optional[List[dict]] = None,
+        priority: int = 0,
+        profile: bool = False,
+        engine: Optional[str] = None,
     ) -> Tuple[str, Optional[str]]:
         """
         Parses inputs, initializes state, and kicks off the background engine.
+        `goals` ([{"business_goal", "constraints"}, ...]) fans the decision
+        step out per goal; when omitted the single goal/constraints pair is used.
+        `profile` runs ingestion and the pipeline under RunProfiler.
+        `engine` names the dataframe engine (default DATAFRAME_ENGINE).
         Returns: (run_id, error_message)
+        Raises SchedulerSaturated when the worker pool cannot admit the run.
         """
-        run_id = new_run_id()
-        all_notes = []
-        
+        # Engines pull in pandas/polars; defer them to the first run, not app import
+        from src.engines.registry import get_engine
+
         try:
-            # 1. IO & Validation Layer
-            orders_df, order_notes = load_orders_csv(orders_file)
-            all_notes.extend(order_notes)
-            
-            returns_df = None
-            returns_rows = 0
-            if returns_file:
-                returns_df, return_notes = load_returns_csv(returns_file)
-                all_notes.extend(return_notes)
-                returns_rows = len(returns_df)
-            
-            orders_rows = len(orders_df)
-            
-        except ValidationError as e:
-            logger.warning("Validation failed for run %s: %s", run_id, e)
-            return "", str(e)
-        except Exception as e:
-            logger.error("System error during ingestion for run %s: %s", run_id, e)
-            return "", "Internal processing error during file ingestion."
-
-        # 2. State Initialization
-        store_run(run_id, {"status": "processing"})
-        update_progress(run_id, 5, "Synchronizing data streams")
-        
-        # 3. Background Thread Injection
-        # Note: In a larger app, we would use Celery/Redis here.
-        thread = threading.Thread(
-            target=self._execute_pipeline,
-            args=(run_id, orders_df, returns_df, business_goal, constraints, 
-                  orders_rows, returns_rows, all_notes),
-            daemon=True
-        )
-        thread.start()
-        
-        return run_id, None
+            engine = get_engine(engine)
+        except (ValueError, ImportError) as e:
+            logger.error("Dataframe engine unavailable: %s", e)
+            return "", f"Dataframe engine unavailable: {e}"
+        run_id = new_run_id()
+        with tracing.span("run.submit", run_id=run_id, priority=priority) as submit_span:
+            all_notes = []
+            timings: List[dict] = []
+            started = time.perf_counter()
+            profiler = RunProfiler() if profile else None
+
+            try:
+                # 1. IO & Validation Layer
+                if goals is None:
+                    goals = [{"business_goal": business_goal, "constraints": constraints}]
+                goals = validate_goals(goals, MAX_GOALS_PER_RUN) or [
+                    {"business_goal": DEFAULT_BUSINESS_GOAL, "constraints": constraints}
+                ]
+
+                with stage(timings, "ingest") as rec, capture(profiler, "ingest"):
+                    orders_df, order_notes = engine.load_orders(orders_file)
+                    all_notes.extend(order_notes)
+
+                    returns_df = None
+                    returns_rows = 0
+                    if returns_file:
+                        returns_df, return_notes = engine.load_returns(returns_file)
+                        all_notes.extend(return_notes)
+                        returns_rows = len(returns_df)
 
-    def _execute_pipeline(self, run_id, orders_df, returns_df, goal, constraints, o_rows, r_rows, notes):
-        """The core intelligence loop."""
+                    orders_rows = len(orders_df)
+                    rec["rows_out"] = orders_rows + returns_rows
+
+            except ValidationError as e:
+                logger.warning("Validation failed for run %s: %s", run_id, e)
+                submit_span.record_exception(e)
+                if profiler is not None:
+                    profiler.discard()
+                return "", str(e)
+            except Exception as e:
+                logger.error("System error during ingestion for run %s: %s", run_id, e)
+                submit_span.record_exception(e)
+                if profiler is not None:
+                    profiler.discard()
+                return "", "Internal processing error during file ingestion."
+
+            # 2. State Initialization
+            store_run(run_id, {"status": "processing"})
+            update_progress(run_id, 5, "Synchronizing data streams")
+
+            # 3. Admission + hand-off to the bounded worker pool
+            dataset_bytes = engine.frame_bytes(orders_df)
+            if returns_df is not None:
+                dataset_bytes += engine.frame_bytes(returns_df)
+            # Ends when a worker picks the run up (time spent waiting in the queue)
+            queue_span = tracing.start_span("run.queued", run_id=run_id, cost_bytes=dataset_bytes)
+            try:
+                self.scheduler.submit(
+                    run_id,
+                    self._execute_pipeline,
+                    args=(run_id, orders_df, returns_df, goals,
+                          orders_rows, returns_rows, all_notes, timings, started, profiler,
+                          queue_span, engine),
+                    priority=priority,
+                    cost_bytes=dataset_bytes,
+                )
+            except SchedulerSaturated as e:
+                logger.warning("Run %s rejected (%s, retry in %ss)", run_id, e.reason, e.retry_after)
+                delete_run(run_id)
+                if profiler is not None:
+                    profiler.discard()
+                raise
+
+            return run_id, None
+
+    def _execute_pipeline(self, run_id, orders_df, returns_df, goals, o_rows, r_rows, notes,
+                          timings=None, started=None, profiler=None, queue_span=None,
+                          engine=None):
+        """
+        The core intelligence loop. Every stage is instrumented into `timings`
+        (which already holds ingestion), stored on the run as its `timings`
+        section and folded into the /metrics aggregates. With a `profiler` the
+        stages run under it and its files are stored before the final status.
+        Ending `queue_span` closes the run's wait in the scheduler queue; the
+        stages are traced under a sibling "run.execute" span.
+        """
+        timings = [] if timings is None else timings
+        started = time.perf_counter() if started is None else started
+        # A process pool would run the core outside the profiler's reach
+        backend = self.backend if profiler is None else self._profiling_backend
+        queue_span = queue_span or tracing.NOOP_SPAN
+        queue_span.end()
+        if profiler is not None:
+            profiler.start_tracing()
+        with tracing.attach(queue_span.parent), \
+                tracing.span("run.execute", run_id=run_id, backend=backend.name,
+                             engine=engine.name if engine else None):
+            try:
+                with capture(profiler, "pipeline"):
+                    # Steps A-C: Deterministic core (profile, return stats, dependency)
+                    core = backend.run_core(
+                        orders_df, returns_df,
+                        progress=lambda pct, label: update_progress(run_id, pct, label),
+                        engine=engine,
+                    )
+                    profiling = core["profiling"]
+                    returns_signals = core["returns_signals"]
+                    dependency = core["dependency"]
+                    timings.extend(core.get("timings", []))
+                    record_stage(run_id, "deterministic_core", backend=backend.name,
+                                 engine=engine.name if engine else "pandas")
+                
+                    # Semantic Vectorization (LLM, stays on this thread)
+                    if core["reason_sample"]:
+                        update_progress(run_id, 65, "Clustering return signatures")
+                        with stage(timings, "llm.cluster_return_reasons",
+                                   rows_in=len(core["reason_sample"])) as rec:
+                            returns_signals["themes"] = self.llm.cluster_return_reasons(core["reason_sample"])
+                            rec["rows_out"] = len(returns_signals["themes"])
+                        record_stage(run_id, "theme_clustering", themes=len(returns_signals["themes"]))
+                
+                    # Step D: Neural Synthesis (one rank_actions call per goal, concurrently)
+                    update_progress(run_id, 75, "Synthesizing LLM intelligence")
+                    modules = {
+                        "returns_intelligence": returns_signals,
+                        "revenue_dependency_risk": dependency,
+                    }
+                    decisions = self._rank_goals(run_id, goals, profiling, modules, timings,
+                                                 profiler)
+
+                    prompt_tokens = [d.get("_prompt_tokens", 0) for d in decisions]
+                    token_stats = {"rank_actions": sum(prompt_tokens)}
+                    if len(goals) > 1:
+                        token_stats["rank_actions_per_goal"] = prompt_tokens
+                    store_run(run_id, {"prompt_tokens": token_stats})
+                    record_stage(run_id, "rank_actions", goals=len(goals))
+
+                    # Step E: Report Assembly
+                    update_progress(run_id, 95, "Finalizing strategic report")
+                    sku_revenue = profiling.get("_sku_revenue", {})
+                    with stage(timings, "report_build", rows_in=len(sku_revenue)):
+                        sku_table = build_sku_table(sku_revenue)
+                        report = build_report(
+                            run_id=run_id,
+                            profiling=profiling,
+                            returns_signals=returns_signals,
+                            dependency=dependency,
+                            decision=decisions[0],
+                            goal_decisions=list(zip(goals, decisions)) if len(goals) > 1 else None,
+                            orders_rows=o_rows,
+                            returns_rows=r_rows,
+                            notes=notes,
+                            sku_table=sku_table,
+                        )
+                
+                    record_stage(run_id, "report_build")
+
+                    # Serialize (and compress) once; endpoints serve these bytes as-is
+                    with stage(timings, "serialization") as rec:
+                        artifacts = build_report_artifacts(report)
+                        rec["bytes_out"] = len(artifacts["identity"])
+                    record_stage(run_id, "serialization", bytes=len(artifacts["identity"]))
+
+                if profiler is not None:
+                    self._save_profile(run_id, profiler)
+
+                # Progress before status: the status event is the last thing subscribers see
+                update_progress(run_id, 100, "Analysis complete")
+                run_timings = summarize_timings(timings, time.perf_counter() - started)
+                store_run(run_id, {
+                    "status": "done", "report": report, "timings": run_timings,
+                    "_artifacts": artifacts, "_sku_table": sku_table,
+                })
+                observe_run(run_timings, "done")
+                logger.info("Pipeline execution SUCCESS for run %s", run_id)
+
+            except Exception as e:
+                logger.exception("Pipeline CRASHED for run %s", run_id)
+                tracing.record_exception(e)
+                update_progress(run_id, 0, f"Critical System Error: {str(e)[:50]}")
+                if profiler is not None and not profiler.finished:
+                    self._save_profile(run_id, profiler)
+                run_timings = summarize_timings(timings, time.perf_counter() - started)
+                store_run(run_id, {"status": "error", "error": str(e), "timings": run_timings})
+                observe_run(run_timings, "error")
+
+    @staticmethod
+    def _save_profile(run_id: str, profiler: RunProfiler) -> None:
         try:
-            # Step A: Deterministic Reconstruction
-            update_progress(run_id, 15, "Executing contribution models")
-            profiling = profile_orders(orders_df, returns_df)
-            
-            # Step B: Semantic Vectorization
-            update_progress(run_id, 35, "Correlating return signatures")
-            returns_signals = analyze_returns(orders_df, returns_df, profiling, llm=self.llm)
-            
-            # Step C: Risk Mapping
-            update_progress(run_id, 55, "Mapping revenue dependency risk")
-            dependency = analyze_dependency(orders_df, profiling)
-            
-            # Step D: Neural Synthesis
-            update_progress(run_id, 75, "Synthesizing LLM intelligence")
-            decision = self.llm.rank_actions(
-                business_goal=goal,
-                constraints=constraints,
-                profiling=profiling,
-                modules={
-                    "returns_intelligence": returns_signals,
-                    "revenue_dependency_risk": dependency,
-                }
-            )
-            
-            # Step E: Report Assembly
-            update_progress(run_id, 95, "Finalizing strategic report")
-            report = build_report(
-                run_id=run_id,
-                profiling=profiling,
-                returns_signals=returns_signals,
-                dependency=dependency,
-                decision=decision,
-                orders_rows=o_rows,
-                returns_rows=r_rows,
-                notes=notes
-            )
-            
-            store_run(run_id, {"status": "done", "report": report})
-            update_progress(run_id, 100, "Analysis complete")
-            logger.info("Pipeline execution SUCCESS for run %s", run_id)
-
-        except Exception as e:
-            logger.exception("Pipeline CRASHED for run %s", run_id)
-            store_run(run_id, {"status": "error", "error": str(e)})
-            update_progress(run_id, 0, f"Critical System Error: {str(e)[:50]}")
+            store_profile(run_id, profiler.finish())
+        except Exception:
+            logger.exception("Could not store the profile for run %s", run_id)
+
+    def _rank_goals(self, run_id, goals, profiling, modules, timings=None,
+                    profiler=None) -> List[dict]:
+        """
+        Run rank_actions for every goal. The deterministic inputs are shared;
+        only the LLM calls fan out, so wall time stays close to a single goal.
+        """
+        multi = len(goals) > 1
+        trace_ctx = tracing.current_context()
+
+        def rank(goal_index: int, goal: dict) -> dict:
+            def on_action(idx, action):
+                publish_partial_action(
+                    run_id, idx, action,
+                    goal_index=goal_index,
+                    business_goal=goal["business_goal"] if multi else None,
+                )
+
+            with tracing.attach(trace_ctx if multi else None), \
+                    stage(timings, "llm.rank_actions", goal_index=goal_index) as rec, \
+                    capture(profiler, f"llm.rank_actions[{goal_index}]"):
+                decision = self.llm.rank_actions(
+                    business_goal=goal["business_goal"],
+                    constraints=goal["constraints"],
+                    profiling=profiling,
+                    modules=modules,
+                    on_action=on_action,
+                )
+                rec["rows_out"] = len(decision.get("ranked_actions", []))
+            return decision
+
+        if not multi:
+            return [rank(0, goals[0])]
+
+        with ThreadPoolExecutor(max_workers=len(goals), thread_name_prefix=f"rank-{run_id[:8]}") as pool:
+            futures = [pool.submit(rank, i, g) for i, g in enumerate(goals)]
+            return [f.result() for f in futures]
@@ -0,0 +1,183 @@
+"""
+JobScheduler — fixed worker pool + bounded priority queue for pipeline runs.
+
+Replaces "one daemon thread per POST". Admission is refused (SchedulerSaturated,
+surfaced as HTTP 429 + Retry-After) when either
+  - the queue already holds `max_queue` jobs, or
+  - the parsed datasets of queued + running jobs would exceed `max_inflight_bytes`.
+
+A job that arrives while nothing else is in flight is always admitted, so a
+single oversized dataset can still run on an idle node.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a job cannot be admitted; carries a Retry-After hint."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Priority: higher `priority` runs first; equal priorities run FIFO.
+    `on_position(job_id, position)` is called whenever a queued job's 1-based
+    position changes, and with position 0 when the job starts running. Only
+    changed positions are delivered, outside the scheduler lock, in order
+    (a job's stale position never lands after a newer one).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_inflight_bytes: int,
+        on_position: Optional[Callable[[str, int], None]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.max_inflight_bytes = max_inflight_bytes
+        self._on_position = on_position
+
+        self._cv = threading.Condition()
+        self._heap: list[tuple[int, int, str, Callable, tuple, int]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._inflight_bytes = 0
+        self._avg_job_s = 5.0           # EWMA of job durations, seeds Retry-After
+        self._completed = 0
+        self._rejected = 0
+        self._threads: list[threading.Thread] = []
+        self._published: dict[str, int] = {}   # last position reported per queued job
+        self._pending: dict[str, int] = {}     # changes not yet delivered
+        self._deliver_lock = threading.Lock()  # serializes on_position deliveries
+
+    # ── public API ───────────────────────────────────────────────────────
+
+    def submit(
+        self,
+        job_id: str,
+        fn: Callable[..., Any],
+        args: tuple = (),
+        priority: int = 0,
+        cost_bytes: int = 0,
+    ) -> int:
+        """Queue a job. Returns its 1-based position among waiting jobs."""
+        with self._cv:
+            self._ensure_workers()
+            in_flight = self._running + len(self._heap)
+            if len(self._heap) >= self.max_queue and self._running >= self.workers:
+                self._rejected += 1
+                raise SchedulerSaturated("queue_full", self._retry_after())
+            if in_flight and self._inflight_bytes + cost_bytes > self.max_inflight_bytes:
+                self._rejected += 1
+                raise SchedulerSaturated("memory_budget_exceeded", self._retry_after())
+
+            heapq.heappush(self._heap, (-priority, next(self._seq), job_id, fn, args, cost_bytes))
+            self._inflight_bytes += cost_bytes
+            positions = self._positions()
+            self._stage_positions(positions)
+            self._cv.notify()
+        self._deliver()
+        return positions[job_id]
+
+    def stats(self) -> dict[str, Any]:
+        with self._cv:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": len(self._heap),
+                "max_queue": self.max_queue,
+                "inflight_bytes": self._inflight_bytes,
+                "max_inflight_bytes": self.max_inflight_bytes,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_job_seconds": round(self._avg_job_s, 3),
+            }
+
+    # ── internals ────────────────────────────────────────────────────────
+
+    def _ensure_workers(self) -> None:
+        """Start the pool on first use (keeps import/construct cheap)."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"run-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _worker(self) -> None:
+        while True:
+            with self._cv:
+                while not self._heap:
+                    self._cv.wait()
+                _, _, job_id, fn, args, cost = heapq.heappop(self._heap)
+                self._running += 1
+                positions = self._positions()
+                positions[job_id] = 0
+                self._stage_positions(positions)
+            self._deliver()
+
+            started = time.monotonic()
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Scheduled job %s raised", job_id)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cv:
+                    self._running -= 1
+                    self._inflight_bytes -= cost
+                    self._completed += 1
+                    self._avg_job_s = 0.8 * self._avg_job_s + 0.2 * elapsed
+                # Don't pin the finished job's DataFrames while idling
+                del fn, args
+
+    def _positions(self) -> dict[str, int]:
+        """1-based queue order of waiting jobs. Caller holds the lock."""
+        return {entry[2]: pos for pos, entry in enumerate(sorted(self._heap), start=1)}
+
+    def _stage_positions(self, positions: dict[str, int]) -> None:
+        """Queue the positions that changed for delivery. Caller holds the lock."""
+        if not self._on_position:
+            return
+        for job_id, pos in positions.items():
+            if self._published.get(job_id) == pos:
+                continue
+            self._pending[job_id] = pos  # overrides an undelivered older position
+            if pos:
+                self._published[job_id] = pos
+            else:
+                self._published.pop(job_id, None)
+
+    def _deliver(self) -> None:
+        """Call on_position for staged changes. Caller must not hold the lock."""
+        if not self._on_position:
+            return
+        with self._deliver_lock:
+            with self._cv:
+                pending, self._pending = self._pending, {}
+            for job_id, pos in pending.items():
+                try:
+                    self._on_position(job_id, pos)
+                except Exception:
+                    logger.exception("on_position callback failed for %s", job_id)
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a slot frees up. Caller holds the lock."""
+        waves = (len(self._heap) / self.workers) + 1
+        return max(1, math.ceil(self._avg_job_s * waves))
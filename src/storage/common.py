@@ -0,0 +1,42 @@
+"""
+Definitions shared by the run store backends (memory_store, sqlite_store).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+TERMINAL_STATUSES = ("done", "error")
+MAX_EVENTS_PER_RUN = 256
+
+
+def summarize_run(run_id: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Headline metrics the history view needs, pulled from a finished report."""
+    report = data.get("report", {})
+    dataset = report.get("dataset_summary", {})
+    profiling = report.get("profiling", {})
+    modules = report.get("modules", {})
+    dependency = modules.get("revenue_dependency_risk", {})
+    actions = report.get("decision_output", {}).get("ranked_actions", [])
+    summary = {
+        "id": run_id,
+        "status": data.get("status", "done"),
+        "generated_at": report.get("generated_at") or datetime.now(timezone.utc).isoformat(),
+        "orders_rows": dataset.get("orders_rows", 0),
+        "returns_rows": dataset.get("returns_rows", 0),
+        "date_range": dataset.get("date_range", {}),
+        "currency": dataset.get("currency", ""),
+        "total_revenue": profiling.get("total_revenue", 0),
+        "total_refunds": profiling.get("total_refunds", 0),
+        "aov": profiling.get("aov", 0),
+        "top1_share": profiling.get("top_sku_revenue_share", {}).get("top1", 0),
+        "high_return_sku_count": len(profiling.get("high_return_skus", [])),
+        "risk_level": dependency.get("risk_level", ""),
+        "theme_count": len(modules.get("returns_intelligence", {}).get("themes", [])),
+        "top_action": actions[0].get("title", "") if actions else "",
+        "goal_count": len(report.get("decisions", [])) or 1,
+    }
+    if data.get("error"):
+        summary["error"] = data["error"]
+    return summary
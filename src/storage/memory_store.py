@@ -2,57 +2,614 @@
 In-memory run store for v0.1.
 
 Thread-safe dict backed by a Lock. Swap for Redis / Postgres later.
-Now supports progress tracking and run listing with metadata.
+Now supports progress tracking, run listing with metadata, and partial
+(streamed) results published while a run is still processing.
+
+Each run is held as an immutable, versioned RunRecord. Writers build a new
+data dict (copying only what they change) and publish a new record under
+`_lock`; readers just fetch the current record with no lock and no copy,
+so they always see one consistent version. Returned dicts are shared
+snapshots and must be treated as read-only.
+
+Every mutation also appends to a small per-run event log and wakes that
+run's Condition, so SSE subscribers block on `wait_for_events` instead of
+polling the store.
+
+Memory is bounded: finished reports are tracked by last read and, once
+their serialized size exceeds MEMORY_BUDGET_BYTES, the least recently used
+ones are spilled to gzip files under SPILL_DIR and faulted back in on the
+next read. Finished runs older than RUN_TTL_SECONDS are dropped entirely:
+a read of an expired run drops it on the spot, and listings sweep every
+expired run (at most every EXPIRY_SWEEP_SECONDS), so an idle server never
+serves them. Disk I/O always happens outside `_lock`.
 """
 
 from __future__ import annotations
 
+import bisect
+import gzip
+import json
+import logging
+import os
 import threading
-from datetime import datetime, timezone
+import time
+from dataclasses import dataclass
 from typing import Any
 
-_lock = threading.Lock()
-_runs: dict[str, dict[str, Any]] = {}
+from src.config import RUN_STORE_MEMORY_MB, RUN_TTL_HOURS, RUN_SPILL_DIR
+from src.storage.common import MAX_EVENTS_PER_RUN, TERMINAL_STATUSES, summarize_run
+from src.utils.artifacts import dumps_compact
+
+logger = logging.getLogger(__name__)
+
+# Read at call time so tests (and operators via config) can adjust them
+MEMORY_BUDGET_BYTES = RUN_STORE_MEMORY_MB * 1024 * 1024
+RUN_TTL_SECONDS = RUN_TTL_HOURS * 3600  # 0 disables expiry
+EXPIRY_SWEEP_SECONDS = 1.0  # least time between listing-triggered sweeps
+SPILL_DIR = RUN_SPILL_DIR
+
+
+
+@dataclass(frozen=True, slots=True)
+class RunRecord:
+    """One published version of a run. Never mutated; writers publish a successor."""
+    version: int  # monotonic per run, drives ETags
+    data: dict[str, Any]
+
+
+_lock = threading.Lock()  # serializes writers and guards the event logs
+_runs: dict[str, RunRecord] = {}
+_events: dict[str, list[dict[str, Any]]] = {}
+_event_seq: dict[str, int] = {}
+_conds: dict[str, threading.Condition] = {}
+
+# Residency bookkeeping for finished reports
+_resident: dict[str, int] = {}  # run_id -> serialized bytes
+_last_read: dict[str, float] = {}  # written by lock-free readers
+_resident_bytes = 0
+_spill_paths: dict[str, str] = {}  # run_id -> gzip file (exists on disk)
+_finished_at: dict[str, float] = {}
+
+# Listing index: (status | None, sort key) -> tuple of (key, seq, summary),
+# ascending. Replaced wholesale under _index_lock (copy-on-write) whenever a
+# run finishes or is deleted; readers take the current reference lock-free.
+SORT_KEYS = ("created", "generated_at", "total_revenue")
+_index_lock = threading.Lock()
+_index: dict[tuple[str | None, str], tuple[tuple[Any, int, dict[str, Any]], ...]] = {}
+_index_seq = 0
+_evicting: set[str] = set()
+# Opt-in profiling output (run_id -> {file name: bytes}); small and rare, never spilled
+_profiles: dict[str, dict[str, bytes]] = {}
+_stats = {"evictions": 0, "fault_ins": 0, "expired": 0}
+_last_sweep = 0.0  # time.monotonic() of the last expiry sweep
+
+
+def _publish(run_id: str, data: dict[str, Any], bump: bool = True) -> RunRecord:
+    """Swap in a new record for the run. Caller holds _lock."""
+    current = _runs.get(run_id)
+    version = current.version if current else 0
+    record = _runs[run_id] = RunRecord(version + 1 if bump else version, data)
+    return record
+
+
+def _emit(run_id: str, event: str, data: dict[str, Any]) -> None:
+    """Append to the run's event log and wake its subscribers. Caller holds _lock."""
+    seq = _event_seq.get(run_id, 0) + 1
+    _event_seq[run_id] = seq
+    log = _events.setdefault(run_id, [])
+    log.append({"id": seq, "event": event, "data": data})
+    if len(log) > MAX_EVENTS_PER_RUN:
+        del log[: len(log) - MAX_EVENTS_PER_RUN]
+    cond = _conds.get(run_id)
+    if cond is None:
+        cond = _conds[run_id] = threading.Condition(_lock)
+    cond.notify_all()
+
+
+def _report_bytes(data: dict[str, Any]) -> int:
+    """Serialized size of a finished report, its encodings and its SKU table."""
+    artifacts = data.get("_artifacts")
+    if artifacts:
+        size = sum(len(body) for body in artifacts.values())
+    else:
+        size = len(json.dumps(data.get("report"), separators=(",", ":"), default=str))
+    table = data.get("_sku_table")
+    if table:
+        # Name characters plus a rounded number and an index per row
+        size += sum(map(len, table["sku"])) + 24 * len(table["sku"])
+    return size
+
+
+def _track_resident(run_id: str, size: int) -> None:
+    """Caller holds _lock."""
+    global _resident_bytes
+    _resident_bytes += size - _resident.pop(run_id, 0)
+    _resident[run_id] = size
+    _last_read[run_id] = time.monotonic()
+
+
+def _untrack_resident(run_id: str) -> None:
+    """Caller holds _lock."""
+    global _resident_bytes
+    _resident_bytes -= _resident.pop(run_id, 0)
+    _last_read.pop(run_id, None)
+
+
+def _sort_value(summary: dict[str, Any], key: str, seq: int) -> Any:
+    if key == "created":
+        return seq
+    if key == "total_revenue":
+        return float(summary.get("total_revenue") or 0)
+    return str(summary.get(key) or "")
+
+
+def _index_without(index: dict, run_id: str) -> dict:
+    return {
+        slot: tuple(e for e in entries if e[2]["id"] != run_id)
+        for slot, entries in index.items()
+    }
+
+
+def _index_put(summary: dict[str, Any]) -> None:
+    """Insert (or replace) a finished run's summary in every listing slot."""
+    global _index, _index_seq
+    with _index_lock:
+        if summary["id"] not in _runs:
+            return  # deleted while we were outside _lock
+        _index_seq += 1
+        index = _index_without(_index, summary["id"])
+        for status in (summary["status"], None):
+            for key in SORT_KEYS:
+                entries = list(index.get((status, key), ()))
+                entry = (_sort_value(summary, key, _index_seq), _index_seq, summary)
+                bisect.insort(entries, entry, key=lambda e: (e[0], e[1]))
+                index[(status, key)] = tuple(entries)
+        _index = index
+
+
+def _index_remove(run_id: str) -> None:
+    global _index
+    with _index_lock:
+        _index = _index_without(_index, run_id)
 
 
 def store_run(run_id: str, data: dict[str, Any]) -> None:
+    finished = False
+    summary = None
     with _lock:
-        existing = _runs.get(run_id, {})
-        existing.update(data)
-        _runs[run_id] = existing
+        current = _runs.get(run_id)
+        existing = {**(current.data if current else {}), **data}
+        if data.get("status") == "done":
+            # The final report supersedes anything streamed in the meantime
+            existing.pop("partial", None)
+        _publish(run_id, existing)
+        if "report" in data:
+            _track_resident(run_id, _report_bytes(existing))
+        if data.get("status") in TERMINAL_STATUSES or (
+            "report" in data and existing.get("status") == "done"
+        ):
+            summary = summarize_run(run_id, existing)
+        if "status" in data:
+            status_event = {"status": data["status"]}
+            if data.get("error"):
+                status_event["error"] = data["error"]
+            _emit(run_id, "status", status_event)
+            if data["status"] in TERMINAL_STATUSES:
+                # Late subscribers only need the tail; drop the rest of the log
+                del _events[run_id][:-16]
+                _finished_at[run_id] = time.time()
+                finished = True
+    if summary is not None:
+        _index_put(summary)
+    if finished:
+        enforce_limits()
+
+
+def _is_expired(run_id: str, now: float | None = None) -> bool:
+    at = _finished_at.get(run_id)
+    return bool(RUN_TTL_SECONDS) and at is not None and (now or time.time()) - at > RUN_TTL_SECONDS
+
+
+def _drop_expired(run_ids: list[str]) -> None:
+    for rid in run_ids:
+        if rid not in _runs:
+            continue  # dropped by a concurrent reader
+        delete_run(rid)
+        with _lock:
+            _stats["expired"] += 1
+
+
+def _expire_if_due(run_id: str) -> bool:
+    """Drop the run if it outlived RUN_TTL_SECONDS; True if it is gone."""
+    if not _is_expired(run_id):
+        return False
+    _drop_expired([run_id])
+    return True
+
+
+def _sweep_expired() -> None:
+    """Drop every expired run; rate-limited, as it scans all finished runs."""
+    global _last_sweep
+    if not RUN_TTL_SECONDS or time.monotonic() - _last_sweep < EXPIRY_SWEEP_SECONDS:
+        return
+    _last_sweep = time.monotonic()
+    now = time.time()
+    with _lock:
+        expired = [rid for rid in _finished_at if _is_expired(rid, now)]
+    _drop_expired(expired)
 
 
 def get_run(run_id: str) -> dict[str, Any] | None:
+    return get_run_versioned(run_id)[0]
+
+
+def get_run_versioned(run_id: str) -> tuple[dict[str, Any] | None, int]:
+    """
+    Return (run, version) from one published record, without locking.
+    A spilled report is faulted back in first; that doesn't change the version.
+    If its spill file is missing or unreadable the run comes back flagged
+    `_report_unavailable` instead of as a report-less "done" run.
+    """
+    record = _runs.get(run_id)
+    if record is None or _expire_if_due(run_id):
+        return None, 0
+    if run_id in _resident:
+        _last_read[run_id] = time.monotonic()
+        return record.data, record.version
+    path = _spill_paths.get(run_id)
+    if path is None and run_id not in _runs:
+        return None, 0   # deleted since the lookup above
+    if path is None or "report" in record.data:
+        return record.data, record.version
+    return _fault_in(run_id, path)
+
+
+def get_run_state(run_id: str) -> tuple[dict[str, Any] | None, int]:
+    """(run without its report, version); a spilled report is not faulted in."""
+    record = _runs.get(run_id)
+    if record is None or _expire_if_due(run_id):
+        return None, 0
+    return {k: v for k, v in record.data.items() if k not in _SPILLED_KEYS}, record.version
+
+
+def get_run_status(run_id: str) -> str | None:
+    """The run's status ("" before it has one), or None if there is no such run."""
+    record = _runs.get(run_id)
+    if record is None or _expire_if_due(run_id):
+        return None
+    return record.data.get("status", "")
+
+
+def report_encodings(run_id: str) -> list[str]:
+    """Encodings the run's report can be served in ([] if it has none)."""
+    record = _runs.get(run_id)
+    if record is None or _expire_if_due(run_id):
+        return []
+    if "report" in record.data:
+        return list(record.data.get("_artifacts") or ["identity"])
+    # Spilled reports fault back in as identity + gzip
+    return ["identity", "gzip"] if run_id in _spill_paths else []
+
+
+def get_report_artifact(run_id: str, encoding: str = "identity") -> bytes | None:
+    """The serialized report in one encoding (faulted in if spilled), or None."""
+    data, _ = get_run_versioned(run_id)
+    if not data or data.get("_report_unavailable"):
+        return None
+    artifacts = data.get("_artifacts") or {}
+    if encoding in artifacts:
+        return artifacts[encoding]
+    if encoding == "identity" and "report" in data:
+        return dumps_compact(data["report"])
+    return None
+
+
+def get_sku_table(run_id: str) -> dict[str, Any] | None:
+    """
+    The run's full columnar SKU table (see src/utils/sku_table.py).
+    Tables of spilled runs are read from disk on each call, not re-cached.
+    """
+    record = _runs.get(run_id)
+    if record is None or _expire_if_due(run_id):
+        return None
+    table = record.data.get("_sku_table")
+    if table is not None or run_id not in _spill_paths:
+        return table
+    try:
+        with open(_sku_spill_path(run_id), "rb") as fh:
+            return json.loads(gzip.decompress(fh.read()))
+    except FileNotFoundError:
+        return None
+
+
+def _fault_in(run_id: str, path: str) -> tuple[dict[str, Any] | None, int]:
+    try:
+        with open(path, "rb") as fh:
+            gz = fh.read()
+        raw = gzip.decompress(gz)
+        report = json.loads(raw)
+    except (OSError, ValueError) as e:
+        record = _runs.get(run_id)
+        if record is None:
+            return None, 0   # deleted (and its file removed) meanwhile
+        logger.error("Could not fault in run %s from %s: %s", run_id, path, e)
+        return {**record.data, "_report_unavailable": True}, record.version
     with _lock:
-        return _runs.get(run_id)
+        record = _runs.get(run_id)
+        if record is None:
+            return None, 0
+        if "report" not in record.data:
+            data = {**record.data, "report": report,
+                    "_artifacts": {"identity": raw, "gzip": gz}}
+            record = _publish(run_id, data, bump=False)
+            _track_resident(run_id, len(raw) + len(gz))
+            _stats["fault_ins"] += 1
+    enforce_limits(keep=run_id)
+    return record.data, record.version
+
+
+# Keys dropped from a record when its report is spilled
+_SPILLED_KEYS = ("report", "_artifacts", "_sku_table")
+
+
+def _spill_path(run_id: str) -> str:
+    return os.path.join(SPILL_DIR, f"{run_id}.json.gz")
+
+
+def _sku_spill_path(run_id: str) -> str:
+    return os.path.join(SPILL_DIR, f"{run_id}.skus.json.gz")
+
+
+def _write_atomic(path: str, body: bytes) -> None:
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(body)
+    os.replace(tmp, path)
+
+
+def enforce_limits(keep: str | None = None) -> None:
+    """
+    Expire finished runs past RUN_TTL_SECONDS, then spill least recently used
+    reports until the resident total fits MEMORY_BUDGET_BYTES. `keep` is never
+    evicted (the run that was just read).
+    """
+    now = time.time()
+    with _lock:
+        expired = [rid for rid in _finished_at if _is_expired(rid, now)]
+        victims = []
+        over = _resident_bytes - MEMORY_BUDGET_BYTES
+        if over > 0:
+            last_read = dict(_last_read)
+            for rid in sorted(_resident, key=lambda r: last_read.get(r, 0.0)):
+                if over <= 0:
+                    break
+                if rid == keep or rid in _evicting or rid in expired:
+                    continue
+                record = _runs[rid]
+                victims.append((rid, record.version, record.data))
+                _evicting.add(rid)
+                over -= _resident[rid]
+
+    _drop_expired(expired)
+
+    for rid, version, run in victims:
+        path = _spill_paths.get(rid)
+        try:
+            if path is None:
+                path = _spill_path(rid)
+                artifacts = run.get("_artifacts") or {}
+                gz = artifacts.get("gzip") or gzip.compress(
+                    artifacts.get("identity")
+                    or json.dumps(run["report"], separators=(",", ":"), default=str).encode(),
+                    mtime=0,
+                )
+                if run.get("_sku_table"):
+                    table = json.dumps(run["_sku_table"], separators=(",", ":")).encode()
+                    _write_atomic(_sku_spill_path(rid), gzip.compress(table, mtime=0))
+                _write_atomic(path, gz)
+        except OSError as e:
+            logger.error("Could not spill run %s: %s", rid, e)
+            with _lock:
+                _evicting.discard(rid)
+            continue
+        with _lock:
+            _evicting.discard(rid)
+            current = _runs.get(rid)
+            if current is None:
+                _remove_file(path)
+                continue
+            _spill_paths[rid] = path
+            if current.version != version or "report" not in current.data:
+                continue
+            stub = {k: v for k, v in current.data.items() if k not in _SPILLED_KEYS}
+            _publish(rid, stub, bump=False)
+            _untrack_resident(rid)
+            _stats["evictions"] += 1
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not remove spill file %s: %s", path, e)
+
+
+def store_stats() -> dict[str, Any]:
+    """Residency and eviction counters for monitoring."""
+    with _lock:
+        return {
+            "backend": "memory",
+            "runs": len(_runs),
+            "resident_reports": len(_resident),
+            "resident_bytes": _resident_bytes,
+            "budget_bytes": MEMORY_BUDGET_BYTES,
+            "spilled_reports": sum(1 for rid in _spill_paths if rid not in _resident),
+            "ttl_seconds": RUN_TTL_SECONDS,
+            **_stats,
+        }
 
 
 def update_progress(run_id: str, pct: int, label: str) -> None:
     """Update the progress of a running analysis."""
+    with _lock:
+        current = _runs.get(run_id)
+        if current is not None:
+            _publish(run_id, {**current.data, "progress": {"pct": pct, "label": label}})
+            _emit(run_id, "progress", {"pct": pct, "label": label})
+
+
+def update_queue_position(run_id: str, position: int) -> None:
+    """Record a queued run's 1-based position; 0 means it has left the queue."""
+    with _lock:
+        current = _runs.get(run_id)
+        if current is None:
+            return
+        progress = dict(current.data.get("progress", {"pct": 0, "label": ""}))
+        if position > 0:
+            progress["queue_position"] = position
+            progress["label"] = f"Queued (position {position})"
+        else:
+            progress.pop("queue_position", None)
+        _publish(run_id, {**current.data, "progress": progress})
+        _emit(run_id, "progress", progress)
+
+
+def record_stage(run_id: str, stage: str, **details: Any) -> None:
+    """Announce that a pipeline stage finished (SSE `stage` event only)."""
     with _lock:
         if run_id in _runs:
-            _runs[run_id]["progress"] = {"pct": pct, "label": label}
+            _emit(run_id, "stage", {"stage": stage, **details})
 
 
-def list_runs() -> list[str]:
+def store_profile(run_id: str, files: dict[str, bytes]) -> None:
+    """Attach profiling output (file name → bytes) to an existing run."""
     with _lock:
-        return list(_runs.keys())
+        if run_id in _runs:
+            _profiles[run_id] = dict(files)
 
 
-def list_runs_summary() -> list[dict]:
-    """Return a list of completed runs with metadata (no full report)."""
+def get_profile(run_id: str) -> dict[str, bytes] | None:
+    if _expire_if_due(run_id):
+        return None
+    return _profiles.get(run_id)
+
+
+def delete_run(run_id: str) -> None:
     with _lock:
-        results = []
-        for run_id, data in _runs.items():
-            if data.get("status") != "done":
-                continue
-            report = data.get("report", {})
-            results.append({
-                "id": run_id,
-                "status": "done",
-                "generated_at": report.get("generated_at", ""),
-                "orders_rows": report.get("dataset_summary", {}).get("orders_rows", 0),
-                "returns_rows": report.get("dataset_summary", {}).get("returns_rows", 0),
-                "total_revenue": report.get("profiling", {}).get("total_revenue", 0),
-            })
-        return results
+        _runs.pop(run_id, None)
+        _profiles.pop(run_id, None)
+        _events.pop(run_id, None)
+        _event_seq.pop(run_id, None)
+        _finished_at.pop(run_id, None)
+        _untrack_resident(run_id)
+        path = _spill_paths.pop(run_id, None)
+        cond = _conds.pop(run_id, None)
+        if cond is not None:
+            cond.notify_all()
+    _index_remove(run_id)
+    if path:
+        _remove_file(path)
+        _remove_file(_sku_spill_path(run_id))
+
+
+def wait_for_events(
+    run_id: str, after: int, timeout: float
+) -> list[dict[str, Any]] | None:
+    """
+    Block until the run has events newer than `after` (or `timeout` expires).
+    Returns the new events ([] on timeout), or None if the run doesn't exist.
+    """
+    with _lock:
+        if run_id not in _runs:
+            return None
+        cond = _conds.get(run_id)
+        if cond is None:
+            cond = _conds[run_id] = threading.Condition(_lock)
+        if _event_seq.get(run_id, 0) <= after:
+            cond.wait_for(
+                lambda: run_id not in _runs or _event_seq.get(run_id, 0) > after,
+                timeout=timeout,
+            )
+        if run_id not in _runs:
+            return None
+        return [e for e in _events.get(run_id, []) if e["id"] > after]
+
+
+def publish_partial_action(
+    run_id: str,
+    index: int,
+    action: dict,
+    goal_index: int = 0,
+    business_goal: str | None = None,
+) -> None:
+    """
+    Publish one streamed ranked action while the run is processing.
+
+    Single-goal runs write run["partial"]["ranked_actions"]; multi-goal runs
+    (business_goal given) write run["partial"]["decisions"][goal_index].
+    `index` is a slot, not an append: a retried LLM stream re-emits from 0
+    and simply overwrites what it already published.
+    """
+    with _lock:
+        current = _runs.get(run_id)
+        if current is None or current.data.get("status") != "processing":
+            return
+        # Copy the path down to the changed list; published versions stay intact
+        partial = dict(current.data.get("partial", {}))
+        if business_goal is None:
+            actions = partial["ranked_actions"] = list(partial.get("ranked_actions", []))
+        else:
+            decisions = partial["decisions"] = list(partial.get("decisions", []))
+            while len(decisions) <= goal_index:
+                decisions.append({"business_goal": None, "ranked_actions": []})
+            decision = decisions[goal_index] = {
+                "business_goal": business_goal,
+                "ranked_actions": list(decisions[goal_index]["ranked_actions"]),
+            }
+            actions = decision["ranked_actions"]
+        if index < len(actions):
+            actions[index] = action
+        else:
+            actions.append(action)
+        _publish(run_id, {**current.data, "partial": partial})
+        _emit(run_id, "partial_action",
+              {"goal_index": goal_index, "index": index, "action": action})
+
+
+def list_runs() -> list[str]:
+    _sweep_expired()
+    return list(_runs)
+
+
+def list_runs_summary() -> list[dict]:
+    """Return a list of completed runs with headline metrics (no full report)."""
+    _sweep_expired()
+    return [e[2] for e in _index.get(("done", "created"), ())]
+
+
+def query_runs(
+    status: str | None = "done",
+    sort: str = "generated_at",
+    descending: bool = True,
+    offset: int = 0,
+    limit: int = 100,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    One page of finished-run summaries from the listing index, O(page).
+    `status` None lists every finished run. Returns (summaries, total).
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+    _sweep_expired()
+    entries = _index.get((status, sort), ())
+    total = len(entries)
+    offset, limit = max(0, offset), max(0, limit)
+    if descending:
+        end = max(0, total - offset)
+        page = entries[max(0, end - limit):end][::-1]
+    else:
+        page = entries[offset:offset + limit]
+    return [e[2] for e in page], total
@@ -0,0 +1,55 @@
+"""
+Run store facade — picks the backend named by RUN_STORE_BACKEND.
+
+  memory   process-local dict (default; single worker, lost on restart)
+  sqlite   embedded SQLite file at RUN_STORE_PATH, shared by every worker
+           process on the host and durable across restarts
+
+Both backends expose the same functions; import them from here.
+"""
+
+from __future__ import annotations
+
+from src.config import RUN_STORE_BACKEND
+
+if RUN_STORE_BACKEND == "sqlite":
+    from src.storage import sqlite_store as _backend
+elif RUN_STORE_BACKEND == "memory":
+    from src.storage import memory_store as _backend
+else:
+    raise ValueError(f"Unknown RUN_STORE_BACKEND: {RUN_STORE_BACKEND!r}")
+
+from src.storage.common import TERMINAL_STATUSES  # noqa: E402
+
+BACKEND_NAME = RUN_STORE_BACKEND
+
+store_run = _backend.store_run
+get_run = _backend.get_run
+get_run_versioned = _backend.get_run_versioned
+get_run_state = _backend.get_run_state
+get_run_status = _backend.get_run_status
+report_encodings = _backend.report_encodings
+get_report_artifact = _backend.get_report_artifact
+get_sku_table = _backend.get_sku_table
+store_profile = _backend.store_profile
+get_profile = _backend.get_profile
+update_progress = _backend.update_progress
+update_queue_position = _backend.update_queue_position
+record_stage = _backend.record_stage
+delete_run = _backend.delete_run
+wait_for_events = _backend.wait_for_events
+publish_partial_action = _backend.publish_partial_action
+list_runs = _backend.list_runs
+list_runs_summary = _backend.list_runs_summary
+query_runs = _backend.query_runs
+store_stats = _backend.store_stats
+
+__all__ = [
+    "BACKEND_NAME", "TERMINAL_STATUSES",
+    "store_run", "get_run", "get_run_versioned", "get_run_state", "get_run_status",
+    "report_encodings", "get_report_artifact", "get_sku_table", "store_profile",
+    "get_profile", "update_progress",
+    "update_queue_position", "record_stage", "delete_run", "wait_for_events",
+    "publish_partial_action", "list_runs", "list_runs_summary", "query_runs",
+    "store_stats",
+]
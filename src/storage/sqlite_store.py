@@ -0,0 +1,478 @@
+"""
+SQLite run store — same interface as memory_store, shared across processes.
+
+One database file (WAL mode) holds every run, so several gunicorn workers
+see the same runs and nothing is lost on restart:
+
+  runs           one row per run: small JSON state (status, progress,
+                 partial, ...), the report and the columnar SKU table as
+                 zlib blobs, and indexed summary columns (status,
+                 generated_at, total_revenue)
+  run_artifacts  pre-compressed report encodings (gzip / br / zstd)
+  run_events     bounded per-run event log backing the SSE stream
+  run_profiles   opt-in profiling output (zlib), one row per file
+
+Writes are short BEGIN IMMEDIATE transactions; readers never block writers
+under WAL. `wait_for_events` polls the run's event counter, and is woken
+immediately by writes made in the same process.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from src.config import RUN_STORE_PATH
+from src.storage.common import MAX_EVENTS_PER_RUN, TERMINAL_STATUSES, summarize_run
+from src.utils.artifacts import dumps_compact
+
+logger = logging.getLogger(__name__)
+
+# Longest sleep between polls while waiting for events from another process
+EVENT_POLL_MAX_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            TEXT PRIMARY KEY,
+    status        TEXT NOT NULL DEFAULT '',
+    version       INTEGER NOT NULL DEFAULT 0,
+    event_seq     INTEGER NOT NULL DEFAULT 0,
+    updated_at    REAL NOT NULL,
+    generated_at  TEXT,
+    total_revenue REAL,
+    summary       TEXT,
+    state         TEXT NOT NULL,
+    report        BLOB,
+    sku_table     BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_status_generated ON runs (status, generated_at);
+CREATE INDEX IF NOT EXISTS runs_status_revenue ON runs (status, total_revenue);
+CREATE TABLE IF NOT EXISTS run_artifacts (
+    run_id   TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    body     BLOB NOT NULL,
+    PRIMARY KEY (run_id, encoding)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_events (
+    run_id TEXT NOT NULL,
+    seq    INTEGER NOT NULL,
+    event  TEXT NOT NULL,
+    data   TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_profiles (
+    run_id TEXT NOT NULL,
+    name   TEXT NOT NULL,
+    body   BLOB NOT NULL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+"""
+
+_db_path = RUN_STORE_PATH
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized: set[str] = set()
+# Wakes same-process event waiters right after a commit
+_wake = threading.Condition()
+
+
+def init_store(path: str | None = None) -> None:
+    """Point the store at `path` (default RUN_STORE_PATH) and create the schema."""
+    global _db_path
+    _db_path = path or RUN_STORE_PATH
+    _connect()
+
+
+def _connect() -> sqlite3.Connection:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(_db_path)
+    if conn is not None:
+        return conn
+
+    parent = os.path.dirname(os.path.abspath(_db_path))
+    os.makedirs(parent, exist_ok=True)
+    # Autocommit mode; transactions are opened explicitly below
+    conn = sqlite3.connect(_db_path, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    with _init_lock:
+        if _db_path not in _initialized:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+            if "sku_table" not in columns:  # databases created before the SKU table
+                conn.execute("ALTER TABLE runs ADD COLUMN sku_table BLOB")
+            _initialized.add(_db_path)
+            logger.info("SQLite run store ready at %s", _db_path)
+    conns[_db_path] = conn
+    return conn
+
+
+@contextmanager
+def _write() -> Iterator[sqlite3.Connection]:
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    with _wake:
+        _wake.notify_all()
+
+
+@contextmanager
+def _read() -> Iterator[sqlite3.Connection]:
+    """Consistent snapshot across several SELECTs."""
+    conn = _connect()
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+def _load_state(conn: sqlite3.Connection, run_id: str):
+    row = conn.execute(
+        "SELECT state, version, event_seq FROM runs WHERE id = ?", (run_id,)
+    ).fetchone()
+    if row is None:
+        return None, 0, 0
+    return json.loads(row[0]), row[1], row[2]
+
+
+def _save_state(conn: sqlite3.Connection, run_id: str, state: dict[str, Any]) -> None:
+    conn.execute(
+        "UPDATE runs SET state = ?, status = ?, version = version + 1, updated_at = ? "
+        "WHERE id = ?",
+        (json.dumps(state, default=str), state.get("status", ""), time.time(), run_id),
+    )
+
+
+def _emit(conn: sqlite3.Connection, run_id: str, event: str, data: dict[str, Any]) -> int:
+    """Append to the run's event log (bounded). Caller holds a write transaction."""
+    conn.execute("UPDATE runs SET event_seq = event_seq + 1 WHERE id = ?", (run_id,))
+    seq = conn.execute("SELECT event_seq FROM runs WHERE id = ?", (run_id,)).fetchone()[0]
+    conn.execute(
+        "INSERT INTO run_events (run_id, seq, event, data) VALUES (?, ?, ?, ?)",
+        (run_id, seq, event, json.dumps(data, default=str)),
+    )
+    if seq > MAX_EVENTS_PER_RUN:
+        conn.execute(
+            "DELETE FROM run_events WHERE run_id = ? AND seq <= ?",
+            (run_id, seq - MAX_EVENTS_PER_RUN),
+        )
+    return seq
+
+
+def store_run(run_id: str, data: dict[str, Any]) -> None:
+    data = dict(data)
+    report = data.pop("report", None)
+    artifacts = data.pop("_artifacts", None)
+    sku_table = data.pop("_sku_table", None)
+    with _write() as conn:
+        state, _, _ = _load_state(conn, run_id)
+        if state is None:
+            state = {}
+            conn.execute(
+                "INSERT INTO runs (id, updated_at, state) VALUES (?, ?, '{}')",
+                (run_id, time.time()),
+            )
+        state.update(data)
+        if data.get("status") == "done":
+            # The final report supersedes anything streamed in the meantime
+            state.pop("partial", None)
+        _save_state(conn, run_id, state)
+
+        if report is not None:
+            raw = artifacts["identity"] if artifacts else dumps_compact(report)
+            conn.execute("UPDATE runs SET report = ? WHERE id = ?",
+                         (zlib.compress(raw, 6), run_id))
+        if sku_table is not None:
+            conn.execute("UPDATE runs SET sku_table = ? WHERE id = ?",
+                         (zlib.compress(dumps_compact(sku_table), 6), run_id))
+        if report is not None or data.get("status") in TERMINAL_STATUSES:
+            if report is None:
+                report = _load_run(conn, run_id)[0].get("report", {})
+            summary = summarize_run(run_id, {**state, "report": report})
+            conn.execute(
+                "UPDATE runs SET generated_at = ?, total_revenue = ?, summary = ? WHERE id = ?",
+                (summary["generated_at"], summary["total_revenue"],
+                 json.dumps(summary, default=str), run_id),
+            )
+        if artifacts:
+            # identity is recovered from the report blob; keep only the codings
+            conn.executemany(
+                "INSERT OR REPLACE INTO run_artifacts (run_id, encoding, body) VALUES (?, ?, ?)",
+                [(run_id, enc, body) for enc, body in artifacts.items() if enc != "identity"],
+            )
+
+        if "status" in data:
+            status_event = {"status": data["status"]}
+            if data.get("error"):
+                status_event["error"] = data["error"]
+            seq = _emit(conn, run_id, "status", status_event)
+            if data["status"] in TERMINAL_STATUSES:
+                # Late subscribers only need the tail; drop the rest of the log
+                conn.execute(
+                    "DELETE FROM run_events WHERE run_id = ? AND seq <= ?", (run_id, seq - 16)
+                )
+
+
+def _load_run(conn: sqlite3.Connection, run_id: str) -> tuple[dict[str, Any] | None, int]:
+    row = conn.execute(
+        "SELECT state, version, report FROM runs WHERE id = ?", (run_id,)
+    ).fetchone()
+    if row is None:
+        return None, 0
+    run = json.loads(row[0])
+    if row[2] is not None:
+        raw = zlib.decompress(row[2])
+        run["report"] = json.loads(raw)
+        artifacts = {"identity": raw}
+        artifacts.update(conn.execute(
+            "SELECT encoding, body FROM run_artifacts WHERE run_id = ?", (run_id,)
+        ).fetchall())
+        run["_artifacts"] = artifacts
+    return run, row[1]
+
+
+def get_run(run_id: str) -> dict[str, Any] | None:
+    return get_run_versioned(run_id)[0]
+
+
+def get_run_versioned(run_id: str) -> tuple[dict[str, Any] | None, int]:
+    """Return (run, version) read from the same snapshot."""
+    with _read() as conn:
+        return _load_run(conn, run_id)
+
+
+def get_run_state(run_id: str) -> tuple[dict[str, Any] | None, int]:
+    """(run without its report, version): no report blob is read or parsed."""
+    row = _connect().execute("SELECT state, version FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None, 0
+    return json.loads(row[0]), row[1]
+
+
+def get_run_status(run_id: str) -> str | None:
+    """The run's status ("" before it has one), or None if there is no such run."""
+    row = _connect().execute("SELECT status FROM runs WHERE id = ?", (run_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def report_encodings(run_id: str) -> list[str]:
+    """Encodings the run's report is stored in ([] if it has none)."""
+    with _read() as conn:
+        row = conn.execute(
+            "SELECT report IS NOT NULL FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        if row is None or not row[0]:
+            return []
+        return ["identity"] + [enc for (enc,) in conn.execute(
+            "SELECT encoding FROM run_artifacts WHERE run_id = ?", (run_id,)
+        )]
+
+
+def get_report_artifact(run_id: str, encoding: str = "identity") -> bytes | None:
+    """The serialized report in one encoding, as stored (never re-parsed)."""
+    conn = _connect()
+    if encoding == "identity":
+        row = conn.execute("SELECT report FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return zlib.decompress(row[0]) if row is not None and row[0] is not None else None
+    row = conn.execute(
+        "SELECT body FROM run_artifacts WHERE run_id = ? AND encoding = ?", (run_id, encoding)
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def get_sku_table(run_id: str) -> dict[str, Any] | None:
+    """The run's full columnar SKU table, or None."""
+    row = _connect().execute("SELECT sku_table FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return json.loads(zlib.decompress(row[0]))
+
+
+def update_progress(run_id: str, pct: int, label: str) -> None:
+    """Update the progress of a running analysis."""
+    with _write() as conn:
+        state, _, _ = _load_state(conn, run_id)
+        if state is None:
+            return
+        state["progress"] = {"pct": pct, "label": label}
+        _save_state(conn, run_id, state)
+        _emit(conn, run_id, "progress", {"pct": pct, "label": label})
+
+
+def update_queue_position(run_id: str, position: int) -> None:
+    """Record a queued run's 1-based position; 0 means it has left the queue."""
+    with _write() as conn:
+        state, _, _ = _load_state(conn, run_id)
+        if state is None:
+            return
+        progress = dict(state.get("progress", {"pct": 0, "label": ""}))
+        if position > 0:
+            progress["queue_position"] = position
+            progress["label"] = f"Queued (position {position})"
+        else:
+            progress.pop("queue_position", None)
+        state["progress"] = progress
+        _save_state(conn, run_id, state)
+        _emit(conn, run_id, "progress", progress)
+
+
+def record_stage(run_id: str, stage: str, **details: Any) -> None:
+    """Announce that a pipeline stage finished (SSE `stage` event only)."""
+    with _write() as conn:
+        if conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone():
+            _emit(conn, run_id, "stage", {"stage": stage, **details})
+
+
+def store_profile(run_id: str, files: dict[str, bytes]) -> None:
+    """Attach profiling output (file name → bytes) to an existing run."""
+    with _write() as conn:
+        if not conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone():
+            return
+        conn.executemany(
+            "INSERT OR REPLACE INTO run_profiles (run_id, name, body) VALUES (?, ?, ?)",
+            [(run_id, name, zlib.compress(body, 6)) for name, body in files.items()],
+        )
+
+
+def get_profile(run_id: str) -> dict[str, bytes] | None:
+    rows = _connect().execute(
+        "SELECT name, body FROM run_profiles WHERE run_id = ?", (run_id,)
+    ).fetchall()
+    return {name: zlib.decompress(body) for name, body in rows} or None
+
+
+def delete_run(run_id: str) -> None:
+    with _write() as conn:
+        conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+        conn.execute("DELETE FROM run_profiles WHERE run_id = ?", (run_id,))
+        conn.execute("DELETE FROM run_artifacts WHERE run_id = ?", (run_id,))
+        conn.execute("DELETE FROM run_events WHERE run_id = ?", (run_id,))
+
+
+def wait_for_events(
+    run_id: str, after: int, timeout: float
+) -> list[dict[str, Any]] | None:
+    """
+    Block until the run has events newer than `after` (or `timeout` expires).
+    Returns the new events ([] on timeout), or None if the run doesn't exist.
+    """
+    conn = _connect()
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    while True:
+        row = conn.execute("SELECT event_seq FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if row[0] > after or remaining <= 0:
+            break
+        with _wake:
+            _wake.wait(min(delay, remaining))
+        delay = min(delay * 2, EVENT_POLL_MAX_SECONDS)
+    rows = conn.execute(
+        "SELECT seq, event, data FROM run_events WHERE run_id = ? AND seq > ? ORDER BY seq",
+        (run_id, after),
+    ).fetchall()
+    return [{"id": seq, "event": event, "data": json.loads(data)} for seq, event, data in rows]
+
+
+def publish_partial_action(
+    run_id: str,
+    index: int,
+    action: dict,
+    goal_index: int = 0,
+    business_goal: str | None = None,
+) -> None:
+    """Publish one streamed ranked action while the run is processing (see memory_store)."""
+    with _write() as conn:
+        state, _, _ = _load_state(conn, run_id)
+        if state is None or state.get("status") != "processing":
+            return
+        partial = state.setdefault("partial", {})
+        if business_goal is None:
+            actions = partial.setdefault("ranked_actions", [])
+        else:
+            decisions = partial.setdefault("decisions", [])
+            while len(decisions) <= goal_index:
+                decisions.append({"business_goal": None, "ranked_actions": []})
+            decisions[goal_index]["business_goal"] = business_goal
+            actions = decisions[goal_index]["ranked_actions"]
+        if index < len(actions):
+            actions[index] = action
+        else:
+            actions.append(action)
+        _save_state(conn, run_id, state)
+        _emit(conn, run_id, "partial_action",
+              {"goal_index": goal_index, "index": index, "action": action})
+
+
+def list_runs() -> list[str]:
+    return [r[0] for r in _connect().execute("SELECT id FROM runs ORDER BY rowid")]
+
+
+def list_runs_summary() -> list[dict]:
+    """Return completed runs with headline metrics, read from the summary column."""
+    rows = _connect().execute(
+        "SELECT summary FROM runs WHERE status = 'done' AND summary IS NOT NULL ORDER BY rowid"
+    )
+    return [json.loads(r[0]) for r in rows]
+
+
+# Sort keys of query_runs -> indexed column
+_SORT_COLUMNS = {"created": "rowid", "generated_at": "generated_at",
+                 "total_revenue": "total_revenue"}
+
+
+def query_runs(
+    status: str | None = "done",
+    sort: str = "generated_at",
+    descending: bool = True,
+    offset: int = 0,
+    limit: int = 100,
+) -> tuple[list[dict[str, Any]], int]:
+    """One page of finished-run summaries, served from the status/sort indexes."""
+    if sort not in _SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(_SORT_COLUMNS)}")
+    column = _SORT_COLUMNS[sort]
+    direction = "DESC" if descending else "ASC"
+    if status is None:
+        where, params = "status IN ('done', 'error') AND summary IS NOT NULL", ()
+    else:
+        where, params = "status = ? AND summary IS NOT NULL", (status,)
+    with _read() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM runs WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT summary FROM runs WHERE {where} "
+            f"ORDER BY {column} {direction}, rowid {direction} LIMIT ? OFFSET ?",
+            (*params, max(0, limit), max(0, offset)),
+        ).fetchall()
+    return [json.loads(r[0]) for r in rows], total
+
+
+def store_stats() -> dict[str, Any]:
+    """Row counts and file size for monitoring."""
+    conn = _connect()
+    runs, reports = conn.execute(
+        "SELECT COUNT(*), COUNT(report) FROM runs"
+    ).fetchone()
+    try:
+        db_bytes = os.path.getsize(_db_path)
+    except OSError:
+        db_bytes = 0
+    return {"backend": "sqlite", "runs": runs, "stored_reports": reports, "db_bytes": db_bytes}
@@ -0,0 +1,64 @@
+"""
+Serialized report artifacts, built once when a run finishes.
+
+`build_report_artifacts` returns the report as compact JSON bytes plus
+pre-compressed variants keyed by HTTP content-coding:
+
+  identity  always
+  gzip      always (stdlib)
+  br        if the optional `brotli` package is installed
+  zstd      if the optional `zstandard` package is installed
+
+Download/report endpoints serve these bytes directly instead of running
+json.dumps on every request.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Server preference when the client rates several codings equally
+ENCODING_PREFERENCE = ("br", "zstd", "gzip", "identity")
+
+
+def dumps_compact(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def build_report_artifacts(report: dict[str, Any]) -> dict[str, bytes]:
+    raw = dumps_compact(report)
+    artifacts = {
+        "identity": raw,
+        # mtime=0 keeps the bytes (and therefore range requests) deterministic
+        "gzip": gzip.compress(raw, compresslevel=6, mtime=0),
+    }
+    try:
+        import brotli
+        artifacts["br"] = brotli.compress(raw, quality=5)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        artifacts["zstd"] = zstandard.ZstdCompressor(level=6).compress(raw)
+    except ImportError:
+        pass
+    logger.info(
+        "Report artifacts built: %s",
+        ", ".join(f"{k}={len(v)}B" for k, v in artifacts.items()),
+    )
+    return artifacts
+
+
+def choose_encoding(accept_encodings, available: dict[str, bytes]) -> str:
+    """
+    Pick a content-coding from a werkzeug Accept (request.accept_encodings).
+    Falls back to identity.
+    """
+    offered = [e for e in ENCODING_PREFERENCE if e in available]
+    best = accept_encodings.best_match(offered, default="identity")
+    return best if best in available else "identity"
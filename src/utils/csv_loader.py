@@ -33,6 +33,9 @@ SYNONYMS = {
     "return_amount": ["refund", "refund_value", "amount_returned", "return_value"]
 }
 
+ORDER_NUMERIC_COLS = ["quantity", "item_price", "discount_amount", "refund_amount", "line_total"]
+RETURN_NUMERIC_COLS = ["return_amount"]
+
 
 def _read_csv(source) -> pd.DataFrame:
     """Read a CSV from a Flask FileStorage object, path string, or StringIO."""
@@ -45,29 +48,32 @@ def _read_csv(source) -> pd.DataFrame:
     return pd.read_csv(StringIO(raw))
 
 
-def _normalise_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Lowercase + strip column names and handle fuzzy mapping."""
+def canonical_columns(columns) -> list[str]:
+    """Cleaned column names with synonyms mapped to our internal keys."""
     # Phase 1: Basic cleaning
-    df.columns = [str(c).strip().lower().replace(" ", "_").replace(".", "_") for c in df.columns]
-    
+    cleaned = [str(c).strip().lower().replace(" ", "_").replace(".", "_") for c in columns]
+
     # Phase 2: Fuzzy mapping
     mapping = {}
-    current_cols = set(df.columns)
-    
+    current_cols = set(cleaned)
+
     for canonical, list_of_synonyms in SYNONYMS.items():
         # If we already have the canonical column, skip
         if canonical in current_cols:
             continue
-            
+
         # Check if any synonym exists in the current columns
         for syn in list_of_synonyms:
             if syn in current_cols:
                 mapping[syn] = canonical
                 break # Map only the first match
-                
-    if mapping:
-        df = df.rename(columns=mapping)
-        
+
+    return [mapping.get(c, c) for c in cleaned]
+
+
+def _normalise_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Lowercase + strip column names and handle fuzzy mapping."""
+    df.columns = canonical_columns(df.columns)
     return df
 
 
@@ -96,8 +102,7 @@ def load_orders_csv(source) -> tuple[pd.DataFrame, list[str]]:
     df = _normalise_columns(df)
     notes = validate_orders(df)
 
-    numeric_cols = ["quantity", "item_price", "discount_amount", "refund_amount", "line_total"]
-    df = _coerce_numeric(df, numeric_cols)
+    df = _coerce_numeric(df, ORDER_NUMERIC_COLS)
     df = _coerce_dates(df, ["order_date"])
 
     # Compute revenue per row
@@ -130,8 +135,7 @@ def load_returns_csv(source) -> tuple[pd.DataFrame, list[str]]:
     df = _normalise_columns(df)
     notes = validate_returns(df)
 
-    numeric_cols = ["return_amount"]
-    df = _coerce_numeric(df, numeric_cols)
+    df = _coerce_numeric(df, RETURN_NUMERIC_COLS)
     df = _coerce_dates(df, ["return_date"])
 
     return df, notes
@@ -3,6 +3,8 @@ import logging
 from functools import wraps
 from typing import Callable, Any
 
+from src.utils import tracing
+
 logger = logging.getLogger(__name__)
 
 def retry_on_exception(
@@ -14,6 +16,7 @@ def retry_on_exception(
     """
     Exponential backoff retry decorator.
     A hallmark of robust service-to-service communication.
+    Each attempt is traced as its own span tagged with the attempt number.
     """
     def decorator(func: Callable):
         @wraps(func)
@@ -23,7 +26,9 @@ def retry_on_exception(
             
             for attempt in range(max_retries):
                 try:
-                    return func(*args, **kwargs)
+                    with tracing.span(func.__qualname__, attempt=attempt + 1,
+                                      max_attempts=max_retries):
+                        return func(*args, **kwargs)
                 except exceptions as e:
                     last_exception = e
                     logger.warning(
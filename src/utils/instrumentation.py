@@ -0,0 +1,188 @@
+"""
+Per-stage instrumentation for pipeline runs.
+
+    timings: list[dict] = []
+    with stage(timings, "profile", rows_in=len(orders_df)) as rec:
+        profiling = profile_orders(orders_df, returns_df)
+        rec["rows_out"] = len(profiling["_sku_revenue"])
+
+Every stage record carries:
+  wall_s              wall-clock seconds
+  cpu_s               CPU seconds of the calling thread only, so concurrent
+                      runs don't bleed into each other — but work done on
+                      other threads (polars / DuckDB / process workers) is
+                      missing
+  process_cpu_s       CPU seconds of the whole process, engine threads
+                      included (and any concurrent run's work)
+  peak_rss_delta_mb   highest RSS seen while the stage ran, above the RSS
+                      at its start: sampled every STAGE_RSS_SAMPLE_MS by a
+                      background thread while any stage is open
+plus optional rows in/out and — for LLM calls — token usage reported from
+inside the call via `add_llm_usage`. RSS is process-wide, so concurrent
+runs' allocations show up in each other's peaks. Where current RSS can't be
+read (no /proc) the delta falls back to growth of the process's ru_maxrss
+high-water mark, which is 0 for any stage that stays under an earlier peak.
+
+Records are plain dicts so they pickle across the process backend and go
+straight into the run record's `timings` section; src.utils.metrics
+aggregates them for GET /metrics. Each stage is also a trace span
+(src.utils.tracing) carrying the same measurements as attributes.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from src.config import STAGE_RSS_SAMPLE_MS
+from src.utils import tracing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The innermost open stage on this thread / context, for add_llm_usage
+_current: ContextVar[dict | None] = ContextVar("margintel_stage", default=None)
+
+# ru_maxrss is kilobytes on Linux, bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss_bytes() -> int:
+    """The process's RSS high-water mark since it started (never decreases)."""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _current_rss_bytes() -> int | None:
+    """Resident set size right now, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# [start, highest seen] RSS of every open stage, keyed by id(); the sampler
+# thread raises "highest seen" while at least one stage is open
+_rss_lock = threading.Lock()
+_rss_watches: dict[int, list[int]] = {}
+_rss_wakeup = threading.Event()
+_rss_sampler: threading.Thread | None = None
+
+
+def _sample_rss() -> None:
+    interval = max(STAGE_RSS_SAMPLE_MS, 1.0) / 1000
+    while True:
+        _rss_wakeup.wait()
+        time.sleep(interval)
+        rss = _current_rss_bytes() or 0
+        with _rss_lock:
+            if not _rss_watches:
+                _rss_wakeup.clear()
+            for watch in _rss_watches.values():
+                watch[1] = max(watch[1], rss)
+
+
+def _watch_rss() -> list[int] | None:
+    """Start tracking the peak RSS of a stage; None if RSS can't be read."""
+    global _rss_sampler
+    rss = _current_rss_bytes()
+    if rss is None:
+        return None
+    watch = [rss, rss]
+    with _rss_lock:
+        _rss_watches[id(watch)] = watch
+        if _rss_sampler is None:
+            _rss_sampler = threading.Thread(target=_sample_rss, name="stage-rss-sampler",
+                                            daemon=True)
+            _rss_sampler.start()
+    _rss_wakeup.set()
+    return watch
+
+
+def _unwatch_rss(watch: list[int]) -> int:
+    """Stop tracking; the stage's peak RSS above its starting RSS, in bytes."""
+    with _rss_lock:
+        _rss_watches.pop(id(watch), None)
+    start, peak = watch
+    return max(peak, _current_rss_bytes() or 0) - start
+
+
+@contextmanager
+def stage(
+    sink: list[dict] | None,
+    name: str,
+    rows_in: int | None = None,
+    **details: Any,
+) -> Iterator[dict[str, Any]]:
+    """
+    Time the enclosed block as stage `name` and append its record to `sink`.
+    The yielded record can be annotated (rows_out, bytes_out, ...) before
+    the block ends. A stage that raises is recorded with `error: true`.
+    """
+    rec: dict[str, Any] = {"stage": name, **details}
+    if rows_in is not None:
+        rec["rows_in"] = int(rows_in)
+    with tracing.span(name, stage=name, **details) as sp:
+        token = _current.set(rec)
+        watch = _watch_rss()
+        peak_before = _peak_rss_bytes() if watch is None else 0
+        cpu_started = time.thread_time()
+        process_cpu_started = time.process_time()
+        started = time.perf_counter()
+        try:
+            yield rec
+        except BaseException:
+            rec["error"] = True
+            raise
+        finally:
+            rec["wall_s"] = round(time.perf_counter() - started, 6)
+            rec["cpu_s"] = round(time.thread_time() - cpu_started, 6)
+            rec["process_cpu_s"] = round(time.process_time() - process_cpu_started, 6)
+            rss_delta = _unwatch_rss(watch) if watch is not None else _peak_rss_bytes() - peak_before
+            rec["peak_rss_delta_mb"] = round(max(0, rss_delta) / 1e6, 3)
+            _current.reset(token)
+            if sink is not None:
+                sink.append(rec)
+            for key in ("rows_in", "rows_out", "bytes_out", "cpu_s", "process_cpu_s",
+                        "peak_rss_delta_mb"):
+                if key in rec:
+                    sp.set_attribute(key, rec[key])
+
+
+def add_llm_usage(prompt_tokens: int | None, completion_tokens: int | None) -> None:
+    """Add provider-reported token usage to the stage currently open, if any."""
+    rec = _current.get()
+    if rec is None:
+        return
+    tokens = rec.setdefault("llm_tokens", {"prompt": 0, "completion": 0, "calls": 0})
+    tokens["prompt"] += int(prompt_tokens or 0)
+    tokens["completion"] += int(completion_tokens or 0)
+    tokens["calls"] += 1
+    tracing.set_attribute("llm.prompt_tokens", int(prompt_tokens or 0))
+    tracing.set_attribute("llm.completion_tokens", int(completion_tokens or 0))
+
+
+def summarize_timings(stages: list[dict], total_wall_s: float | None = None) -> dict[str, Any]:
+    """The run record's `timings` section: stage records plus run-level totals."""
+    prompt = sum(s.get("llm_tokens", {}).get("prompt", 0) for s in stages)
+    completion = sum(s.get("llm_tokens", {}).get("completion", 0) for s in stages)
+    out: dict[str, Any] = {
+        "stages": stages,
+        "cpu_s": round(sum(s.get("cpu_s", 0.0) for s in stages), 6),
+        "llm_tokens": {"prompt": prompt, "completion": completion},
+    }
+    if total_wall_s is not None:
+        out["wall_s"] = round(total_wall_s, 6)
+    return out
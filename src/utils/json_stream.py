@@ -0,0 +1,102 @@
+"""
+Incremental JSON array item extraction for streamed LLM output.
+
+The model streams one JSON document token by token. We don't want to wait
+for the closing brace to show results, so this scanner watches for a named
+top-level array (e.g. "ranked_actions") and emits each element as soon as
+its closing bracket arrives.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+
+class StreamingArrayParser:
+    """
+    Feed text chunks in, get completed array items out.
+
+    Only objects/arrays/strings inside the target array are tracked; scalars
+    are ignored (ranked_actions only ever contains objects).
+    """
+
+    def __init__(self, key: str):
+        self._key_re = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._key_len = len(key) + 2  # the quoted key the pattern starts with
+        self._buf = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = -1
+        self.items: list[Any] = []
+
+    def feed(self, chunk: str) -> list[Any]:
+        """Consume a chunk; return items completed by it (may be empty)."""
+        if self._done or not chunk:
+            return []
+        self._buf += chunk
+
+        if not self._in_array:
+            match = self._key_re.search(self._buf)
+            if not match:
+                # Keep only the tail a match could still start in, so the next
+                # chunk isn't searched together with everything before it
+                end = len(self._buf.rstrip(" \t\r\n:"))
+                self._buf = self._buf[max(0, end - self._key_len):]
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        completed: list[Any] = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the target array itself
+                    self._done = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._item_start >= 0:
+                    item = self._decode(buf[self._item_start:i + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._item_start = -1
+            i += 1
+
+        # Drop consumed text we no longer need to keep the buffer small
+        keep_from = self._item_start if self._item_start >= 0 else i
+        self._buf = buf[keep_from:]
+        if self._item_start >= 0:
+            self._item_start = 0
+        self._pos = i - keep_from
+
+        self.items.extend(completed)
+        return completed
+
+    @staticmethod
+    def _decode(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
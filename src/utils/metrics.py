@@ -0,0 +1,169 @@
+"""
+Process-local Prometheus metrics, rendered in the text exposition format
+for GET /metrics.
+
+Run-level aggregates are fed from the stage records produced by
+src.utils.instrumentation once a run finishes (`observe_run`). Each gunicorn
+worker keeps its own registry, so scrape workers individually or sum on the
+Prometheus side.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Iterable
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(float(2 ** p) for p in range(20, 34, 2))  # 1 MiB … 8 GiB
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help_text, labelnames
+        self._values: dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels → [per-bucket counts..., +Inf count], sum
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[idx] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(tuple(str(labels[n]) for n in self.labelnames))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = f'le="{_num(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+RUNS = REGISTRY.register(Counter(
+    "margintel_runs_total", "Pipeline runs finished, by final status.", ("status",)))
+RUN_DURATION = REGISTRY.register(Histogram(
+    "margintel_run_duration_seconds", "Wall time from ingestion to final status.", ("status",)))
+STAGE_WALL = REGISTRY.register(Histogram(
+    "margintel_stage_duration_seconds", "Wall time per pipeline stage.", ("stage",)))
+STAGE_CPU = REGISTRY.register(Histogram(
+    "margintel_stage_cpu_seconds", "CPU time per pipeline stage, calling thread only.", ("stage",)))
+STAGE_PROCESS_CPU = REGISTRY.register(Histogram(
+    "margintel_stage_process_cpu_seconds",
+    "Process CPU time during a pipeline stage (all threads, concurrent runs included).", ("stage",)))
+STAGE_PEAK_RSS = REGISTRY.register(Histogram(
+    "margintel_stage_peak_rss_delta_bytes",
+    "Peak process RSS during a stage above the RSS at its start.",
+    ("stage",), buckets=BYTES_BUCKETS))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "margintel_stage_errors_total", "Stages that raised.", ("stage",)))
+STAGE_ROWS = REGISTRY.register(Counter(
+    "margintel_stage_rows_total", "Rows consumed and produced per stage.", ("stage", "direction")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "margintel_llm_tokens_total", "Provider-reported LLM token usage.", ("stage", "kind")))
+LLM_CALLS = REGISTRY.register(Counter(
+    "margintel_llm_calls_total",
+    "LLM completion responses that reported token usage (failed attempts not counted).",
+    ("stage",)))
+
+
+def observe_run(timings: dict[str, Any], status: str) -> None:
+    """Fold one finished run's `timings` section into the registry."""
+    RUNS.inc(status=status)
+    if "wall_s" in timings:
+        RUN_DURATION.observe(timings["wall_s"], status=status)
+    for rec in timings.get("stages", []):
+        name = rec["stage"]
+        STAGE_WALL.observe(rec.get("wall_s", 0.0), stage=name)
+        STAGE_CPU.observe(rec.get("cpu_s", 0.0), stage=name)
+        STAGE_PROCESS_CPU.observe(rec.get("process_cpu_s", 0.0), stage=name)
+        STAGE_PEAK_RSS.observe(rec.get("peak_rss_delta_mb", 0.0) * 1e6, stage=name)
+        if rec.get("error"):
+            STAGE_ERRORS.inc(stage=name)
+        for direction in ("in", "out"):
+            if f"rows_{direction}" in rec:
+                STAGE_ROWS.inc(rec[f"rows_{direction}"], stage=name, direction=direction)
+        tokens = rec.get("llm_tokens")
+        if tokens:
+            LLM_TOKENS.inc(tokens["prompt"], stage=name, kind="prompt")
+            LLM_TOKENS.inc(tokens["completion"], stage=name, kind="completion")
+            LLM_CALLS.inc(tokens["calls"], stage=name)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,85 @@
+"""
+Field projection + pagination over nested run documents.
+
+  project(doc, ["status", "report.profiling.total_revenue"])
+      → {"status": ..., "report": {"profiling": {"total_revenue": ...}}}
+
+  paginate(doc, "report.profiling.sku_revenue_breakdown", offset=0, limit=50)
+      → same doc with that list/dict sliced, plus a page descriptor
+
+Paths are dot-separated keys; unknown paths are simply absent from the result.
+Nothing here mutates the input document.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+_MISSING = object()
+
+
+def _lookup(doc: Any, parts: list[str]) -> Any:
+    node = doc
+    for part in parts:
+        if not isinstance(node, dict) or part not in node:
+            return _MISSING
+        node = node[part]
+    return node
+
+
+def project(doc: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    """Return a new dict containing only the requested dotted paths."""
+    out: dict[str, Any] = {}
+    for field in fields:
+        parts = [p for p in field.strip().split(".") if p]
+        if not parts:
+            continue
+        value = _lookup(doc, parts)
+        if value is _MISSING:
+            continue
+        node = out
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        node[parts[-1]] = value
+    return out
+
+
+def paginate(
+    doc: dict[str, Any],
+    path: str,
+    offset: int,
+    limit: int,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """
+    Slice the list (or dict, in insertion order) found at `path`.
+    Returns (new_doc, page_info); page_info is None when `path` is not found
+    or isn't a list/dict. Containers along the path are shallow-copied.
+    """
+    parts = [p for p in path.split(".") if p]
+    target = _lookup(doc, parts)
+    if not parts or not isinstance(target, (list, dict)):
+        return doc, None
+
+    offset = max(0, offset)
+    limit = max(0, limit)
+    total = len(target)
+    if isinstance(target, list):
+        sliced: Any = target[offset:offset + limit]
+    else:
+        keys = list(target)[offset:offset + limit]
+        sliced = {k: target[k] for k in keys}
+
+    new_doc = dict(doc)
+    node = new_doc
+    for part in parts[:-1]:
+        node[part] = dict(node[part])
+        node = node[part]
+    node[parts[-1]] = sliced
+
+    next_offset = offset + limit if offset + limit < total else None
+    page = {"path": path, "offset": offset, "limit": limit, "total": total,
+            "next_offset": next_offset}
+    return new_doc, page
@@ -0,0 +1,291 @@
+"""
+Opt-in profiling of a single run (POST /v1/runs with profile=true).
+
+    profiler = RunProfiler()
+    with capture(profiler, "ingest"):
+        load_orders_csv(...)
+    ...                                   # later, on the worker thread
+    profiler.start_tracing()
+    with capture(profiler, "pipeline"):
+        run_the_stages()
+    files = profiler.finish()             # while the run's data is still alive
+
+Four files per run:
+  profile.pstats      cProfile of every captured thread, merged (marshal
+                      format — load with pstats.Stats / snakeviz)
+  stacks.collapsed    wall-clock stack samples of the captured threads in
+                      Brendan Gregg's collapsed format (flamegraph.pl,
+                      speedscope, inferno); the root frame is the capture label
+  allocations.json    top allocation sites by memory retained since a worker
+                      picked the run up — innermost frame plus the nearest
+                      frame in this repo — and the traced peak (tracemalloc)
+  profile.txt         human-readable top functions by cumulative time
+
+tracemalloc is process-global and slows every allocation in the process, so
+it only runs between start_tracing() and finish(): not while the run waits in
+the queue. Allocations made by other runs executing at the same time are
+included. Nothing in this module runs unless a profiler
+was requested: for unprofiled runs `capture(None, ...)` is a nullcontext.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import linecache
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator
+
+from src.config import PROFILE_SAMPLE_INTERVAL_MS
+
+TOP_ALLOCATIONS = 50
+TOP_FUNCTIONS = 40
+MAX_STACK_DEPTH = 128
+TRACE_FRAMES = 16
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILE_FILES = {
+    "profile.pstats": "application/octet-stream",
+    "stacks.collapsed": "text/plain; charset=utf-8",
+    "allocations.json": "application/json",
+    "profile.txt": "text/plain; charset=utf-8",
+}
+
+# tracemalloc is shared by every profiled run in the process
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+
+def _trace_acquire() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            _trace_owned = True
+        _trace_users += 1
+
+
+def _trace_release() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """Samples the registered threads' stacks every `interval` seconds."""
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="run-profiler-sampler", daemon=True)
+        self.interval = interval
+        self.threads: dict[int, str] = {}  # thread ident -> root label
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, label in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None and len(names) < MAX_STACK_DEPTH:
+                    names.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join([label, *reversed(names)])] += 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class RunProfiler:
+    """Collects one run's CPU profile, stack samples and allocations."""
+
+    def __init__(self, sample_interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS) -> None:
+        self._lock = threading.Lock()
+        self._profiles: list[cProfile.Profile] = []
+        self._active: set[int] = set()
+        self._notes: list[str] = []
+        self._sampler = _StackSampler(max(sample_interval_ms, 0.5) / 1000)
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._started = time.perf_counter()
+        self._finished = False
+        self._sampler.start()
+
+    def start_tracing(self) -> None:
+        """Start tracing allocations (once; when the run starts executing)."""
+        with self._lock:
+            if self._baseline is not None or self._finished:
+                return
+            _trace_acquire()
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.take_snapshot()
+
+    @contextmanager
+    def capture(self, label: str) -> Iterator[None]:
+        """Profile the current thread for the duration of the block."""
+        ident = threading.get_ident()
+        with self._lock:
+            nested = ident in self._active or self._finished
+            if not nested:
+                self._active.add(ident)
+        if nested:
+            yield
+            return
+
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError as e:  # another profiler owns this interpreter (3.12+)
+            prof = None
+            self._note(f"cProfile unavailable for {label}: {e}")
+        self._sampler.threads[ident] = label
+        try:
+            yield
+        finally:
+            self._sampler.threads.pop(ident, None)
+            if prof is not None:
+                prof.disable()
+                with self._lock:
+                    self._profiles.append(prof)
+            with self._lock:
+                self._active.discard(ident)
+
+    def _note(self, message: str) -> None:
+        with self._lock:
+            self._notes.append(message)
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def _stop(self) -> bool:
+        """Stop sampling; False if the profiler was already stopped."""
+        with self._lock:
+            if self._finished:
+                return False
+            self._finished = True
+        self._sampler.stop()
+        self._sampler.join(timeout=1)
+        return True
+
+    def discard(self) -> None:
+        """Stop without rendering (the run never reached the pipeline)."""
+        if self._stop() and self._baseline is not None:
+            _trace_release()
+
+    def finish(self) -> dict[str, bytes]:
+        """
+        Stop sampling and tracing and render the profile files (name → bytes).
+        Call it after the last capture() but while the run's frames are still
+        referenced, so the allocation snapshot sees what the run retained.
+        """
+        if not self._stop():
+            raise RuntimeError("profiler already finished")
+        elapsed = time.perf_counter() - self._started
+        if self._baseline is not None:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            _trace_release()
+            allocations = self._allocations(snapshot, peak)
+        else:
+            peak = 0
+            allocations = {"traced_peak_bytes": 0, "retained_bytes": 0, "top": []}
+            self._note("allocations not traced: the run never started executing")
+        stats = self._merged_stats()
+
+        collapsed = "".join(
+            f"{stack} {count}\n" for stack, count in self._sampler.stacks.most_common()
+        )
+        text = io.StringIO()
+        text.write(f"wall {elapsed:.3f}s, {self._sampler.samples} stack samples, "
+                   f"traced peak {peak / 1e6:.1f} MB\n")
+        for note in self._notes:
+            text.write(f"note: {note}\n")
+        if stats is not None:
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+        return {
+            "profile.pstats": marshal.dumps(stats.stats) if stats is not None else b"",
+            "stacks.collapsed": collapsed.encode(),
+            "allocations.json": json.dumps(allocations, indent=1).encode(),
+            "profile.txt": text.getvalue().encode(),
+        }
+
+    def _merged_stats(self) -> pstats.Stats | None:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for prof in profiles[1:]:
+            stats.add(prof)
+        return stats
+
+    def _allocations(self, snapshot: tracemalloc.Snapshot, peak: int) -> dict[str, Any]:
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, __file__),
+        ]
+        diffs = snapshot.filter_traces(ignore).compare_to(
+            self._baseline.filter_traces(ignore), "traceback"
+        )
+        top = []
+        for diff in diffs:
+            if diff.size_diff <= 0:
+                continue
+            frames = list(diff.traceback)  # oldest first
+            site = frames[-1]
+            caller = next((f for f in reversed(frames) if _is_project_file(f.filename)), None)
+            top.append({
+                "site": _frame_dict(site),
+                "caller": _frame_dict(caller) if caller is not None else None,
+                "size_diff_bytes": diff.size_diff,
+                "count_diff": diff.count_diff,
+            })
+            if len(top) >= TOP_ALLOCATIONS:
+                break
+        return {
+            "traced_peak_bytes": peak,
+            "retained_bytes": sum(d.size_diff for d in diffs),
+            "top": top,
+        }
+
+
+def _is_project_file(filename: str) -> bool:
+    path = os.path.abspath(filename)
+    return path.startswith(PROJECT_ROOT + os.sep) and "site-packages" not in path
+
+
+def _frame_dict(frame: tracemalloc.Frame) -> dict[str, Any]:
+    return {
+        "file": os.path.relpath(frame.filename, PROJECT_ROOT)
+        if _is_project_file(frame.filename) else frame.filename,
+        "line": frame.lineno,
+        "code": linecache.getline(frame.filename, frame.lineno).strip(),
+    }
+
+
+def capture(profiler: RunProfiler | None, label: str):
+    """`profiler.capture(label)`, or a no-op context when not profiling."""
+    return profiler.capture(label) if profiler is not None else nullcontext()
@@ -0,0 +1,163 @@
+"""
+Zero-pickle DataFrame hand-off between processes via shared memory.
+
+`share_frame` lays every column out in one multiprocessing.SharedMemory
+block, Arrow-style:
+
+  - numeric / bool columns   → raw buffer
+  - datetime64 columns       → int64 buffer + dtype string
+  - string/object columns    → int64 dictionary codes + UTF-8 dictionary
+                               (offsets buffer + bytes buffer)
+
+Only a small handle (names, dtypes, offsets) crosses the process boundary.
+`attach_frame` rebuilds a DataFrame whose numeric columns are views onto the
+shared block, so the worker never receives a pickled copy of the data.
+
+The index travels too: a RangeIndex as its start/stop/step, any other
+single-level index encoded like a column. MultiIndex frames are rejected.
+
+Lifecycle: the parent owns the block. It keeps the returned SharedMemory
+alive until the worker is done, then calls `release(shm, unlink=True)`.
+"""
+
+from __future__ import annotations
+
+import pickle
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_ALIGN = 64
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _encode_column(series: pd.Series) -> tuple[dict[str, Any], list[np.ndarray]]:
+    """Return (column spec, buffers to place in shared memory)."""
+    dtype = series.dtype
+    if dtype.kind in "biuf" and isinstance(dtype, np.dtype):
+        return {"kind": "numeric", "dtype": dtype.str}, [series.to_numpy()]
+    if dtype.kind == "M" and isinstance(dtype, np.dtype):
+        return {"kind": "datetime", "dtype": str(dtype)}, [series.to_numpy().view("i8")]
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = list(uniques)
+    spec: dict[str, Any] = {"kind": "dictionary", "dtype": str(dtype)}
+    if all(isinstance(v, str) for v in values):
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return spec, [codes.astype(np.int64, copy=False), offsets, blob]
+    # Mixed-type dictionaries are rare (and small); pickle just the dictionary
+    spec["pickled_dictionary"] = pickle.dumps(values)
+    return spec, [codes.astype(np.int64, copy=False)]
+
+
+def _encode_index(index: pd.Index) -> tuple[dict[str, Any], list[np.ndarray]]:
+    """Like `_encode_column`, but a RangeIndex needs no buffers at all."""
+    if isinstance(index, pd.MultiIndex):
+        raise ValueError("share_frame does not support a MultiIndex; reset_index() first")
+    if isinstance(index, pd.RangeIndex):
+        return {"kind": "range", "start": index.start, "stop": index.stop,
+                "step": index.step}, []
+    return _encode_column(pd.Series(index, copy=False))
+
+
+def share_frame(df: pd.DataFrame) -> tuple[dict[str, Any], shared_memory.SharedMemory]:
+    """Copy `df` (columns and index) into one shared-memory block. Returns (handle, shm)."""
+    specs = []
+    buffers: list[np.ndarray] = []
+    encoded = [(_encode_index(df.index), df.index.name)]
+    encoded += [(_encode_column(df[name]), name) for name in df.columns]
+    for (spec, bufs), name in encoded:
+        spec["name"] = name
+        spec["buffers"] = []
+        for buf in bufs:
+            buf = np.ascontiguousarray(buf)
+            spec["buffers"].append({"dtype": buf.dtype.str, "length": int(buf.shape[0])})
+            buffers.append(buf)
+        specs.append(spec)
+
+    total = sum(_aligned(b.nbytes) for b in buffers) or _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=total)
+    offset = 0
+    it = iter(buffers)
+    for spec in specs:
+        for meta in spec["buffers"]:
+            buf = next(it)
+            meta["offset"] = offset
+            target = np.ndarray(buf.shape, dtype=buf.dtype, buffer=shm.buf, offset=offset)
+            target[...] = buf
+            del target
+            offset += _aligned(buf.nbytes)
+
+    handle = {"shm_name": shm.name, "rows": len(df), "index": specs[0], "columns": specs[1:]}
+    return handle, shm
+
+
+def _decode_column(spec: dict[str, Any], shm: shared_memory.SharedMemory):
+    bufs = [
+        np.ndarray((m["length"],), dtype=np.dtype(m["dtype"]), buffer=shm.buf, offset=m["offset"])
+        for m in spec["buffers"]
+    ]
+    kind = spec["kind"]
+    if kind == "numeric":
+        return bufs[0]
+    if kind == "datetime":
+        return bufs[0].view(spec["dtype"])
+    codes = bufs[0]
+    if "pickled_dictionary" in spec:
+        values = pickle.loads(spec["pickled_dictionary"])
+    else:
+        offsets, blob = bufs[1], bufs[2].tobytes()
+        values = [blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                  for i in range(len(offsets) - 1)]
+    dictionary = np.empty(len(values) + 1, dtype=object)
+    dictionary[:-1] = values
+    dictionary[-1] = np.nan       # code -1 (missing) indexes the last slot
+    col = pd.Series(dictionary.take(codes), copy=False)
+    if spec["dtype"] != "object":
+        col = col.astype(spec["dtype"])
+    return col
+
+
+def attach_frame(handle: dict[str, Any]) -> tuple[pd.DataFrame, shared_memory.SharedMemory]:
+    """
+    Rebuild the DataFrame described by `handle` inside a worker.
+    Numeric/datetime columns are views onto shared memory; call
+    `release(shm)` once the frame (and anything viewing it) is dropped.
+    """
+    shm = shared_memory.SharedMemory(name=handle["shm_name"])
+    spec = handle["index"]
+    if spec["kind"] == "range":
+        index = pd.RangeIndex(spec["start"], spec["stop"], spec["step"], name=spec["name"])
+    else:
+        index = pd.Index(_decode_column(spec, shm), name=spec["name"], copy=False)
+    columns: dict[str, Any] = {}
+    for spec in handle["columns"]:
+        col = _decode_column(spec, shm)
+        if isinstance(col, pd.Series):
+            col.index = index     # decoded on a default index; align by position
+        columns[spec["name"]] = col
+
+    df = pd.DataFrame(columns, index=index, copy=False)
+    return df, shm
+
+
+def release(shm: shared_memory.SharedMemory, unlink: bool = False) -> None:
+    """Close (and optionally unlink) a block, tolerating lingering views."""
+    try:
+        shm.close()
+    except BufferError:
+        # A view is still alive somewhere; the mapping is freed with it.
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,77 @@
+"""
+Columnar per-SKU revenue table.
+
+The full breakdown is kept outside the report as parallel arrays:
+
+  {"sku": [...], "revenue": [...], "by_sku": [...], "total_revenue": float}
+
+`sku`/`revenue` are sorted by revenue (descending); `by_sku` is the index
+permutation that orders rows by SKU name. The report itself only carries
+the top-N (see `top_n_breakdown`), and GET /v1/runs/<id>/skus pages
+through this table with `query_sku_table`.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def build_sku_table(sku_revenue: dict) -> dict[str, Any]:
+    """Build the columnar table from the profiler's {sku: revenue} mapping."""
+    import numpy as np
+
+    skus = np.array([str(k) for k in sku_revenue], dtype=object)
+    revenue = np.fromiter(sku_revenue.values(), dtype=float, count=len(sku_revenue))
+    order = np.argsort(-revenue, kind="stable")
+    skus, revenue = skus[order], np.round(revenue[order], 2)
+    return {
+        "sku": skus.tolist(),
+        "revenue": revenue.tolist(),
+        "by_sku": np.argsort(skus, kind="stable").tolist(),
+        "total_revenue": round(float(revenue.sum()), 2),
+    }
+
+
+def top_n_breakdown(table: dict[str, Any], top_n: int) -> tuple[dict[str, float], dict[str, Any]]:
+    """
+    Split the table into the inline {sku: revenue} top-N and an "other"
+    bucket aggregating the long tail.
+    """
+    skus, revenue = table["sku"], table["revenue"]
+    top = dict(zip(skus[:top_n], revenue[:top_n]))
+    tail = revenue[top_n:]
+    other = {"sku_count": len(tail), "revenue": round(float(sum(tail)), 2)}
+    return top, other
+
+
+def query_sku_table(
+    table: dict[str, Any],
+    q: str = "",
+    sort: str = "revenue",
+    descending: bool = True,
+    offset: int = 0,
+    limit: int = 100,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    One page of rows, optionally filtered by a case-insensitive substring.
+    Returns (rows, total matching). Each row carries its revenue share.
+    """
+    if sort not in ("revenue", "sku"):
+        raise ValueError("sort must be one of revenue, sku")
+    skus, revenue = table["sku"], table["revenue"]
+    order: Any = range(len(skus)) if sort == "revenue" else table["by_sku"]
+    # Revenue order is stored descending, SKU order ascending
+    if descending != (sort == "revenue"):
+        order = order[::-1]
+    if q:
+        needle = q.lower()
+        order = [i for i in order if needle in skus[i].lower()]
+
+    offset, limit = max(0, offset), max(0, limit)
+    total_revenue = table.get("total_revenue") or 1.0
+    rows = [
+        {"sku": skus[i], "revenue": revenue[i],
+         "share": round(revenue[i] / total_revenue, 6)}
+        for i in order[offset:offset + limit]
+    ]
+    return rows, len(order)
@@ -0,0 +1,397 @@
+"""
+Lightweight tracing: nested spans across the run lifecycle, exported as
+OpenTelemetry (OTLP/JSON) to a local rotating file.
+
+    with span("run.execute", run_id=run_id):
+        with span("profile"):          # child; inherits run_id
+            ...
+
+The active span lives in a contextvar, so nesting follows the call stack.
+Threads and processes don't inherit it: capture `current_context()` and
+re-enter it on the other side with `attach(ctx)`. A process-pool worker runs
+inside `collect()` and returns its spans for the parent to `export_spans()`,
+so only one process ever writes a given file.
+
+The sink writes one OTLP `ExportTraceServiceRequest` per line (the
+OpenTelemetry Collector file-exporter layout, readable by its otlpjsonfile
+receiver, Jaeger/Tempo importers or plain jq). Files rotate by size; the
+path may contain `{pid}` so each gunicorn worker writes its own.
+
+With TRACING_ENABLED off every `span()` returns one shared no-op object.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from src.config import (
+    TRACING_ENABLED, TRACE_FILE, TRACE_FILE_MAX_MB, TRACE_FILE_BACKUPS, TRACE_SERVICE_NAME,
+)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+BATCH_SIZE = 64
+
+# Attributes children copy from their parent when not set themselves
+INHERITED_ATTRIBUTES = ("run_id",)
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """What crosses thread / process boundaries (picklable)."""
+    trace_id: str
+    span_id: str
+    inherited: tuple[tuple[str, Any], ...] = ()
+
+
+class Span:
+    __slots__ = ("name", "context", "parent", "kind", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message", "local_root")
+
+    def __init__(self, name: str, parent: SpanContext | None, kind: int = SPAN_KIND_INTERNAL,
+                 start_ns: int | None = None, local_root: bool = True, **attributes: Any) -> None:
+        inherited = dict(parent.inherited) if parent else {}
+        self.attributes = {**inherited, **{k: v for k, v in attributes.items() if v is not None}}
+        self.context = SpanContext(
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            inherited=tuple(
+                (k, self.attributes[k]) for k in INHERITED_ATTRIBUTES if k in self.attributes
+            ),
+        )
+        self.name = name
+        self.parent = parent
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: int | None = None
+        self.events: list[tuple[int, str, dict[str, Any]]] = []
+        self.status = STATUS_OK
+        self.status_message = ""
+        # No in-process parent span: ending it completes a unit of work
+        self.local_root = local_root
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append((time.time_ns(), name, attributes))
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        self.add_event("exception", **{
+            "exception.type": type(exc).__name__, "exception.message": str(exc)[:500],
+        })
+
+    def end(self, end_ns: int | None = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        collector = _collector.get()
+        if collector is not None:
+            collector.append(self.to_otlp())
+        elif _exporter is not None:
+            _exporter.export(self.to_otlp(), flush=self.local_root)
+
+    def to_otlp(self) -> dict[str, Any]:
+        out = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent is not None:
+            out["parentSpanId"] = self.parent.span_id
+        if self.status_message:
+            out["status"]["message"] = self.status_message
+        if self.events:
+            out["events"] = [
+                {"timeUnixNano": str(t), "name": n, "attributes": _otlp_attributes(a)}
+                for t, n, a in self.events
+            ]
+        return out
+
+
+class _NoopSpan:
+    """Returned for every span while tracing is off."""
+    context = None
+    parent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self, end_ns: int | None = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+# ── Exporters ────────────────────────────────────────────────────────────────
+
+class FileExporter:
+    """Batches spans and appends OTLP/JSON lines to a size-rotated file."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int, service_name: str) -> None:
+        self.path_template = path
+        self.max_bytes, self.backups = max_bytes, backups
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        # Serializes opening, writing and rollover across exporting threads
+        self._write_lock = threading.Lock()
+        self._pending: list[dict[str, Any]] = []
+        self._handler: logging.handlers.RotatingFileHandler | None = None
+        self._pid = None
+
+    def _ensure_handler(self) -> logging.handlers.RotatingFileHandler:
+        # Opened lazily and per process, so workers forked after import
+        # (gunicorn --preload) get their own {pid} file
+        pid = os.getpid()
+        if self._handler is None or self._pid != pid:
+            path = self.path_template.format(pid=pid)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8",
+            )
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+            self._resource = {"attributes": _otlp_attributes({
+                "service.name": self.service_name, "process.pid": pid,
+            })}
+            self._pid = pid
+        return self._handler
+
+    def export(self, span: dict[str, Any], flush: bool = False) -> None:
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) < BATCH_SIZE and not flush:
+                return
+            batch, self._pending = self._pending, []
+        self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        with self._write_lock:
+            handler = self._ensure_handler()
+            line = json.dumps({"resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{"scope": {"name": "margintel"}, "spans": batch}],
+            }]}, separators=(",", ":"), default=str)
+            handler.emit(logging.makeLogRecord({"msg": line, "levelno": logging.INFO}))
+
+
+class MemoryExporter:
+    """Keeps exported spans in a list (tests, ad-hoc inspection)."""
+
+    def __init__(self) -> None:
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: dict[str, Any], flush: bool = False) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def flush(self) -> None:
+        pass
+
+
+_current: ContextVar[Span | SpanContext | None] = ContextVar("margintel_span", default=None)
+_collector: ContextVar[list | None] = ContextVar("margintel_span_collector", default=None)
+_exporter: FileExporter | MemoryExporter | None = None
+
+
+def set_exporter(exporter: FileExporter | MemoryExporter | None) -> None:
+    """Install (or with None, remove) the process-wide span exporter."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.flush()
+
+
+def enabled() -> bool:
+    return _exporter is not None or _collector.get() is not None
+
+
+def _parent() -> tuple[SpanContext | None, bool]:
+    """(parent context, whether the new span is a local root)."""
+    current = _current.get()
+    if isinstance(current, Span):
+        return current.context, False
+    return current, True
+
+
+def current_context() -> SpanContext | None:
+    """The active span's context, for handing to another thread or process."""
+    return _parent()[0] if enabled() else None
+
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, parent: SpanContext | None = None,
+               start_ns: int | None = None, **attributes: Any) -> Span | _NoopSpan:
+    """Start a span (child of `parent` or the active span) without activating it."""
+    if not enabled():
+        return NOOP_SPAN
+    if parent is not None:
+        return Span(name, parent, kind, start_ns, True, **attributes)
+    ctx, local_root = _parent()
+    return Span(name, ctx, kind, start_ns, local_root, **attributes)
+
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+    """Context manager running the block in a new child span (no-op when off)."""
+    if not enabled():
+        return NOOP_SPAN
+    return _active_span(name, kind, attributes)
+
+
+@contextmanager
+def _active_span(name: str, kind: int, attributes: dict[str, Any]) -> Iterator[Span]:
+    ctx, local_root = _parent()
+    s = Span(name, ctx, kind, None, local_root, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def activate(s: Span | _NoopSpan):
+    """Make `s` the active span; pass the token to `deactivate`."""
+    return _current.set(s) if isinstance(s, Span) else None
+
+
+def deactivate(token) -> None:
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:  # torn down from another context
+            _current.set(None)
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the active span, if it belongs to this process."""
+    current = _current.get()
+    if isinstance(current, Span):
+        current.set_attribute(key, value)
+
+
+def record_exception(exc: BaseException) -> None:
+    """Mark the active span as failed (for errors that are handled, not raised)."""
+    current = _current.get()
+    if isinstance(current, Span):
+        current.record_exception(exc)
+
+
+@contextmanager
+def attach(ctx: SpanContext | None) -> Iterator[None]:
+    """Continue a trace captured with current_context() in another thread."""
+    if ctx is None:
+        yield
+        return
+    token = _current.set(ctx)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def collect() -> Iterator[list[dict[str, Any]]]:
+    """Gather finished spans into a list instead of exporting them."""
+    spans: list[dict[str, Any]] = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def export_spans(spans: list[dict[str, Any]]) -> None:
+    """Export spans gathered elsewhere (e.g. returned from a worker process)."""
+    collector = _collector.get()
+    for s in spans:
+        if collector is not None:
+            collector.append(s)
+        elif _exporter is not None:
+            _exporter.export(s)
+    if _exporter is not None and collector is None:
+        _exporter.flush()
+
+
+def parse_traceparent(header: str | None) -> SpanContext | None:
+    """W3C `traceparent` (00-<trace_id>-<span_id>-<flags>) → SpanContext."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(trace_id=parts[1], span_id=parts[2])
+
+
+def format_traceparent(ctx: SpanContext) -> str:
+    return f"00-{ctx.trace_id}-{ctx.span_id}-01"
+
+
+if TRACING_ENABLED:
+    set_exporter(FileExporter(
+        TRACE_FILE, int(TRACE_FILE_MAX_MB * 1024 * 1024), TRACE_FILE_BACKUPS, TRACE_SERVICE_NAME,
+    ))
+    atexit.register(lambda: _exporter and _exporter.flush())
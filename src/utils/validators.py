@@ -5,7 +5,10 @@ Raises ValueError with a clear message on missing required columns.
 
 from __future__ import annotations
 
-import pandas as pd
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # annotations only; keeps pandas off the import path
+    import pandas as pd
 
 REQUIRED_ORDER_COLS = {"order_id", "sku", "quantity", "item_price"}
 OPTIONAL_ORDER_COLS = {"order_date", "discount_amount", "refund_amount", "line_total"}
@@ -18,6 +21,26 @@ class ValidationError(Exception):
     """Raised when a CSV fails structural validation."""
 
 
+def validate_goals(goals: list[dict], max_goals: int) -> list[dict]:
+    """
+    Normalise a list of {"business_goal", "constraints"} dicts.
+    Blank goals are dropped; raises ValidationError if too many remain.
+    """
+    cleaned = []
+    for g in goals:
+        goal = str(g.get("business_goal", "") or "").strip()
+        if goal:
+            cleaned.append({
+                "business_goal": goal,
+                "constraints": str(g.get("constraints", "") or "").strip(),
+            })
+    if len(cleaned) > max_goals:
+        raise ValidationError(
+            f"Too many business goals ({len(cleaned)}); at most {max_goals} per run"
+        )
+    return cleaned
+
+
 def validate_orders(df: pd.DataFrame) -> list[str]:
     """
     Validate orders DataFrame.
@@ -0,0 +1,72 @@
+"""
+Tests for precomputed report artifacts and their HTTP serving.
+"""
+
+import gzip
+import json
+
+from src.storage.run_store import store_run
+from src.utils.artifacts import build_report_artifacts
+from src.utils.ids import new_run_id
+
+
+def _report():
+    return {"run_id": "x", "profiling": {"sku_revenue_breakdown": {f"S{i}": i for i in range(500)}}}
+
+
+def _done_run():
+    run_id = new_run_id()
+    report = _report()
+    store_run(run_id, {"status": "processing"})
+    store_run(run_id, {"status": "done", "report": report,
+                       "_artifacts": build_report_artifacts(report)})
+    return run_id, report
+
+
+class TestArtifacts:
+
+    def test_variants_decode_to_same_report(self):
+        artifacts = build_report_artifacts(_report())
+        assert json.loads(artifacts["identity"]) == _report()
+        assert gzip.decompress(artifacts["gzip"]) == artifacts["identity"]
+        assert len(artifacts["gzip"]) < len(artifacts["identity"])
+
+
+class TestArtifactServing:
+
+    def test_download_negotiates_gzip(self):
+        from app import app
+        run_id, report = _done_run()
+        resp = app.test_client().get(f"/v1/runs/{run_id}/download",
+                                     headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["Vary"]
+        body = resp.get_data()
+        assert int(resp.headers["Content-Length"]) == len(body)
+        assert json.loads(gzip.decompress(body)) == report
+
+    def test_download_identity_without_accept_encoding(self):
+        from app import app
+        run_id, report = _done_run()
+        resp = app.test_client().get(f"/v1/runs/{run_id}/download")
+        assert "Content-Encoding" not in resp.headers
+        assert json.loads(resp.get_data()) == report
+
+    def test_download_range(self):
+        from app import app
+        run_id, _ = _done_run()
+        client = app.test_client()
+        full = client.get(f"/v1/runs/{run_id}/download").get_data()
+        part = client.get(f"/v1/runs/{run_id}/download", headers={"Range": "bytes=10-19"})
+        assert part.status_code == 206
+        assert part.get_data() == full[10:20]
+        assert part.headers["Content-Range"] == f"bytes 10-19/{len(full)}"
+
+    def test_run_report_splices_artifact_and_hides_internals(self):
+        from app import app
+        run_id, report = _done_run()
+        body = app.test_client().get(f"/v1/runs/{run_id}").get_json()
+        assert body["report"] == report
+        assert body["status"] == "done"
+        assert "_artifacts" not in body
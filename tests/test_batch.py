@@ -0,0 +1,57 @@
+"""
+Tests for the NDJSON batch report endpoint and run summaries.
+"""
+
+import json
+
+from src.storage.run_store import store_run
+from src.utils.artifacts import build_report_artifacts
+from src.utils.ids import new_run_id
+
+
+def _done_run():
+    run_id = new_run_id()
+    report = {"run_id": "x", "profiling": {"total_revenue": 10.0}}
+    store_run(run_id, {"status": "processing"})
+    store_run(run_id, {"status": "done", "report": report,
+                       "_artifacts": build_report_artifacts(report)})
+    return run_id, report
+
+
+class TestBatchEndpoint:
+
+    def test_ndjson_sections_and_missing_ids(self):
+        from app import app
+        run_a, report = _done_run()
+        run_b, _ = _done_run()
+        resp = app.test_client().get(
+            f"/v1/runs/batch?ids={run_a},missing,{run_b}&sections=run_id"
+        )
+        assert resp.mimetype == "application/x-ndjson"
+        lines = [json.loads(l) for l in resp.get_data(as_text=True).splitlines()]
+        assert [l["id"] for l in lines] == [run_a, "missing", run_b]
+        assert lines[0]["report"] == {"run_id": "x"}
+        assert lines[1]["error"] == "not_found"
+
+    def test_whole_report_via_post(self):
+        from app import app
+        run_id, report = _done_run()
+        resp = app.test_client().post("/v1/runs/batch", json={"ids": [run_id]})
+        line = json.loads(resp.get_data(as_text=True).strip())
+        assert line["report"] == report
+
+    def test_malformed_post_body_is_400(self):
+        from app import app
+        client = app.test_client()
+        for body in ({"ids": "abc"}, {"ids": [1, 2]}, {"ids": [["x"]]},
+                     {"sections": "profiling"}, {"sections": [None]}, ["a"]):
+            resp = client.post("/v1/runs/batch", json=body)
+            assert resp.status_code == 400 and "error" in resp.get_json(), body
+
+    def test_summary_has_headline_metrics(self):
+        from app import app
+        run_id, _ = _done_run()
+        runs = app.test_client().get("/v1/runs").get_json()["runs"]
+        summary = next(r for r in runs if r["id"] == run_id)
+        for key in ("total_revenue", "total_refunds", "risk_level", "top_action", "theme_count"):
+            assert key in summary
@@ -0,0 +1,47 @@
+"""
+Tests for the per-stage benchmark runner and regression comparison.
+"""
+
+import json
+
+from benchmarks import bench
+
+
+def _results(**stages):
+    return {"results": {"1000": {
+        name: {"median_s": t, "min_s": t, "peak_mb": mb} for name, (t, mb) in stages.items()
+    }}}
+
+
+class TestBench:
+
+    def test_run_covers_every_stage(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(bench, "DATA_DIR", str(tmp_path))
+        orders, returns = bench.dataset(400)
+        results = bench.run_stages(orders, returns, repeat=1)
+        assert list(results) == bench.STAGE_NAMES
+        assert all(m["median_s"] >= 0 and m["peak_mb"] >= 0 for m in results.values())
+
+        only = bench.run_stages(orders, returns, repeat=1, only=["build_report"])
+        assert list(only) == ["build_report"]
+
+    def test_compare_flags_time_and_memory_regressions(self):
+        baseline = _results(read_csv=(0.100, 10.0), profile_orders=(0.200, 20.0), tiny=(0.001, 0.1))
+        current = _results(read_csv=(0.105, 10.0), profile_orders=(0.300, 20.0), tiny=(0.003, 0.1))
+        rows = {r["stage"]: r for r in bench.compare(baseline, current, threshold=0.15)}
+        assert not rows["read_csv"]["regression"]
+        assert rows["profile_orders"]["regression"]
+        # 3x slower but under the noise floor
+        assert not rows["tiny"]["regression"]
+
+        fat = _results(read_csv=(0.100, 20.0), profile_orders=(0.2, 20.0), tiny=(0.001, 0.1))
+        rows = {r["stage"]: r for r in bench.compare(baseline, fat)}
+        assert rows["read_csv"]["regression"]
+
+    def test_compare_command_exit_status(self, tmp_path):
+        base, cur = tmp_path / "base.json", tmp_path / "cur.json"
+        base.write_text(json.dumps(_results(read_csv=(0.1, 10.0))))
+        cur.write_text(json.dumps(_results(read_csv=(0.1, 10.0))))
+        assert bench.main(["compare", str(base), str(cur)]) == 0
+        cur.write_text(json.dumps(_results(read_csv=(0.5, 10.0))))
+        assert bench.main(["compare", str(base), str(cur)]) == 1
@@ -0,0 +1,84 @@
+"""
+Tests for the offline batch runner (cli.py).
+"""
+
+import gzip
+import json
+import os
+import shutil
+
+import pytest
+
+import cli
+from src.engines.registry import available_engines
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+
+@pytest.fixture
+def shops(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b" / "nested").mkdir(parents=True)
+    shutil.copy(os.path.join(SAMPLE_DIR, "orders.csv"), tmp_path / "a" / "orders.csv")
+    shutil.copy(os.path.join(SAMPLE_DIR, "returns.csv"), tmp_path / "a" / "returns.csv")
+    shutil.copy(os.path.join(SAMPLE_DIR, "online_retail_test.csv"), tmp_path / "b" / "uci_orders.csv")
+    shutil.copy(os.path.join(SAMPLE_DIR, "orders.csv"), tmp_path / "b" / "nested" / "q1_orders.csv")
+    return tmp_path
+
+
+class TestDiscovery:
+
+    def test_dirs_globs_and_pairing(self, shops):
+        a_orders = str(shops / "a" / "orders.csv")
+        assert cli.discover([str(shops / "a" / "*.csv")]) == [a_orders]
+        assert cli.returns_for(a_orders) == str(shops / "a" / "returns.csv")
+        assert cli.returns_for(str(shops / "b" / "uci_orders.csv")) is None
+
+        flat = cli.discover([str(shops / "*")])
+        assert flat == [a_orders, str(shops / "b" / "uci_orders.csv")]
+        deep = cli.discover([str(shops)], recursive=True)
+        assert str(shops / "b" / "nested" / "q1_orders.csv") in deep and len(deep) == 3
+
+        with pytest.raises(FileNotFoundError):
+            cli.discover([str(shops / "missing")])
+
+    def test_report_path(self):
+        assert cli.report_path("x/orders.csv") == "x/orders.report.json"
+        assert cli.report_path("x/shop_orders.csv.gz", "gzip") == "x/shop_orders.report.json.gz"
+        assert cli.report_path("x/orders.parquet") == "x/orders.report.json"
+
+
+class TestBatch:
+
+    def test_parallel_run_writes_compressed_reports(self, shops, capsys):
+        assert cli.main([str(shops), "--recursive", "--workers", "2",
+                         "--compress", "gzip", "--no-llm"]) == 0
+        with gzip.open(shops / "a" / "orders.report.json.gz") as fh:
+            report = json.load(fh)
+        assert report["dataset_summary"]["orders_rows"] == 30
+        assert report["dataset_summary"]["returns_rows"] == 15
+        assert report["modules"]["revenue_dependency_risk"]
+        assert (shops / "b" / "nested" / "q1_orders.report.json.gz").exists()
+        assert "3/3 datasets" in capsys.readouterr().out
+
+    def test_failure_is_reported_and_sets_exit_status(self, shops, capsys):
+        (shops / "a" / "bad_orders.csv").write_text("foo,bar\n1,2\n")
+        results = list(cli.run_batch(cli.discover([str(shops / "a")]), workers=1, use_llm=False))
+        by_name = {os.path.basename(r["orders"]): r for r in results}
+        assert "error" in by_name["bad_orders.csv"]
+        with open(by_name["orders.csv"]["report"]) as fh:
+            assert json.load(fh)["dataset_summary"]["returns_rows"] == 15
+
+        assert cli.main([str(shops / "a"), "--workers", "1", "--no-llm"]) == 1
+        assert "FAILED" in capsys.readouterr().err
+
+    @pytest.mark.skipif("polars" not in available_engines(), reason="polars not installed")
+    def test_engine_option(self, shops):
+        orders = str(shops / "a" / "orders.csv")
+        reports = []
+        for engine in ("pandas", "polars"):
+            summary = cli.analyze_dataset(orders, cli.returns_for(orders), use_llm=False, engine=engine)
+            with open(summary["report"]) as fh:
+                reports.append(json.load(fh))
+        assert reports[0]["profiling"] == reports[1]["profiling"]
+        assert reports[0]["modules"] == reports[1]["modules"]
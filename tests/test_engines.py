@@ -0,0 +1,200 @@
+"""
+Conformance tests for the dataframe engines: every engine must produce the
+same sections as the pandas reference on the sample and generated datasets.
+"""
+
+import math
+import os
+import time
+
+import pytest
+
+import generate_test_data
+from src.engines.registry import ENGINES, available_engines, get_engine
+from src.storage.run_store import get_run
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+CANDIDATES = [
+    pytest.param(name, marks=pytest.mark.skipif(
+        name not in available_engines(), reason=f"{name} not installed"))
+    for name in ENGINES if name != "pandas"
+]
+
+
+def _assert_same(expected, actual, path="$"):
+    """Equal structure and order; floats within summation rounding."""
+    if isinstance(expected, float) or isinstance(actual, float):
+        assert math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9), f"{path}: {expected} != {actual}"
+    elif isinstance(expected, dict):
+        assert list(expected) == list(actual), f"{path}: keys differ"
+        for key in expected:
+            _assert_same(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(expected) == len(actual), f"{path}: lengths differ"
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            _assert_same(e, a, f"{path}[{i}]")
+    else:
+        assert expected == actual, f"{path}: {expected!r} != {actual!r}"
+
+
+def _core(engine_name, orders_path, returns_path=None):
+    engine = get_engine(engine_name)
+    orders, order_notes = engine.load_orders(orders_path)
+    returns, return_notes = engine.load_returns(returns_path) if returns_path else (None, [])
+    profiling = engine.profile(orders, returns)
+    return {
+        "notes": order_notes + return_notes,
+        "rows": len(orders),
+        "profiling": profiling,
+        "returns": engine.analyze_returns(orders, returns, profiling),
+        "reason_sample": engine.reason_sample(returns),
+        "dependency": engine.analyze_dependency(orders, profiling),
+    }
+
+
+def _generated(tmp_path, style, **kwargs):
+    out = generate_test_data.generate_data(out_dir=str(tmp_path), prefix=f"{style}_",
+                                           style=style, seed=7, **kwargs)
+    return out["orders_path"], out.get("returns_path")
+
+
+@pytest.mark.parametrize("engine", CANDIDATES)
+class TestConformance:
+
+    @pytest.mark.parametrize("orders, returns", [
+        ("orders.csv", "returns.csv"),
+        ("orders.csv", None),
+        ("online_retail_test.csv", None),
+        ("orders_large.csv", None),
+    ])
+    def test_sample_datasets(self, engine, orders, returns):
+        orders = os.path.join(SAMPLE_DIR, orders)
+        returns = returns and os.path.join(SAMPLE_DIR, returns)
+        _assert_same(_core("pandas", orders, returns), _core(engine, orders, returns))
+
+    @pytest.mark.parametrize("style", ["standard", "shopify", "uci"])
+    def test_generated_datasets(self, engine, style, tmp_path):
+        # Few SKUs and many lines: plenty of ties in counts and rates
+        orders, returns = _generated(tmp_path, style, lines=5000, skus=40, lines_per_order=1.5)
+        _assert_same(_core("pandas", orders, returns), _core(engine, orders, returns))
+
+    def test_api_run_matches_pandas(self, engine):
+        from app import app
+
+        client = app.test_client()
+        reports = []
+        for name in ("pandas", engine):
+            with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as o, \
+                    open(os.path.join(SAMPLE_DIR, "returns.csv"), "rb") as r:
+                resp = client.post("/v1/runs", data={
+                    "orders_file": (o, "orders.csv"), "returns_file": (r, "returns.csv"),
+                    "engine": name,
+                }, content_type="multipart/form-data")
+            assert resp.status_code == 202
+            run_id = resp.get_json()["run_id"]
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and get_run(run_id)["status"] not in ("done", "error"):
+                time.sleep(0.05)
+            run = get_run(run_id)
+            assert run["status"] == "done"
+            reports.append({k: v for k, v in run["report"].items() if k not in ("run_id", "generated_at")})
+        _assert_same(*reports)
+
+    def test_string_io_source(self, engine):
+        import io
+
+        with open(os.path.join(SAMPLE_DIR, "orders.csv")) as fh:
+            text = fh.read()
+        expected, _ = get_engine("pandas").load_orders(io.StringIO(text))
+        loaded, _ = get_engine(engine).load_orders(io.StringIO(text))
+        assert len(loaded) == len(expected) == 30
+
+
+class TestRegistry:
+
+    def test_default_and_caching(self):
+        assert get_engine().name == "pandas"
+        assert get_engine("PANDAS") is get_engine("pandas")
+        assert "pandas" in available_engines()
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            get_engine("spark")
+
+    def test_api_rejects_bad_engines(self, monkeypatch):
+        from app import app
+
+        client = app.test_client()
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            resp = client.post("/v1/runs", data={"orders_file": (fh, "orders.csv"), "engine": "spark"},
+                               content_type="multipart/form-data")
+        assert resp.status_code == 400 and resp.get_json()["error"] == "unknown_engine"
+
+        monkeypatch.setattr("src.engines.registry._REQUIRES", {"polars": "no_such_package"})
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            resp = client.post("/v1/runs", data={"orders_file": (fh, "orders.csv"), "engine": "polars"},
+                               content_type="multipart/form-data")
+        assert resp.status_code == 400 and resp.get_json()["error"] == "engine_unavailable"
+
+    def test_bad_default_engine(self, monkeypatch):
+        from app import run_service
+        from src.engines import registry
+
+        monkeypatch.setattr(registry, "DATAFRAME_ENGINE", "spark")
+        with pytest.raises(ValueError):
+            registry.check_engine()
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            run_id, error = run_service.start_analysis_pipeline(fh)
+        assert run_id == "" and "spark" in error
+
+
+@pytest.mark.skipif("duckdb" not in available_engines(), reason="duckdb not installed")
+class TestDuckDB:
+
+    @pytest.fixture
+    def engine(self, tmp_path, monkeypatch):
+        from src.engines import duckdb_engine
+
+        monkeypatch.setattr(duckdb_engine, "DUCKDB_TEMP_DIR", str(tmp_path / "duckdb"))
+        monkeypatch.setattr(duckdb_engine, "DUCKDB_MEMORY_LIMIT", "40MB")
+        monkeypatch.setattr(duckdb_engine, "DUCKDB_THREADS", 1)
+        return duckdb_engine.DuckDBEngine()
+
+    def test_spills_beyond_memory_limit(self, engine, tmp_path):
+        orders, returns = _generated(tmp_path, "standard", lines=300_000, skus=20_000)
+        o, r = engine.load_orders(orders)[0], engine.load_returns(returns)[0]
+        profiling = engine.profile(o, r)
+        spilled = engine._fetch("SELECT SUM(temporary_storage_bytes) FROM duckdb_memory()")[0][0]
+        assert spilled > 0
+
+        expected = _core("pandas", orders, returns)
+        _assert_same(expected["profiling"], profiling)
+        _assert_same(expected["returns"], engine.analyze_returns(o, r, profiling))
+
+    def test_parquet_matches_csv(self, engine, tmp_path):
+        import duckdb
+
+        csv_path = os.path.join(SAMPLE_DIR, "online_retail_test.csv")
+        parquet_path = str(tmp_path / "orders.parquet")
+        duckdb.execute(f"COPY (SELECT * FROM read_csv('{csv_path}', all_varchar=true)) "
+                       f"TO '{parquet_path}' (FORMAT parquet)")
+        from_csv, from_parquet = engine.load_orders(csv_path)[0], engine.load_orders(parquet_path)[0]
+        _assert_same(engine.profile(from_csv, None), engine.profile(from_parquet, None))
+
+    def test_uploads_and_tables_are_cleaned_up(self, engine):
+        import gc
+
+        from werkzeug.datastructures import FileStorage
+
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            orders, _ = engine.load_orders(FileStorage(fh, filename="orders.csv"))
+        assert len(orders) == 30
+        assert [f for f in os.listdir(engine._temp_dir) if f.endswith(".csv")] == []
+        # Admission charges the upload's size even though it lives in DuckDB
+        assert engine.frame_bytes(orders) == os.path.getsize(os.path.join(SAMPLE_DIR, "orders.csv"))
+
+        name = orders.name
+        del orders
+        gc.collect()
+        assert engine._fetch("SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [name]) == [(0,)]
+
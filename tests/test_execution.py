@@ -0,0 +1,116 @@
+"""
+Tests for shared-memory frame hand-off and the process execution backend.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.execution import ProcessBackend, ThreadBackend, make_backend
+from src.utils.csv_loader import load_orders_csv, load_returns_csv
+from src.utils.shared_frames import attach_frame, release, share_frame
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data")
+
+
+def _frames():
+    orders_df, _ = load_orders_csv(os.path.join(SAMPLE_DIR, "orders.csv"))
+    returns_df, _ = load_returns_csv(os.path.join(SAMPLE_DIR, "returns.csv"))
+    return orders_df, returns_df
+
+
+class TestSharedFrames:
+
+    def test_round_trip_preserves_values_and_dtypes(self):
+        orders_df, _ = _frames()
+        orders_df.loc[0, "sku"] = np.nan
+        handle, shm = share_frame(orders_df)
+        try:
+            copy, worker_shm = attach_frame(handle)
+            assert copy.dtypes.equals(orders_df.dtypes)
+            pd.testing.assert_frame_equal(copy, orders_df)
+            del copy
+            release(worker_shm)
+        finally:
+            release(shm, unlink=True)
+
+    def test_numeric_columns_are_views(self):
+        orders_df, _ = _frames()
+        handle, shm = share_frame(orders_df)
+        try:
+            copy, worker_shm = attach_frame(handle)
+            assert not copy["_revenue"].to_numpy().flags.owndata
+            del copy
+            release(worker_shm)
+        finally:
+            release(shm, unlink=True)
+
+    def test_mixed_object_column(self):
+        df = pd.DataFrame({"k": pd.Series([1, "a", None, 1], dtype=object)})
+        handle, shm = share_frame(df)
+        try:
+            copy, worker_shm = attach_frame(handle)
+            assert list(copy["k"][:2]) == [1, "a"]
+            assert pd.isna(copy["k"][2])
+            del copy
+            release(worker_shm)
+        finally:
+            release(shm, unlink=True)
+
+    @pytest.mark.parametrize("index", [
+        pd.RangeIndex(10, 20, 2, name="row"),
+        pd.Index(["b", "a", "c", "a", "d"], name="key"),
+        pd.DatetimeIndex(pd.date_range("2024-01-01", periods=5)),
+    ])
+    def test_index_survives(self, index):
+        df = pd.DataFrame({"x": np.arange(5.0), "s": list("vwxyz")}, index=index)
+        handle, shm = share_frame(df)
+        try:
+            copy, worker_shm = attach_frame(handle)
+            # A DatetimeIndex freq is inferred metadata and isn't carried over
+            pd.testing.assert_frame_equal(copy, df, check_freq=False)
+            del copy
+            release(worker_shm)
+        finally:
+            release(shm, unlink=True)
+
+    def test_multiindex_is_rejected(self):
+        df = pd.DataFrame({"x": [1, 2]}, index=pd.MultiIndex.from_tuples([(1, "a"), (2, "b")]))
+        with pytest.raises(ValueError):
+            share_frame(df)
+
+
+class TestExecutionBackends:
+
+    def test_process_backend_matches_thread_backend(self):
+        orders_df, returns_df = _frames()
+        expected = ThreadBackend().run_core(orders_df, returns_df)
+        backend = ProcessBackend(workers=1)
+        try:
+            got = backend.run_core(orders_df, returns_df)
+        finally:
+            backend.shutdown()
+        # Timings are measured wherever the stages ran; only their shape matches
+        got_timings, expected_timings = got.pop("timings"), expected.pop("timings")
+        assert got == expected
+        assert got["reason_sample"]
+        assert [(t["stage"], t["rows_in"]) for t in got_timings] == \
+            [(t["stage"], t["rows_in"]) for t in expected_timings]
+
+    def test_process_backend_relays_stage_progress(self):
+        orders_df, returns_df = _frames()
+        expected, got = [], []
+        ThreadBackend().run_core(orders_df, returns_df, lambda pct, _: expected.append(pct))
+        backend = ProcessBackend(workers=1)
+        try:
+            backend.run_core(orders_df, returns_df, lambda pct, _: got.append(pct))
+        finally:
+            backend.shutdown()
+        # The parent reports 15 while the pool spins up; the worker's own follow
+        assert got[1:] == expected == [15, 35, 55]
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            make_backend("gpu")
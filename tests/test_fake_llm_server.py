@@ -0,0 +1,80 @@
+"""
+Tests for the offline fake LLM server and LLMClient's base_url support.
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fake_llm_server import start_in_thread
+from src.services.llm_client import LLMClient
+
+
+@pytest.fixture(scope="module")
+def server():
+    srv = start_in_thread(stream_chunk_ms=0, seed=7)
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _profiling():
+    return {
+        "total_revenue": 1000.0,
+        "high_return_skus": [{"sku": "A", "return_rate": 0.3, "revenue": 500.0,
+                              "estimated_margin_risk": 150.0}],
+        "_sku_revenue": {"A": 500.0, "B": 500.0},
+    }
+
+
+class TestFakeLLMServer:
+
+    def test_rank_actions_schema(self, server):
+        llm = LLMClient(api_key="", base_url=server.base_url)
+        assert llm.available
+        out = llm.rank_actions("Cut returns", "", _profiling(), {})
+        assert len(out["ranked_actions"]) == 7
+        first = out["ranked_actions"][0]
+        for key in ("rank", "action_type", "title", "expected_impact", "confidence", "evidence_used"):
+            assert key in first
+        assert out["limitations"]
+
+    def test_streaming_emits_each_action(self, server):
+        llm = LLMClient(api_key="", base_url=server.base_url)
+        seen = []
+        out = llm.rank_actions("Cut returns", "", _profiling(), {},
+                               on_action=lambda idx, action: seen.append((idx, action["rank"])))
+        assert seen == [(i, i + 1) for i in range(len(out["ranked_actions"]))]
+
+    def test_cluster_return_reasons(self, server):
+        llm = LLMClient(api_key="", base_url=server.base_url)
+        themes = llm.cluster_return_reasons([
+            {"sku": "A", "reason": "Too small", "count": 4},
+            {"sku": "B", "reason": "Damaged", "count": 2},
+        ])
+        assert {t["theme"] for t in themes} == {"Too small", "Damaged"}
+        assert all(1 <= t["severity"] <= 5 for t in themes)
+
+    def test_sdk_does_not_retry(self, server):
+        # Retries belong to @retry_on_exception; SDK retries would multiply them
+        llm = LLMClient(api_key="", base_url=server.base_url)
+        assert llm._get_client().max_retries == 0
+
+    def test_rate_limit_injection(self):
+        srv = start_in_thread(rate_limit_rate=1.0, retry_after_s=3)
+        try:
+            req = urllib.request.Request(
+                f"{srv.base_url}/chat/completions",
+                data=json.dumps({"messages": []}).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                urllib.request.urlopen(req, timeout=5)
+            assert exc.value.code == 429
+            assert exc.value.headers["Retry-After"] == "3"
+            assert srv.stats.snapshot()["rate_limited_429"] == 1
+        finally:
+            srv.shutdown()
+            srv.server_close()
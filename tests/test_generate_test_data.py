@@ -0,0 +1,63 @@
+"""
+Tests for the synthetic data generator.
+"""
+
+import gzip
+
+import pandas as pd
+import pytest
+
+from generate_test_data import generate_data
+from src.utils.csv_loader import load_orders_csv, load_returns_csv
+
+
+def _top_share(path):
+    df = pd.read_csv(path)
+    revenue = (df["quantity"] * df["item_price"]).groupby(df["sku"]).sum()
+    return revenue.max() / revenue.sum()
+
+
+class TestGenerateData:
+
+    def test_seeded_output_is_reproducible(self, tmp_path):
+        a = generate_data(lines=2000, skus=50, out_dir=str(tmp_path / "a"), seed=3, chunk_rows=700)
+        b = generate_data(lines=2000, skus=50, out_dir=str(tmp_path / "b"), seed=3, chunk_rows=700)
+        assert a["orders_rows"] == 2000
+        with open(a["orders_path"]) as fa, open(b["orders_path"]) as fb:
+            assert fa.read() == fb.read()
+
+    def test_standard_files_load(self, tmp_path):
+        out = generate_data(lines=3000, skus=40, lines_per_order=2.0,
+                            out_dir=str(tmp_path), return_rate=0.2)
+        orders, _ = load_orders_csv(out["orders_path"])
+        returns, _ = load_returns_csv(out["returns_path"])
+        assert len(orders) == 3000
+        assert orders["order_id"].nunique() < 3000
+        assert 0 < len(returns) == out["returns_rows"]
+        assert set(returns["order_id"]) <= set(orders["order_id"])
+        assert (orders["refund_amount"] > 0).sum() == len(returns)
+
+    def test_zipf_controls_concentration(self, tmp_path):
+        flat = generate_data(lines=20000, skus=200, zipf=0.2, out_dir=str(tmp_path), prefix="flat_")
+        steep = generate_data(lines=20000, skus=200, zipf=1.6, out_dir=str(tmp_path), prefix="steep_")
+        assert _top_share(steep["orders_path"]) > 3 * _top_share(flat["orders_path"])
+
+    def test_shopify_headers_map_through_fuzzy_loader(self, tmp_path):
+        out = generate_data(lines=500, style="shopify", fmt="csv.gz", out_dir=str(tmp_path))
+        with gzip.open(out["orders_path"], "rt") as fh:
+            assert fh.readline().startswith("Order Number,Created At,Variant SKU")
+        orders, _ = load_orders_csv(out["orders_path"])
+        assert {"order_id", "sku", "quantity", "item_price", "order_date"} <= set(orders.columns)
+
+    def test_uci_returns_are_negative_lines(self, tmp_path):
+        out = generate_data(lines=1000, style="uci", return_rate=0.3, out_dir=str(tmp_path))
+        assert "returns_path" not in out
+        raw = pd.read_csv(out["orders_path"])
+        credits = raw[raw["InvoiceNo"].astype(str).str.startswith("C")]
+        assert len(credits) > 0 and (credits["Quantity"] < 0).all()
+        orders, _ = load_orders_csv(out["orders_path"])
+        assert orders["refund_amount"].sum() > 0
+
+    def test_rejects_unknown_style(self, tmp_path):
+        with pytest.raises(ValueError):
+            generate_data(style="nope", out_dir=str(tmp_path))
@@ -0,0 +1,109 @@
+"""
+Tests for multi-goal runs: goal parsing and validation, the rank_actions
+fan-out and the per-goal report sections.
+"""
+
+import json
+import os
+import time
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app import _parse_goals
+from fake_llm_server import start_in_thread
+from src.config import MAX_GOALS_PER_RUN
+from src.services.llm_client import LLMClient
+from src.storage.run_store import get_run, wait_for_events
+from src.utils.validators import ValidationError, validate_goals
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+
+def _post(client, data):
+    with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+        return client.post("/v1/runs", data={"orders_file": (fh, "orders.csv"), **data},
+                           content_type="multipart/form-data")
+
+
+class TestParseGoals:
+
+    def test_repeated_business_goal_fields(self):
+        form = MultiDict([("business_goal", "Cut returns"), ("business_goal", "Grow AOV"),
+                          ("constraints", "No discounts")])
+        assert _parse_goals(form) == [
+            {"business_goal": "Cut returns", "constraints": "No discounts"},
+            {"business_goal": "Grow AOV", "constraints": "No discounts"},
+        ]
+
+    def test_json_goals_list(self):
+        form = MultiDict({
+            "goals": json.dumps(["Cut returns", {"business_goal": "Grow AOV", "constraints": "Q4"}]),
+            "constraints": "No discounts",
+        })
+        assert _parse_goals(form) == [
+            {"business_goal": "Cut returns", "constraints": "No discounts"},
+            {"business_goal": "Grow AOV", "constraints": "Q4"},
+        ]
+
+    @pytest.mark.parametrize("raw", ["not json", "{}", "[]", '["ok", 3]', '["ok", "  "]',
+                                     '[{"constraints": "x"}]', "[null]"])
+    def test_garbage_is_rejected(self, raw):
+        with pytest.raises(ValueError):
+            _parse_goals(MultiDict({"goals": raw}))
+
+    def test_validate_goals_limit(self):
+        goals = [{"business_goal": f"g{i}"} for i in range(MAX_GOALS_PER_RUN + 1)]
+        with pytest.raises(ValidationError):
+            validate_goals(goals, MAX_GOALS_PER_RUN)
+        assert len(validate_goals(goals[:-1], MAX_GOALS_PER_RUN)) == MAX_GOALS_PER_RUN
+
+
+class TestGoalsEndpoint:
+
+    @pytest.mark.parametrize("goals", [
+        [f"goal {i}" for i in range(MAX_GOALS_PER_RUN + 1)],
+        ["Cut returns", ""],
+        ["Cut returns", 42],
+    ])
+    def test_bad_goals_are_400(self, goals):
+        from app import app
+
+        resp = _post(app.test_client(), {"goals": json.dumps(goals)})
+        assert resp.status_code == 400 and "error" in resp.get_json()
+
+    def test_multi_goal_run(self, monkeypatch):
+        import app as app_module
+
+        server = start_in_thread(stream_chunk_ms=0, seed=3)
+        try:
+            monkeypatch.setattr(app_module.run_service, "llm",
+                                LLMClient(api_key="", base_url=server.base_url))
+            goals = ["Cut return losses", "Grow average order value"]
+            resp = _post(app_module.app.test_client(), {"goals": json.dumps(goals)})
+            assert resp.status_code == 202
+            run_id = resp.get_json()["run_id"]
+
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and get_run(run_id)["status"] not in ("done", "error"):
+                time.sleep(0.05)
+            run = get_run(run_id)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert run["status"] == "done"
+        report = run["report"]
+        decisions = report["decisions"]
+        assert [d["business_goal"] for d in decisions] == goals
+        assert all(d["ranked_actions"] for d in decisions)
+        primary = {k: v for k, v in decisions[0].items() if k not in ("business_goal", "constraints")}
+        assert report["decision_output"] == primary
+
+        per_goal = run["prompt_tokens"]["rank_actions_per_goal"]
+        assert len(per_goal) == 2 and all(n > 0 for n in per_goal)
+        assert run["prompt_tokens"]["rank_actions"] == sum(per_goal)
+
+        partials = [e["data"] for e in wait_for_events(run_id, 0, timeout=0)
+                    if e["event"] == "partial_action"]
+        assert {p["goal_index"] for p in partials} == {0, 1}
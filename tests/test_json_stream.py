@@ -0,0 +1,67 @@
+"""
+Tests for the streaming array parser used by LLM streaming mode.
+"""
+
+import json
+
+from src.utils.json_stream import StreamingArrayParser
+
+
+def _document():
+    return json.dumps({
+        "ranked_actions": [
+            {"rank": 1, "title": "Fix {sizing} chart", "evidence_used": ["a", "b"]},
+            {"rank": 2, "title": 'Quote \\" and ] inside', "how_to_execute": [["x"]]},
+            {"rank": 3, "title": "Bundle SKUs"},
+        ],
+        "limitations": ["{not an action}"],
+    })
+
+
+class TestStreamingArrayParser:
+
+    def test_whole_document_in_one_chunk(self):
+        parser = StreamingArrayParser("ranked_actions")
+        items = parser.feed(_document())
+        assert [i["rank"] for i in items] == [1, 2, 3]
+
+    def test_char_by_char_emits_items_incrementally(self):
+        doc = _document()
+        parser = StreamingArrayParser("ranked_actions")
+        emitted_at = []
+        for pos, ch in enumerate(doc):
+            for item in parser.feed(ch):
+                emitted_at.append((pos, item["rank"]))
+        assert [rank for _, rank in emitted_at] == [1, 2, 3]
+        # First item must be available well before the document ends
+        assert emitted_at[0][0] < len(doc) // 2
+
+    def test_strings_with_brackets_do_not_confuse_depth(self):
+        parser = StreamingArrayParser("ranked_actions")
+        items = parser.feed(_document())
+        assert items[0]["title"] == "Fix {sizing} chart"
+        assert items[1]["how_to_execute"] == [["x"]]
+
+    def test_ignores_content_after_array_closes(self):
+        parser = StreamingArrayParser("ranked_actions")
+        parser.feed(_document())
+        assert len(parser.items) == 3
+        assert parser.feed('{"rank": 9}') == []
+
+    def test_key_split_across_chunks(self):
+        parser = StreamingArrayParser("ranked_actions")
+        assert parser.feed('{"ranked_ac') == []
+        assert parser.feed('tions": [{"rank"') == []
+        assert parser.feed(': 1}, ') == [{"rank": 1}]
+
+    def test_missing_key_yields_nothing(self):
+        parser = StreamingArrayParser("ranked_actions")
+        assert parser.feed('{"themes": [{"theme": "x"}]}') == []
+
+    def test_long_preamble_keeps_buffer_bounded(self):
+        parser = StreamingArrayParser("ranked_actions")
+        preamble = '{"reasoning": "' + "x" * 50 + '", "ranked_actions"'
+        for ch in preamble * 200:
+            parser.feed(ch)
+        assert len(parser._buf) <= len('"ranked_actions"')
+        assert parser.feed(' :\n [{"rank": 1}') == [{"rank": 1}]
@@ -0,0 +1,62 @@
+"""
+Tests for the HTTP load-test harness helpers and a short run against a
+real (in-process, threaded) server.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from benchmarks import bench, loadtest
+
+
+class TestHelpers:
+
+    def test_percentiles(self):
+        stats = loadtest.percentiles([0.001 * i for i in range(1, 101)])
+        assert stats["count"] == 100
+        assert stats["p50_ms"] == pytest.approx(50.5)
+        assert stats["p99_ms"] == pytest.approx(99.01)
+        assert stats["max_ms"] == pytest.approx(100.0)
+        assert loadtest.percentiles([]) == {"count": 0}
+
+    def test_parse_sizes(self):
+        assert loadtest.parse_sizes("1000:6, 20000:3,200000") == {1000: 6.0, 20000: 3.0, 200000: 1.0}
+        with pytest.raises(ValueError):
+            loadtest.parse_sizes("")
+
+    def test_process_tree_rss(self):
+        assert loadtest.process_tree_rss(os.getpid()) > 0
+
+    def test_stop_server_after_exit(self):
+        proc = subprocess.Popen([sys.executable, "-c", "pass"], start_new_session=True)
+        proc.wait()
+        loadtest.stop_server(proc)  # no ProcessLookupError
+
+
+class TestRunLoad:
+
+    def test_short_run_against_live_server(self, tmp_path, monkeypatch):
+        from app import app
+
+        monkeypatch.setattr(bench, "DATA_DIR", str(tmp_path))
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            out = loadtest.run_load(
+                f"http://127.0.0.1:{server.server_port}", {300: 1.0}, clients=2,
+                duration=60, runs_per_client=1, progress="mixed", poll_interval=0.05,
+                server_pid=os.getpid(), rss_interval=0.05, timeout=60,
+            )
+        finally:
+            server.shutdown()
+
+        assert out["outcomes"] == {"done": 2}, out["errors"]
+        assert out["endpoints"]["POST /v1/runs"]["status"] == {202: 2}
+        assert out["endpoints"]["GET /v1/runs/<id>/download"]["count"] == 2
+        assert out["time_to_complete"]["300"]["count"] == 2
+        assert out["server_rss"]["peak_mb"] > 0
@@ -0,0 +1,232 @@
+"""
+Tests for memory-store limits: LRU spill to disk, fault-in and TTL expiry.
+"""
+
+import os
+
+import pytest
+
+from src.storage import memory_store as store
+from src.storage.run_store import BACKEND_NAME
+from src.utils.artifacts import build_report_artifacts
+from src.utils.ids import new_run_id
+
+
+@pytest.fixture(autouse=True)
+def _limits(tmp_path, monkeypatch):
+    for run_id in store.list_runs():
+        store.delete_run(run_id)
+    monkeypatch.setattr(store, "SPILL_DIR", str(tmp_path / "spill"))
+    monkeypatch.setattr(store, "RUN_TTL_SECONDS", 0)
+    monkeypatch.setattr(store, "_stats", {"evictions": 0, "fault_ins": 0, "expired": 0})
+    yield
+    for run_id in store.list_runs():
+        store.delete_run(run_id)
+
+
+def _finish(revenue):
+    run_id = new_run_id()
+    report = {
+        "generated_at": "2026-01-01T00:00:00+00:00",
+        "profiling": {"total_revenue": revenue, "rows": list(range(200))},
+    }
+    store.store_run(run_id, {"status": "processing"})
+    store.store_run(run_id, {"status": "done", "report": report,
+                             "_artifacts": build_report_artifacts(report)})
+    return run_id, report
+
+
+class TestMemoryLimits:
+
+    def test_lru_spill_and_fault_in(self, monkeypatch):
+        first, first_report = _finish(1.0)
+        size = store.store_stats()["resident_bytes"]
+        # Room for two reports
+        monkeypatch.setattr(store, "MEMORY_BUDGET_BYTES", size * 2 + size // 2)
+
+        second, _ = _finish(2.0)
+        store.get_run(first)          # touch: `second` is now least recently used
+        third, _ = _finish(3.0)
+
+        stats = store.store_stats()
+        assert stats["evictions"] == 1
+        assert stats["resident_reports"] == 2 and stats["spilled_reports"] == 1
+        assert os.path.exists(os.path.join(store.SPILL_DIR, f"{second}.json.gz"))
+
+        # Summaries survive eviction
+        assert {s["id"] for s in store.list_runs_summary()} == {first, second, third}
+
+        run, version = store.get_run_versioned(second)
+        assert run["report"]["profiling"]["total_revenue"] == 2.0
+        assert set(run["_artifacts"]) == {"identity", "gzip"}
+        assert store.store_stats()["fault_ins"] == 1
+        # Faulting `second` back in pushed out the LRU run, never itself
+        assert "report" in store.get_run(second)
+        assert store.get_run_versioned(first)[0]["report"] == first_report
+
+    def test_sku_table_spills_with_report(self, monkeypatch):
+        run_id, _ = _finish(1.0)
+        table = {"sku": ["A"], "revenue": [1.0], "by_sku": [0], "total_revenue": 1.0}
+        store.store_run(run_id, {"_sku_table": table})
+        monkeypatch.setattr(store, "MEMORY_BUDGET_BYTES", 0)
+        store.enforce_limits()
+        assert "_sku_table" not in store._runs[run_id].data
+        assert store.get_sku_table(run_id) == table
+
+    def test_ttl_expiry_removes_run_and_spill_file(self, monkeypatch):
+        old, _ = _finish(1.0)
+        monkeypatch.setattr(store, "MEMORY_BUDGET_BYTES", 0)
+        store.enforce_limits()
+        path = os.path.join(store.SPILL_DIR, f"{old}.json.gz")
+        assert os.path.exists(path)
+
+        store._finished_at[old] -= 3600
+        monkeypatch.setattr(store, "RUN_TTL_SECONDS", 60)
+        store.enforce_limits()
+        assert store.get_run(old) is None
+        assert not os.path.exists(path)
+        assert store.store_stats()["expired"] == 1
+
+
+    def test_expired_runs_are_not_served_while_idle(self, monkeypatch):
+        read, listed = _finish(1.0)[0], _finish(2.0)[0]
+        monkeypatch.setattr(store, "RUN_TTL_SECONDS", 60)
+        for run_id in (read, listed):
+            store._finished_at[run_id] -= 3600
+        # No run finishes and nothing faults in: only reads happen
+        assert store.get_run_status(read) is None and store.get_run(read) is None
+        monkeypatch.setattr(store, "_last_sweep", 0.0)
+        runs, total = store.query_runs()
+        assert total == 0 and runs == [] and store.list_runs() == []
+        assert store.store_stats()["expired"] == 2
+
+
+class TestListingIndex:
+
+    def test_sorted_pages_and_status_filter(self):
+        ids = [_finish(revenue)[0] for revenue in (5.0, 1.0, 3.0)]
+        failed = new_run_id()
+        store.store_run(failed, {"status": "processing"})
+        store.store_run(failed, {"status": "error", "error": "boom"})
+
+        page, total = store.query_runs(sort="total_revenue", descending=True, offset=0, limit=2)
+        assert total == 3
+        assert [s["total_revenue"] for s in page] == [5.0, 3.0]
+        page, _ = store.query_runs(sort="total_revenue", descending=True, offset=2, limit=2)
+        assert [s["total_revenue"] for s in page] == [1.0]
+        page, _ = store.query_runs(sort="created", descending=False, limit=10)
+        assert [s["id"] for s in page] == ids
+
+        errors, total = store.query_runs(status="error")
+        assert total == 1 and errors[0]["error"] == "boom"
+        assert store.query_runs(status=None)[1] == 4
+
+        store.delete_run(ids[0])
+        assert [s["total_revenue"] for s in store.query_runs(sort="total_revenue")[0]] == [3.0, 1.0]
+
+    def test_snapshot_is_not_mutated_by_later_writes(self):
+        _finish(1.0)
+        snapshot = store._index
+        _finish(2.0)
+        assert len(snapshot[("done", "created")]) == 1
+        assert store.query_runs()[1] == 2
+
+    @pytest.mark.skipif(BACKEND_NAME != "memory", reason="app uses another run store")
+    def test_endpoint(self):
+        from app import app
+        for revenue in (2.0, 9.0):
+            _finish(revenue)
+        client = app.test_client()
+        body = client.get("/v1/runs?sort=total_revenue&limit=1").get_json()
+        assert [r["total_revenue"] for r in body["runs"]] == [9.0]
+        assert body["page"] == {"offset": 0, "limit": 1, "total": 2, "next_offset": 1}
+        assert client.get("/v1/runs?sort=nope").status_code == 400
+
+
+class TestRunRecords:
+
+    def test_readers_keep_their_snapshot(self):
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        store.publish_partial_action(run_id, 0, {"title": "A"})
+        before, v1 = store.get_run_versioned(run_id)
+
+        store.update_progress(run_id, 50, "Half")
+        store.publish_partial_action(run_id, 1, {"title": "B"})
+        after, v2 = store.get_run_versioned(run_id)
+
+        assert v2 == v1 + 2
+        assert "progress" not in before
+        assert before["partial"]["ranked_actions"] == [{"title": "A"}]
+        assert after["partial"]["ranked_actions"] == [{"title": "A"}, {"title": "B"}]
+
+    def test_records_are_frozen(self):
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        with pytest.raises(AttributeError):
+            store._runs[run_id].version = 99
+
+    def test_no_torn_reads_under_concurrent_writes(self):
+        import threading
+
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                store.update_progress(run_id, i, str(i))
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(2000):
+                progress = store.get_run(run_id).get("progress")
+                if progress:
+                    assert progress["label"] == str(progress["pct"])
+        finally:
+            stop.set()
+            thread.join()
+
+
+class TestLostSpillFile:
+
+    def _spill(self, monkeypatch):
+        run_id, _ = _finish(1.0)
+        monkeypatch.setattr(store, "MEMORY_BUDGET_BYTES", 0)
+        store.enforce_limits()
+        return run_id, os.path.join(store.SPILL_DIR, f"{run_id}.json.gz")
+
+    @pytest.mark.parametrize("damage", ["delete", "corrupt"])
+    def test_flagged_instead_of_report_less_done(self, monkeypatch, damage):
+        run_id, path = self._spill(monkeypatch)
+        if damage == "delete":
+            os.remove(path)
+        else:
+            with open(path, "wb") as fh:
+                fh.write(b"not gzip")
+        run, _ = store.get_run_versioned(run_id)
+        assert run["status"] == "done" and run["_report_unavailable"] is True
+        assert "report" not in run
+
+    def test_concurrently_deleted_run_is_gone(self, monkeypatch):
+        run_id, path = self._spill(monkeypatch)
+        os.remove(path)
+        store.delete_run(run_id)
+        assert store.get_run_versioned(run_id) == (None, 0)
+
+    @pytest.mark.skipif(BACKEND_NAME != "memory", reason="app uses another run store")
+    def test_endpoints_answer_410(self, monkeypatch):
+        from app import app
+
+        run_id, path = self._spill(monkeypatch)
+        os.remove(path)
+        client = app.test_client()
+        for url in (f"/v1/runs/{run_id}", f"/v1/runs/{run_id}/download"):
+            resp = client.get(url)
+            assert resp.status_code == 410
+            assert resp.get_json() == {"error": "report_unavailable", "status": "done"}
+        line = client.get(f"/v1/runs/batch?ids={run_id}").get_data(as_text=True)
+        assert '"error":"report_unavailable"' in line
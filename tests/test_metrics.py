@@ -0,0 +1,128 @@
+"""
+Tests for stage instrumentation, the Prometheus registry and /metrics.
+"""
+
+import os
+import time
+
+import pytest
+
+from fake_llm_server import start_in_thread
+from src.services.llm_client import LLMClient
+from src.services.run_service import RunService
+from src.storage.run_store import get_run
+from src.utils import metrics
+from src.utils.instrumentation import add_llm_usage, stage, summarize_timings
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+
+class TestStage:
+
+    def test_records_time_rows_and_tokens(self):
+        sink = []
+        with stage(sink, "llm.call", rows_in=3, goal_index=0) as rec:
+            add_llm_usage(100, 20)
+            add_llm_usage(50, None)
+            rec["rows_out"] = 1
+        add_llm_usage(1, 1)  # outside any stage: ignored
+
+        (rec,) = sink
+        assert rec["stage"] == "llm.call" and rec["goal_index"] == 0
+        assert rec["rows_in"] == 3 and rec["rows_out"] == 1
+        assert rec["wall_s"] >= 0 and rec["cpu_s"] >= 0 and rec["peak_rss_delta_mb"] >= 0
+        assert rec["llm_tokens"] == {"prompt": 150, "completion": 20, "calls": 2}
+
+        summary = summarize_timings(sink, total_wall_s=1.5)
+        assert summary["llm_tokens"] == {"prompt": 150, "completion": 20}
+        assert summary["wall_s"] == 1.5
+
+    def test_peak_rss_is_per_stage(self):
+        from src.utils.instrumentation import _current_rss_bytes
+
+        if _current_rss_bytes() is None:
+            pytest.skip("current RSS is only readable from /proc")
+        sink = []
+        for _ in range(2):  # the second stage stays under the first one's peak
+            with stage(sink, "alloc"):
+                block = bytearray(64 * 1024 * 1024)
+                block[::4096] = b"x" * len(block[::4096])  # touch every page
+                time.sleep(0.05)
+                del block
+        assert all(rec["peak_rss_delta_mb"] >= 50 for rec in sink)
+        assert all(rec["process_cpu_s"] >= 0 for rec in sink)
+
+    def test_failed_stage_is_recorded(self):
+        sink = []
+        with pytest.raises(RuntimeError):
+            with stage(sink, "boom"):
+                raise RuntimeError("x")
+        assert sink[0]["error"] is True and "wall_s" in sink[0]
+
+
+class TestRegistry:
+
+    def test_histogram_exposition(self):
+        h = metrics.Histogram("t_seconds", "help", ("stage",), buckets=(0.1, 1))
+        for v in (0.05, 0.1, 0.5, 3):
+            h.observe(v, stage='a"b')
+        lines = list(h.samples())
+        assert lines == [
+            't_seconds_bucket{stage="a\\"b",le="0.1"} 2',
+            't_seconds_bucket{stage="a\\"b",le="1"} 3',
+            't_seconds_bucket{stage="a\\"b",le="+Inf"} 4',
+            't_seconds_sum{stage="a\\"b"} 3.65',
+            't_seconds_count{stage="a\\"b"} 4',
+        ]
+
+    def test_observe_run(self):
+        before = metrics.LLM_TOKENS.value(stage="llm.rank_actions", kind="prompt")
+        runs_before = metrics.RUNS.value(status="done")
+        metrics.observe_run({"wall_s": 2.0, "stages": [
+            {"stage": "profile", "wall_s": 0.2, "cpu_s": 0.1, "peak_rss_delta_mb": 5.0,
+             "rows_in": 10, "rows_out": 4},
+            {"stage": "llm.rank_actions", "wall_s": 1.0, "cpu_s": 0.01, "peak_rss_delta_mb": 0,
+             "llm_tokens": {"prompt": 900, "completion": 300, "calls": 1}},
+        ]}, "done")
+        assert metrics.RUNS.value(status="done") == runs_before + 1
+        assert metrics.LLM_TOKENS.value(stage="llm.rank_actions", kind="prompt") == before + 900
+        assert metrics.STAGE_ROWS.value(stage="profile", direction="out") >= 4
+        text = metrics.render()
+        assert "# TYPE margintel_stage_duration_seconds histogram" in text
+        assert 'margintel_stage_cpu_seconds_count{stage="profile"}' in text
+
+
+class TestPipelineTimings:
+
+    def test_run_record_and_metrics_endpoint(self):
+        from app import app
+
+        server = start_in_thread(stream_chunk_ms=0, seed=1)
+        try:
+            service = RunService(LLMClient(api_key="", base_url=server.base_url))
+            run_id, error = service.start_analysis_pipeline(
+                orders_file=os.path.join(SAMPLE_DIR, "orders.csv"),
+                returns_file=os.path.join(SAMPLE_DIR, "returns.csv"),
+            )
+            assert error is None
+            deadline = time.monotonic() + 30
+            while get_run(run_id)["status"] not in ("done", "error") and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        run = get_run(run_id)
+        assert run["status"] == "done", run.get("error")
+        timings = run["timings"]
+        names = [s["stage"] for s in timings["stages"]]
+        assert names == ["ingest", "profile", "returns", "dependency", "llm.cluster_return_reasons",
+                         "llm.rank_actions", "report_build", "serialization"]
+        assert timings["llm_tokens"]["prompt"] > 0 and timings["llm_tokens"]["completion"] > 0
+        assert timings["wall_s"] >= sum(s["wall_s"] for s in timings["stages"][:4])
+
+        resp = app.test_client().get("/metrics")
+        assert resp.status_code == 200 and resp.mimetype == "text/plain"
+        body = resp.get_data(as_text=True)
+        assert 'margintel_llm_tokens_total{stage="llm.rank_actions",kind="completion"}' in body
+        assert 'margintel_stage_duration_seconds_bucket{stage="ingest",le="+Inf"}' in body
@@ -0,0 +1,92 @@
+"""
+Tests for field projection, pagination and ETag handling on run retrieval.
+"""
+
+from src.storage.run_store import store_run, update_progress
+from src.utils.ids import new_run_id
+from src.utils.projection import paginate, project
+
+
+def _doc():
+    return {
+        "status": "done",
+        "progress": {"pct": 100, "label": "Analysis complete"},
+        "report": {
+            "profiling": {
+                "total_revenue": 100.0,
+                "high_return_skus": [{"sku": f"S{i}"} for i in range(5)],
+                "sku_revenue_breakdown": {f"S{i}": 10.0 - i for i in range(5)},
+            },
+            "modules": {"x": 1},
+        },
+    }
+
+
+class TestProjection:
+
+    def test_project_nested_paths(self):
+        out = project(_doc(), ["status", "report.profiling.total_revenue", "report.nope"])
+        assert out == {"status": "done", "report": {"profiling": {"total_revenue": 100.0}}}
+
+    def test_paginate_list(self):
+        doc = _doc()
+        out, page = paginate(doc, "report.profiling.high_return_skus", offset=1, limit=2)
+        assert out["report"]["profiling"]["high_return_skus"] == [{"sku": "S1"}, {"sku": "S2"}]
+        assert page == {"path": "report.profiling.high_return_skus", "offset": 1,
+                        "limit": 2, "total": 5, "next_offset": 3}
+        # Input untouched
+        assert len(doc["report"]["profiling"]["high_return_skus"]) == 5
+
+    def test_paginate_dict_last_page(self):
+        out, page = paginate(_doc(), "report.profiling.sku_revenue_breakdown", offset=3, limit=10)
+        assert list(out["report"]["profiling"]["sku_revenue_breakdown"]) == ["S3", "S4"]
+        assert page["next_offset"] is None
+
+    def test_paginate_unknown_path(self):
+        doc = _doc()
+        out, page = paginate(doc, "report.nope", 0, 10)
+        assert out is doc and page is None
+
+
+class TestRunEndpointCaching:
+
+    def _make_run(self):
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        update_progress(run_id, 100, "Analysis complete")
+        store_run(run_id, {"status": "done", "report": _doc()["report"]})
+        return run_id
+
+    def test_etag_and_304(self):
+        from app import app
+        client = app.test_client()
+        run_id = self._make_run()
+
+        first = client.get(f"/v1/runs/{run_id}")
+        etag = first.headers["ETag"]
+        assert first.status_code == 200 and etag
+
+        again = client.get(f"/v1/runs/{run_id}", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.get_data() == b""
+
+        # A different projection is a different representation
+        other = client.get(f"/v1/runs/{run_id}?fields=status", headers={"If-None-Match": etag})
+        assert other.status_code == 200
+        assert other.get_json() == {"status": "done"}
+
+        # Any mutation invalidates the tag
+        update_progress(run_id, 100, "Touched")
+        assert client.get(f"/v1/runs/{run_id}", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_paginated_request(self):
+        from app import app
+        run_id = self._make_run()
+        resp = app.test_client().get(
+            f"/v1/runs/{run_id}?fields=report.profiling.sku_revenue_breakdown"
+            "&page=report.profiling.sku_revenue_breakdown&limit=2"
+        )
+        body = resp.get_json()
+        assert body["report"]["profiling"]["sku_revenue_breakdown"] == {"S0": 10.0, "S1": 9.0}
+        assert body["page"]["total"] == 5
+        assert "status" not in body
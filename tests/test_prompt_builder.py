@@ -0,0 +1,115 @@
+"""
+Tests for the token-budgeted rank_actions prompt builder.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.services.prompt_builder import build_rank_actions_input, count_tokens
+
+
+def _make_inputs(n_skus: int):
+    sku_rev = {f"SKU-{i}": float(n_skus - i) * 100 for i in range(n_skus)}
+    profiling = {
+        "total_revenue": sum(sku_rev.values()),
+        "total_refunds": 1234.5,
+        "aov": 42.0,
+        "top_sku_revenue_share": {"top1": 0.1, "top3": 0.2, "top5": 0.3},
+        "high_return_skus": [
+            {"sku": s, "return_rate": 0.2, "revenue": r, "estimated_margin_risk": r * 0.2}
+            for s, r in sku_rev.items()
+        ],
+        "_sku_revenue": sku_rev,
+    }
+    modules = {
+        "returns_intelligence": {
+            "themes": [
+                {"theme": "Sizing", "examples": ["small", "tiny", "short"],
+                 "skus_affected": list(sku_rev), "severity": 4},
+            ],
+            "top_risk_skus": [
+                {"sku": s, "return_rate": 0.2, "revenue": r, "impact_estimate": r * 0.2,
+                 "evidence": [f"e{j}" for j in range(10)]}
+                for s, r in sku_rev.items()
+            ],
+        },
+        "revenue_dependency_risk": {"risk_level": "low", "signals": [],
+                                    "concentration_metrics": {"top1": 0.1}},
+    }
+    return profiling, modules
+
+
+class TestBuildRankActionsInput:
+
+    def test_small_payload_is_untouched(self):
+        profiling, modules = _make_inputs(3)
+        text, tokens = build_rank_actions_input("goal", "", profiling, modules, budget=100_000)
+        payload = json.loads(text)
+        assert len(payload["profiling"]["high_return_skus"]) == 3
+        assert "_sku_revenue" not in payload["profiling"]
+        assert tokens == count_tokens(text)
+
+    def test_large_payload_fits_budget(self):
+        profiling, modules = _make_inputs(2000)
+        text, tokens = build_rank_actions_input("goal", "", profiling, modules, budget=2000)
+        assert tokens <= 2000
+        assert tokens == count_tokens(text)
+
+    def test_trim_keeps_highest_impact_and_aggregates_tail(self):
+        profiling, modules = _make_inputs(500)
+        text, _ = build_rank_actions_input("goal", "", profiling, modules, budget=3000)
+        payload = json.loads(text)
+        kept = payload["profiling"]["high_return_skus"]
+        assert kept[0]["sku"] == "SKU-0"
+        tail = payload["profiling"]["high_return_skus_tail"]
+        assert tail["sku_count"] == 500 - len(kept)
+
+        theme = payload["modules"]["returns_intelligence"]["themes"][0]
+        assert theme["skus_affected"][0] == "SKU-0"
+        assert theme["skus_affected_more"] == 500 - len(theme["skus_affected"])
+
+    def test_headline_metrics_survive_compaction(self):
+        profiling, modules = _make_inputs(2000)
+        text, _ = build_rank_actions_input("goal", "", profiling, modules, budget=1000)
+        payload = json.loads(text)
+        assert payload["profiling"]["total_revenue"] == profiling["total_revenue"]
+        assert payload["modules"]["revenue_dependency_risk"]["risk_level"] == "low"
+
+
+class TestTokenCounting:
+
+    @pytest.fixture
+    def fresh_loader(self, monkeypatch):
+        from src.services import prompt_builder
+
+        monkeypatch.setattr(prompt_builder, "_encoder", None)
+        monkeypatch.setattr(prompt_builder, "_encoder_loaded", False)
+        return prompt_builder
+
+    def test_uses_tiktoken_encoding(self, fresh_loader, monkeypatch):
+        tiktoken = pytest.importorskip("tiktoken")
+
+        class Encoding:
+            def encode(self, text):
+                return text.split()
+
+        monkeypatch.setattr(tiktoken, "get_encoding", lambda name: Encoding())
+        assert fresh_loader.count_tokens("three small words") == 3
+
+    def test_slow_load_falls_back_to_heuristic(self, fresh_loader, monkeypatch):
+        tiktoken = pytest.importorskip("tiktoken")
+        release = threading.Event()
+
+        def get_encoding(name):  # stands in for a download that hangs offline
+            release.wait(5)
+            raise OSError("offline")
+
+        monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+        monkeypatch.setattr(fresh_loader, "TOKENIZER_LOAD_TIMEOUT_SECONDS", 0.05)
+        started = time.monotonic()
+        assert fresh_loader.count_tokens("x" * 40) == 10
+        assert time.monotonic() - started < 2
+        release.set()
@@ -0,0 +1,87 @@
+"""
+Tests for the per-run event log and the SSE endpoint.
+"""
+
+import json
+import threading
+import time
+
+from src.storage.run_store import (
+    delete_run, store_run, update_progress, wait_for_events,
+)
+from src.utils.ids import new_run_id
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines()
+            if ": " in line and not line.startswith(":")
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestEventLog:
+
+    def test_waiter_wakes_on_progress(self):
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        cursor = wait_for_events(run_id, 0, timeout=0)[-1]["id"]
+
+        threading.Timer(0.05, update_progress, args=(run_id, 40, "Halfway")).start()
+        started = time.monotonic()
+        events = wait_for_events(run_id, cursor, timeout=5)
+        assert time.monotonic() - started < 2
+        assert events == [{"id": cursor + 1, "event": "progress",
+                           "data": {"pct": 40, "label": "Halfway"}}]
+        delete_run(run_id)
+
+    def test_timeout_returns_empty(self):
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        cursor = wait_for_events(run_id, 0, timeout=0)[-1]["id"]
+        assert wait_for_events(run_id, cursor, timeout=0.01) == []
+        delete_run(run_id)
+
+    def test_unknown_run(self):
+        assert wait_for_events("missing", 0, timeout=0) is None
+
+
+class TestEventsEndpoint:
+
+    def test_stream_ends_after_terminal_status(self):
+        from app import app
+
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        update_progress(run_id, 50, "Working")
+        update_progress(run_id, 100, "Analysis complete")
+        store_run(run_id, {"status": "done", "report": {}})
+
+        resp = app.test_client().get(f"/v1/runs/{run_id}/events")
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/event-stream"
+        events = _parse_sse(resp.get_data(as_text=True))
+        assert events[-1] == ("status", {"status": "done"})
+        assert ("progress", {"pct": 100, "label": "Analysis complete"}) in events
+
+    def test_resume_with_last_event_id(self):
+        from app import app
+
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        update_progress(run_id, 50, "Working")
+        store_run(run_id, {"status": "error", "error": "boom"})
+
+        resp = app.test_client().get(f"/v1/runs/{run_id}/events",
+                                     headers={"Last-Event-ID": "2"})
+        events = _parse_sse(resp.get_data(as_text=True))
+        assert events == [("status", {"status": "error", "error": "boom"})]
+
+    def test_not_found(self):
+        from app import app
+
+        assert app.test_client().get("/v1/runs/nope/events").status_code == 404
@@ -0,0 +1,123 @@
+"""
+Tests for opt-in run profiling and GET /v1/runs/<id>/profile.
+"""
+
+import io
+import json
+import marshal
+import os
+import pstats
+import time
+import tracemalloc
+
+from src.storage.run_store import get_run
+from src.utils.run_profiler import RunProfiler, capture
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+
+def _busy_allocate(seconds):
+    blocks = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        blocks.append(bytearray(10_000))
+    return blocks
+
+
+def _load_stats(raw: bytes) -> str:
+    stats = pstats.Stats.__new__(pstats.Stats)
+    stats.init(None)
+    stats.stats = marshal.loads(raw)
+    stats.get_top_level_stats()
+    out = io.StringIO()
+    stats.stream = out
+    stats.print_stats()
+    return out.getvalue()
+
+
+def _wait_done(run_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while get_run(run_id)["status"] not in ("done", "error") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return get_run(run_id)
+
+
+class TestRunProfiler:
+
+    def test_files_cover_cpu_stacks_and_allocations(self):
+        profiler = RunProfiler(sample_interval_ms=1)
+        profiler.start_tracing()
+        with capture(profiler, "work"):
+            kept = _busy_allocate(0.1)
+            with capture(profiler, "nested"):  # same thread: no second profiler
+                pass
+        files = profiler.finish()
+        assert set(files) == {"profile.pstats", "stacks.collapsed", "allocations.json", "profile.txt"}
+
+        assert "_busy_allocate" in _load_stats(files["profile.pstats"])
+
+        lines = files["stacks.collapsed"].decode().splitlines()
+        assert lines and all(line.startswith("work;") for line in lines)
+        assert any("_busy_allocate (test_run_profiler.py:" in line for line in lines)
+
+        allocations = json.loads(files["allocations.json"])
+        assert allocations["traced_peak_bytes"] >= len(kept) * 10_000
+        callers = [a["caller"] for a in allocations["top"] if a["caller"]]
+        assert any(c["file"] == os.path.join("tests", "test_run_profiler.py") for c in callers)
+        assert not tracemalloc.is_tracing()
+
+    def test_discard_stops_tracing_and_capture_of_none_is_noop(self):
+        profiler = RunProfiler()
+        assert not tracemalloc.is_tracing()  # not until the run executes
+        profiler.start_tracing()
+        assert tracemalloc.is_tracing()
+        profiler.discard()
+        assert not tracemalloc.is_tracing() and profiler.finished
+        with capture(None, "off"):
+            pass
+
+
+class TestProfileEndpoint:
+
+    def _submit(self, client, **form):
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            resp = client.post("/v1/runs", data={"orders_file": (fh, "orders.csv"), **form},
+                               content_type="multipart/form-data")
+        assert resp.status_code == 202
+        return resp.get_json()["run_id"]
+
+    def test_profiled_run_serves_files(self, monkeypatch):
+        from app import app
+
+        monkeypatch.setattr("app.RUN_PROFILING_ENABLED", True)
+        client = app.test_client()
+        run_id = self._submit(client, profile="true")
+        assert _wait_done(run_id)["status"] == "done"
+
+        index = client.get(f"/v1/runs/{run_id}/profile").get_json()
+        names = {f["name"] for f in index["files"]}
+        assert names == {"profile.pstats", "stacks.collapsed", "allocations.json", "profile.txt"}
+        assert index["traced_peak_bytes"] > 0
+
+        resp = client.get(f"/v1/runs/{run_id}/profile/profile.pstats")
+        assert resp.status_code == 200
+        text = _load_stats(resp.get_data())
+        assert "profile_orders" in text and "load_orders_csv" in text
+        assert client.get(f"/v1/runs/{run_id}/profile/nope").status_code == 404
+
+    def test_unprofiled_run(self):
+        from app import app
+
+        client = app.test_client()
+        run_id = self._submit(client)
+        assert _wait_done(run_id)["status"] == "done"
+        assert client.get(f"/v1/runs/{run_id}/profile").get_json() == {"error": "not_profiled"}
+        assert client.get("/v1/runs/missing/profile").status_code == 404
+
+    def test_profiling_is_off_by_default(self):
+        from app import app
+
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            resp = app.test_client().post("/v1/runs", data={"orders_file": (fh, "orders.csv"), "profile": "true"},
+                                          content_type="multipart/form-data")
+        assert resp.status_code == 400 and resp.get_json() == {"error": "profiling_disabled"}
@@ -0,0 +1,110 @@
+"""
+Tests for the bounded JobScheduler.
+"""
+
+import threading
+
+import pytest
+
+from src.services.scheduler import JobScheduler, SchedulerSaturated
+
+
+def _blocking_job(gate: threading.Event, started: threading.Event | None = None):
+    def job():
+        if started:
+            started.set()
+        gate.wait(5)
+    return job
+
+
+class TestJobScheduler:
+
+    def test_runs_jobs_on_fixed_pool(self):
+        sched = JobScheduler(workers=2, max_queue=10, max_inflight_bytes=10**9)
+        done = threading.Event()
+        results = []
+
+        def job(i):
+            results.append(i)
+            if len(results) == 5:
+                done.set()
+
+        for i in range(5):
+            sched.submit(f"j{i}", job, args=(i,))
+        assert done.wait(5)
+        assert sorted(results) == [0, 1, 2, 3, 4]
+        assert len(sched._threads) == 2
+
+    def test_queue_full_rejects_with_retry_after(self):
+        gate = threading.Event()
+        started = threading.Event()
+        sched = JobScheduler(workers=1, max_queue=1, max_inflight_bytes=10**9)
+        sched.submit("running", _blocking_job(gate, started))
+        assert started.wait(5)
+        sched.submit("queued", _blocking_job(gate))
+        with pytest.raises(SchedulerSaturated) as exc:
+            sched.submit("rejected", _blocking_job(gate))
+        assert exc.value.reason == "queue_full"
+        assert exc.value.retry_after >= 1
+        gate.set()
+
+    def test_memory_budget_admission(self):
+        gate = threading.Event()
+        started = threading.Event()
+        sched = JobScheduler(workers=4, max_queue=10, max_inflight_bytes=100)
+        # An oversized job is admitted when nothing else is in flight...
+        sched.submit("big", _blocking_job(gate, started), cost_bytes=500)
+        assert started.wait(5)
+        # ...but nothing else fits behind it.
+        with pytest.raises(SchedulerSaturated) as exc:
+            sched.submit("small", _blocking_job(gate), cost_bytes=10)
+        assert exc.value.reason == "memory_budget_exceeded"
+        gate.set()
+
+    def test_priority_order_and_positions(self):
+        gate = threading.Event()
+        started = threading.Event()
+        positions: dict[str, list[int]] = {}
+        order = []
+        all_done = threading.Event()
+
+        def record(job_id, pos):
+            positions.setdefault(job_id, []).append(pos)
+
+        def job(name):
+            order.append(name)
+            if len(order) == 2:
+                all_done.set()
+
+        sched = JobScheduler(workers=1, max_queue=10, max_inflight_bytes=10**9, on_position=record)
+        sched.submit("blocker", _blocking_job(gate, started))
+        assert started.wait(5)
+        assert sched.submit("low", job, args=("low",), priority=0) == 1
+        assert sched.submit("high", job, args=("high",), priority=5) == 1
+        assert positions["low"][-1] == 2
+        gate.set()
+        assert all_done.wait(5)
+        assert order == ["high", "low"]
+        assert positions["low"][-1] == 0
+
+    def test_only_changed_positions_are_published(self):
+        gate = threading.Event()
+        started = threading.Event()
+        calls = []
+        sched = JobScheduler(workers=1, max_queue=100, max_inflight_bytes=10**9,
+                             on_position=lambda job_id, pos: calls.append((job_id, pos)))
+        sched.submit("blocker", _blocking_job(gate, started))
+        assert started.wait(5)
+        calls.clear()
+        for i in range(20):
+            sched.submit(f"q{i}", _blocking_job(gate))
+        # FIFO arrivals don't move anyone already queued
+        assert calls == [(f"q{i}", i + 1) for i in range(20)]
+        gate.set()
+
+    def test_callback_runs_outside_the_lock(self):
+        seen = []
+        sched = JobScheduler(workers=1, max_queue=10, max_inflight_bytes=10**9,
+                             on_position=lambda job_id, pos: seen.append(sched._cv._is_owned()))
+        sched.submit("a", lambda: None)
+        assert seen and not any(seen)
@@ -0,0 +1,77 @@
+"""
+Tests for the columnar SKU table, the top-N report breakdown and /skus.
+"""
+
+import pytest
+
+from src.services.report_builder import build_report
+from src.storage.run_store import store_run
+from src.utils.ids import new_run_id
+from src.utils.sku_table import build_sku_table, query_sku_table, top_n_breakdown
+
+SKU_REVENUE = {"B-2": 50.004, "A-1": 100.0, "C-3": 25.0, "a-4": 10.0, "D-5": 5.0}
+
+
+class TestSkuTable:
+
+    def test_columns_sorted_by_revenue(self):
+        table = build_sku_table(SKU_REVENUE)
+        assert table["sku"] == ["A-1", "B-2", "C-3", "a-4", "D-5"]
+        assert table["revenue"] == [100.0, 50.0, 25.0, 10.0, 5.0]
+        assert table["total_revenue"] == 190.0
+
+    def test_top_n_and_other(self):
+        top, other = top_n_breakdown(build_sku_table(SKU_REVENUE), 2)
+        assert top == {"A-1": 100.0, "B-2": 50.0}
+        assert other == {"sku_count": 3, "revenue": 40.0}
+
+    def test_query_sort_search_and_page(self):
+        table = build_sku_table(SKU_REVENUE)
+        rows, total = query_sku_table(table, offset=1, limit=2)
+        assert total == 5 and [r["sku"] for r in rows] == ["B-2", "C-3"]
+
+        rows, _ = query_sku_table(table, sort="revenue", descending=False, limit=1)
+        assert rows == [{"sku": "D-5", "revenue": 5.0, "share": round(5 / 190, 6)}]
+
+        rows, _ = query_sku_table(table, sort="sku", descending=False)
+        assert [r["sku"] for r in rows] == ["A-1", "B-2", "C-3", "D-5", "a-4"]
+
+        rows, total = query_sku_table(table, q="a-")
+        assert total == 2 and [r["sku"] for r in rows] == ["A-1", "a-4"]
+
+        with pytest.raises(ValueError):
+            query_sku_table(table, sort="nope")
+
+    def test_report_inlines_only_top_n(self, monkeypatch):
+        monkeypatch.setattr("src.services.report_builder.SKU_BREAKDOWN_TOP_N", 3)
+        report = build_report(
+            run_id="r", profiling={"_sku_revenue": SKU_REVENUE}, returns_signals={},
+            dependency={}, decision={}, orders_rows=1, returns_rows=0, notes=[],
+        )
+        assert list(report["profiling"]["sku_revenue_breakdown"]) == ["A-1", "B-2", "C-3"]
+        assert report["profiling"]["sku_revenue_other"] == {"sku_count": 2, "revenue": 15.0}
+
+
+class TestSkusEndpoint:
+
+    def test_paged_search(self):
+        from app import app
+
+        run_id = new_run_id()
+        store_run(run_id, {"status": "processing"})
+        client = app.test_client()
+        assert client.get(f"/v1/runs/{run_id}/skus").status_code == 409
+
+        store_run(run_id, {"status": "done", "report": {},
+                           "_sku_table": build_sku_table(SKU_REVENUE)})
+        resp = client.get(f"/v1/runs/{run_id}/skus?limit=2")
+        body = resp.get_json()
+        assert [r["sku"] for r in body["skus"]] == ["A-1", "B-2"]
+        assert body["page"] == {"offset": 0, "limit": 2, "total": 5, "next_offset": 2}
+        assert client.get(f"/v1/runs/{run_id}/skus?limit=2",
+                          headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+        body = client.get(f"/v1/runs/{run_id}/skus?q=c&sort=sku").get_json()
+        assert [r["sku"] for r in body["skus"]] == ["C-3"]
+        assert client.get(f"/v1/runs/{run_id}/skus?sort=bad").status_code == 400
+        assert client.get("/v1/runs/missing/skus").status_code == 404
@@ -0,0 +1,134 @@
+"""
+Tests for the SQLite run store backend.
+"""
+
+import multiprocessing as mp
+import threading
+
+import pytest
+
+from src.storage import sqlite_store as store
+from src.utils.artifacts import build_report_artifacts
+from src.utils.ids import new_run_id
+
+
+@pytest.fixture(autouse=True)
+def _db(tmp_path):
+    store.init_store(str(tmp_path / "runs.db"))
+    yield str(tmp_path / "runs.db")
+
+
+def _report():
+    return {
+        "generated_at": "2026-01-01T00:00:00+00:00",
+        "profiling": {"total_revenue": 1234.5, "high_return_skus": [{"sku": "A"}]},
+        "modules": {"revenue_dependency_risk": {"risk_level": "low"}},
+    }
+
+
+def _finish(run_id, report):
+    store.store_run(run_id, {"status": "done", "report": report,
+                             "_artifacts": build_report_artifacts(report)})
+
+
+def _write_run_in_child(path, run_id):
+    store.init_store(path)
+    store.store_run(run_id, {"status": "processing"})
+    store.update_progress(run_id, 40, "From another process")
+
+
+class TestSqliteStore:
+
+    def test_roundtrip_with_artifacts(self):
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        _, v1 = store.get_run_versioned(run_id)
+        _finish(run_id, _report())
+
+        run, v2 = store.get_run_versioned(run_id)
+        assert v2 > v1
+        assert run["status"] == "done"
+        assert run["report"] == _report()
+        assert set(run["_artifacts"]) >= {"identity", "gzip"}
+        assert run["_artifacts"]["identity"] == build_report_artifacts(_report())["identity"]
+
+    def test_cheap_reads_skip_the_report(self, monkeypatch):
+        run_id = new_run_id()
+        _finish(run_id, _report())
+        artifacts = build_report_artifacts(_report())
+
+        # None of these may decompress or parse the report
+        monkeypatch.setattr(store.zlib, "decompress", None)
+        state, version = store.get_run_state(run_id)
+        assert state["status"] == "done" and "report" not in state and version > 0
+        assert store.get_run_status(run_id) == "done"
+        assert store.get_run_status("missing") is None
+        assert set(store.report_encodings(run_id)) == set(artifacts)
+        assert store.get_report_artifact(run_id, "gzip") == artifacts["gzip"]
+        monkeypatch.undo()
+        assert store.get_report_artifact(run_id) == artifacts["identity"]
+        assert store.get_run_versioned(run_id)[1] == version
+        assert store.report_encodings("missing") == [] and store.get_report_artifact("missing") is None
+
+    def test_progress_partial_and_events(self):
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        store.update_progress(run_id, 50, "Half")
+        store.publish_partial_action(run_id, 0, {"title": "A"})
+        store.publish_partial_action(run_id, 0, {"title": "A2"})
+        run = store.get_run(run_id)
+        assert run["progress"] == {"pct": 50, "label": "Half"}
+        assert run["partial"]["ranked_actions"] == [{"title": "A2"}]
+
+        events = store.wait_for_events(run_id, 0, timeout=0)
+        assert [e["event"] for e in events] == ["status", "progress", "partial_action", "partial_action"]
+        assert [e["id"] for e in events] == [1, 2, 3, 4]
+
+        _finish(run_id, _report())
+        assert "partial" not in store.get_run(run_id)
+
+    def test_waiter_wakes_on_write(self):
+        run_id = new_run_id()
+        store.store_run(run_id, {"status": "processing"})
+        threading.Timer(0.05, store.update_progress, args=(run_id, 10, "Go")).start()
+        events = store.wait_for_events(run_id, 1, timeout=5)
+        assert events == [{"id": 2, "event": "progress", "data": {"pct": 10, "label": "Go"}}]
+        assert store.wait_for_events("missing", 0, timeout=0) is None
+
+    def test_summary_listing_and_delete(self):
+        done, pending = new_run_id(), new_run_id()
+        _finish(done, _report())
+        store.store_run(pending, {"status": "processing"})
+
+        summaries = store.list_runs_summary()
+        assert [s["id"] for s in summaries] == [done]
+        assert summaries[0]["total_revenue"] == 1234.5
+        assert summaries[0]["risk_level"] == "low"
+        assert set(store.list_runs()) == {done, pending}
+
+        store.delete_run(done)
+        assert store.get_run(done) is None
+        assert store.list_runs_summary() == []
+
+    def test_visible_across_processes(self, _db):
+        run_id = new_run_id()
+        proc = mp.get_context("spawn").Process(target=_write_run_in_child, args=(_db, run_id))
+        proc.start()
+        proc.join(30)
+        assert proc.exitcode == 0
+        assert store.get_run(run_id)["progress"]["label"] == "From another process"
+
+    def test_query_runs(self):
+        for revenue in (5.0, 1.0, 3.0):
+            run_id = new_run_id()
+            report = _report()
+            report["profiling"]["total_revenue"] = revenue
+            _finish(run_id, report)
+        failed = new_run_id()
+        store.store_run(failed, {"status": "error", "error": "boom"})
+
+        page, total = store.query_runs(sort="total_revenue", offset=1, limit=5)
+        assert total == 3 and [s["total_revenue"] for s in page] == [3.0, 1.0]
+        errors, total = store.query_runs(status="error")
+        assert total == 1 and errors[0]["error"] == "boom"
+        assert store.query_runs(status=None)[1] == 4
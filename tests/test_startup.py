@@ -0,0 +1,48 @@
+"""
+Tests for the cold-start path: lazy imports, the deferred LLM client and
+the startup benchmark.
+"""
+
+from benchmarks import startup
+from fake_llm_server import start_in_thread
+from src.services.llm_client import LLMClient
+
+
+class TestColdStart:
+
+    def test_import_app_skips_heavy_modules(self, monkeypatch):
+        # A configured key used to build the OpenAI client at import
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        sample = startup.measure_import()
+        assert sample["status"] == 200
+        assert sample["heavy"] == []
+
+    def test_llm_client_connects_on_first_call(self):
+        server = start_in_thread(stream_chunk_ms=0, seed=1)
+        try:
+            llm = LLMClient(api_key="", base_url=server.base_url)
+            assert llm.available and llm._client is None
+            themes = llm.cluster_return_reasons([{"sku": "A", "reason": "too small"}])
+            assert llm._client is not None and isinstance(themes, list)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_unconfigured_client_stays_unavailable(self):
+        llm = LLMClient(api_key="", base_url="")
+        assert not llm.available
+        assert llm.cluster_return_reasons([{"sku": "A"}]) == []
+        assert llm._client is None
+
+
+class TestStartupBenchmark:
+
+    def test_run_and_budget_check(self):
+        result = startup.run(repeat=1)
+        assert result["heavy_modules"] == []
+        assert result["import_ms"] > 0 and result["ready_ms"] >= result["import_ms"]
+        assert startup.check(result, max_import_ms=10_000, max_ready_ms=30_000) == []
+
+        slow = {**result, "import_ms": 900.0, "heavy_modules": ["pandas"]}
+        problems = startup.check(slow, max_import_ms=500, max_ready_ms=30_000)
+        assert len(problems) == 2 and "pandas" in problems[0]
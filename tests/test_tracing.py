@@ -0,0 +1,186 @@
+"""
+Tests for trace spans, their propagation across threads / processes / HTTP
+and the OTLP/JSON file exporter.
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.services.execution import ProcessBackend
+from src.storage.run_store import get_run
+from src.utils import tracing
+from src.utils.csv_loader import load_orders_csv
+from src.utils.decorators import retry_on_exception
+from src.utils.instrumentation import stage
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+
+@pytest.fixture
+def exporter():
+    exp = tracing.MemoryExporter()
+    tracing.set_exporter(exp)
+    yield exp
+    tracing.set_exporter(None)
+
+
+def _attrs(span):
+    return {a["key"]: next(iter(a["value"].values())) for a in span["attributes"]}
+
+
+def _by_name(spans):
+    return {s["name"]: s for s in spans}
+
+
+class TestSpans:
+
+    def test_disabled_is_noop(self):
+        assert not tracing.enabled()
+        with tracing.span("x") as s:
+            assert s is tracing.NOOP_SPAN
+        assert tracing.current_context() is None
+
+    def test_nesting_inheritance_and_stage_attributes(self, exporter):
+        with tracing.span("run.execute", run_id="r1"):
+            with stage([], "profile", rows_in=10) as rec:
+                rec["rows_out"] = 4
+            with pytest.raises(ValueError):
+                with tracing.span("boom"):
+                    raise ValueError("bad")
+
+        spans = _by_name(exporter.spans)
+        root, child, failed = spans["run.execute"], spans["profile"], spans["boom"]
+        assert "parentSpanId" not in root
+        assert child["parentSpanId"] == root["spanId"] == failed["parentSpanId"]
+        assert child["traceId"] == root["traceId"]
+        attrs = _attrs(child)
+        assert attrs["run_id"] == "r1" and attrs["rows_in"] == "10" and attrs["rows_out"] == "4"
+        assert failed["status"]["code"] == tracing.STATUS_ERROR
+        assert failed["events"][0]["name"] == "exception"
+
+    def test_retry_attempts_are_spans(self, exporter):
+        calls = []
+
+        @retry_on_exception(max_retries=3, initial_delay=0, exceptions=(KeyError,))
+        def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise KeyError("once")
+            return "ok"
+
+        with tracing.span("parent"):
+            assert flaky() == "ok"
+        attempts = [s for s in exporter.spans if s["name"].endswith("flaky")]
+        assert [_attrs(s)["attempt"] for s in attempts] == ["1", "2"]
+        assert [s["status"]["code"] for s in attempts] == [tracing.STATUS_ERROR, tracing.STATUS_OK]
+
+    def test_traceparent_round_trip(self):
+        ctx = tracing.parse_traceparent("00-" + "ab" * 16 + "-" + "cd" * 8 + "-01")
+        assert ctx.trace_id == "ab" * 16 and ctx.span_id == "cd" * 8
+        assert tracing.format_traceparent(ctx) == "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+        for bad in (None, "", "00-xyz-abc-01", "00-" + "0" * 32 + "-" + "cd" * 8 + "-01"):
+            assert tracing.parse_traceparent(bad) is None
+
+    def test_process_worker_spans_join_the_parent_trace(self, exporter):
+        orders, _ = load_orders_csv(os.path.join(SAMPLE_DIR, "orders.csv"))
+        backend = ProcessBackend(workers=1)
+        try:
+            with tracing.span("run.execute", run_id="r2") as parent:
+                result = backend.run_core(orders, None)
+        finally:
+            backend.shutdown()
+        assert "spans" not in result
+        spans = _by_name(exporter.spans)
+        for name in ("profile", "returns", "dependency"):
+            assert spans[name]["parentSpanId"] == parent.context.span_id
+            assert spans[name]["traceId"] == parent.context.trace_id
+            assert _attrs(spans[name])["run_id"] == "r2"
+
+
+class TestFileExporter:
+
+    def test_batches_rotate_and_are_otlp(self, tmp_path):
+        path = str(tmp_path / "spans-{pid}.jsonl")
+        exp = tracing.FileExporter(path, max_bytes=2000, backups=2, service_name="svc")
+        tracing.set_exporter(exp)
+        try:
+            for i in range(20):
+                with tracing.span(f"op{i}", n=i):
+                    pass
+        finally:
+            tracing.set_exporter(None)
+
+        written = path.format(pid=os.getpid())
+        files = sorted(os.listdir(tmp_path))
+        assert os.path.basename(written) in files and len(files) == 3  # current + 2 backups
+        payload = json.loads(open(written).readline())
+        (resource_spans,) = payload["resourceSpans"]
+        assert {"key": "service.name", "value": {"stringValue": "svc"}} in \
+            resource_spans["resource"]["attributes"]
+        span = resource_spans["scopeSpans"][0]["spans"][0]
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+
+    def test_concurrent_exports_survive_rotation(self, tmp_path, capfd):
+        path = str(tmp_path / "spans.jsonl")
+        exp = tracing.FileExporter(path, max_bytes=20_000, backups=10_000, service_name="svc")
+
+        def export_many(t):
+            for i in range(400):
+                exp.export({"spanId": f"{t}-{i}"}, flush=True)
+
+        threads = [threading.Thread(target=export_many, args=(t,)) for t in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ids = []
+        for name in os.listdir(tmp_path):
+            with open(tmp_path / name) as fh:
+                for line in fh:
+                    (resource_spans,) = json.loads(line)["resourceSpans"]
+                    ids += [s["spanId"] for s in resource_spans["scopeSpans"][0]["spans"]]
+        assert len(ids) == len(set(ids)) == 16 * 400
+        assert "Traceback" not in capfd.readouterr().err
+
+
+class TestRunTrace:
+
+    def test_http_request_to_stages_share_one_trace(self, exporter):
+        from app import app
+
+        incoming = "00-" + "1f" * 16 + "-" + "2e" * 8 + "-01"
+        with open(os.path.join(SAMPLE_DIR, "orders.csv"), "rb") as fh:
+            resp = app.test_client().post(
+                "/v1/runs", data={"orders_file": (fh, "orders.csv")},
+                content_type="multipart/form-data", headers={"traceparent": incoming},
+            )
+        assert resp.status_code == 202
+        run_id = resp.get_json()["run_id"]
+        assert resp.headers["traceparent"].startswith("00-" + "1f" * 16 + "-")
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and not (
+            get_run(run_id)["status"] == "done"
+            and any(s["name"] == "run.execute" and _attrs(s)["run_id"] == run_id
+                    for s in exporter.spans)
+        ):
+            time.sleep(0.05)
+
+        spans = [s for s in exporter.spans if _attrs(s).get("run_id") == run_id]
+        by_name = _by_name(spans)
+        http, submit = by_name["POST /v1/runs"], by_name["run.submit"]
+        queued, execute = by_name["run.queued"], by_name["run.execute"]
+        assert http["kind"] == tracing.SPAN_KIND_SERVER and http["parentSpanId"] == "2e" * 8
+        assert _attrs(http)["http.status_code"] == "202"
+        assert submit["parentSpanId"] == http["spanId"]
+        assert queued["parentSpanId"] == execute["parentSpanId"] == submit["spanId"]
+        assert by_name["ingest"]["parentSpanId"] == submit["spanId"]
+        for name in ("profile", "report_build", "serialization"):
+            assert by_name[name]["parentSpanId"] == execute["spanId"]
+        assert {s["traceId"] for s in spans} == {"1f" * 16}